@@ -0,0 +1,102 @@
+import os
+import json
+from typing import Dict, Tuple
+import pandas as pd
+
+from config import OUTPUT_DIR, PROGRESS_FILE, ANALYTICS_FRAME_FILE
+from stats_engine import STATS_ATTRIBUTES, CROSS_TABS, load_attribute_values
+
+def _frame_format() -> str:
+    """Use Parquet when a Parquet engine is installed, pickle otherwise"""
+    for engine in ("pyarrow", "fastparquet"):
+        try:
+            __import__(engine)
+            return "parquet"
+        except ImportError:
+            continue
+    return "pickle"
+
+def _read_frame(path: str, fmt: str) -> pd.DataFrame:
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+def _write_frame(df: pd.DataFrame, path: str, fmt: str) -> None:
+    tmp_path = path + ".tmp"
+    if fmt == "parquet":
+        df.to_parquet(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+def load_annotation_frame(directory: str = OUTPUT_DIR,
+                          exclude: Tuple[str, ...] = (os.path.basename(PROGRESS_FILE),),
+                          frame_file: str = ANALYTICS_FRAME_FILE) -> pd.DataFrame:
+    """Load the verified annotations as a DataFrame with categorical columns
+
+    One row per verified file (indexed by file name), one categorical column
+    per statistics attribute. The frame is cached next to the data and only
+    rebuilt when the per-file cache of stats_engine reports changed files.
+    """
+    values, signature = load_attribute_values(directory, exclude)
+
+    fmt = _frame_format()
+    path = f"{frame_file}.{fmt}"
+    sig_path = frame_file + ".sig"
+    if os.path.exists(path) and os.path.exists(sig_path):
+        try:
+            with open(sig_path, 'r') as f:
+                if json.load(f).get("signature") == signature:
+                    return _read_frame(path, fmt)
+        except (OSError, ValueError):
+            pass
+
+    df = pd.DataFrame.from_dict(values, orient="index", columns=STATS_ATTRIBUTES)
+    df = df.astype({attr: "category" for attr in STATS_ATTRIBUTES})
+    df.index.name = "sample"
+
+    try:
+        _write_frame(df, path, fmt)
+        with open(sig_path, 'w') as f:
+            json.dump({"signature": signature}, f)
+    except (OSError, ImportError, ValueError) as e:
+        print(f"Error caching analytics frame: {str(e)}")
+
+    return df
+
+def attribute_distributions(df: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+    """Value counts per attribute, most frequent first"""
+    return {attr: df[attr].value_counts(sort=True).loc[lambda s: s > 0].to_dict()
+            for attr in STATS_ATTRIBUTES}
+
+def cooccurrence(df: pd.DataFrame, attr_a: str, attr_b: str) -> pd.DataFrame:
+    """Co-occurrence matrix of two attributes (rows: attr_a, columns: attr_b)"""
+    counts = df.groupby([attr_a, attr_b], observed=True).size()
+    return counts.unstack(fill_value=0)
+
+def class_balance(df: pd.DataFrame, attr: str = "label") -> pd.DataFrame:
+    """Per-class count, share of the dataset and ratio to the largest class"""
+    counts = df[attr].value_counts()
+    counts = counts[counts > 0]
+    return pd.DataFrame({
+        "count": counts,
+        "share": counts / counts.sum() if len(counts) else counts,
+        "ratio_to_largest": counts / counts.max() if len(counts) else counts,
+    })
+
+def compute_frame_stats(df: pd.DataFrame) -> Dict:
+    """Build the statistics dict consumed by utils.generate_report from a frame"""
+    cross_tabs = {}
+    for a, b in CROSS_TABS:
+        matrix = cooccurrence(df, a, b)
+        cross_tabs[f"{a} x {b}"] = {row: {col: int(v) for col, v in cols.items() if v > 0}
+                                    for row, cols in matrix.to_dict(orient="index").items()}
+
+    balance = class_balance(df)
+    return {
+        "attribute_counts": attribute_distributions(df),
+        "cross_tabs": cross_tabs,
+        "class_balance": {label: {"count": int(row["count"]), "share": float(row["share"]),
+                                  "ratio_to_largest": float(row["ratio_to_largest"])}
+                          for label, row in balance.iterrows()}
+    }
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Headless JSON API for AOT (AttributeannOtationTool)
+Lists, updates, verifies and exports samples over HTTP for pipelines, on
+top of the same data_handler functions the UI uses. Needs FastAPI and
+uvicorn (pip install fastapi uvicorn).
+
+Endpoints (sample ids are JSON file names in the input directory):
+    GET  /api/stats                         verification progress
+    GET  /api/samples?status=&offset=&limit=&annotations=
+                                            paginated sample listing
+    GET  /api/samples/{sample}              one sample's status and annotation
+    POST /api/samples/update                {"updates": {sample: {attr: value}}, "verify": false}
+                                            (422 and nothing saved if a value is invalid)
+    POST /api/samples/verify                {"samples": [...]}, verify as they are
+    POST /api/samples/reject                {"samples": [...]}, back to pending
+    GET  /api/export                        all verified annotations, streamed as JSON Lines
+
+Usage:
+    python api.py [--host HOST] [--port PORT]
+Set API_ENABLED in config.py to serve the API next to the UI from app.py.
+"""
+
+import os
+import sys
+import argparse
+from typing import Dict, Iterator, List, Optional
+
+from config import INPUT_DIR, API_HOST, API_PORT, API_THREADS, API_MAX_PAGE_SIZE
+from data_handler import (get_all_samples, get_sample_page, is_verified, get_verification_stats,
+                          save_draft_data, save_verified_batch, iter_verified_annotations,
+                          start_write_behind)
+from gallery import current_annotation, approve_samples, reject_samples
+from attribute_index import update_attribute_index
+from validation import validate_json_structure, validate_attribute
+import json_codec
+
+# Filters of the sample listing
+SAMPLE_STATUSES = ["all", "verified", "pending"]
+
+def _sample_record(sample_id: str, with_annotation: bool = True) -> Dict:
+    record = {"id": os.path.basename(sample_id), "verified": is_verified(sample_id)}
+    if with_annotation:
+        record["annotation"] = current_annotation(sample_id)
+    return record
+
+def invalid_updates(updates: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """Updated values the schema doesn't allow, per sample (only samples with any)"""
+    invalid = {}
+    for sample_id, values in updates.items():
+        issues = [f"Invalid value for {attr}: {value}" for attr, value in values.items()
+                  if not validate_attribute(attr, value)]
+        if issues:
+            invalid[os.path.basename(sample_id)] = issues
+    return invalid
+
+def update_samples(updates: Dict[str, Dict], verify: bool = False,
+                   invalid: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+    """Apply attribute updates to samples, saving them like corrections from the UI
+
+    With verify the samples are saved to the verified output and marked
+    verified, all in one batch commit. Without, samples that are already
+    verified get their verified annotation corrected (as autofix.py does)
+    and the others are saved as drafts, which don't count as verified.
+
+    Args:
+        invalid: invalid_updates(updates), if the caller already checked
+
+    Returns:
+        Dict[str, List[str]]: Remaining validation issues per updated sample
+
+    Raises:
+        ValueError: If an updated value is invalid (see invalid_updates);
+            nothing is saved then
+    """
+    if invalid is None:
+        invalid = invalid_updates(updates)
+    if invalid:
+        raise ValueError("; ".join(f"{name}: {', '.join(issues)}" for name, issues in invalid.items()))
+    annotations = {}
+    for sample_id, values in updates.items():
+        data = dict(current_annotation(sample_id))
+        data.update(values)
+        annotations[sample_id] = data
+    if verify:
+        save_verified_batch(annotations)
+    else:
+        verified = {s: data for s, data in annotations.items() if is_verified(s)}
+        if verified:
+            save_verified_batch(verified)
+        for sample_id, data in annotations.items():
+            if sample_id not in verified:
+                save_draft_data(sample_id, data)
+    for sample_id, data in annotations.items():
+        update_attribute_index(sample_id, data)
+    return {os.path.basename(s): validate_json_structure(data) for s, data in annotations.items()}
+
+def iter_export_lines() -> Iterator[bytes]:
+    """All verified annotations as JSON Lines, one sample at a time"""
+    for name, data in iter_verified_annotations():
+        yield json_codec.dumps({"sample": name, "data": data}, compact=True) + b"\n"
+
+def create_api():
+    """Create the FastAPI application
+
+    Handlers are plain functions, which FastAPI runs on its worker thread
+    pool (API_THREADS threads), so disk I/O never blocks the event loop.
+
+    Raises:
+        ImportError: If FastAPI is not installed
+    """
+    try:
+        from fastapi import FastAPI, HTTPException, Query
+        from fastapi.responses import StreamingResponse
+        from pydantic import BaseModel
+    except ImportError:
+        raise ImportError("FastAPI is required for the AOT API (pip install fastapi uvicorn)")
+
+    class UpdateRequest(BaseModel):
+        updates: Dict[str, Dict[str, str]]
+        verify: bool = False
+
+    class SamplesRequest(BaseModel):
+        samples: List[str]
+
+    api = FastAPI(title="AOT API")
+
+    @api.on_event("startup")
+    def set_thread_pool_size():
+        import anyio.to_thread
+        anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADS
+
+    def resolve(name: str) -> str:
+        """Sample path for an id, 404 for unknown ids (and anything that isn't a plain file name)"""
+        path = os.path.join(INPUT_DIR, name)
+        if os.path.basename(name) != name or not name.endswith(".json") or not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail=f"Unknown sample '{name}'")
+        return path
+
+    @api.get("/api/stats")
+    def stats():
+        return get_verification_stats()
+
+    @api.get("/api/samples")
+    def list_samples(status: str = "all", offset: int = Query(0, ge=0),
+                     limit: int = Query(100, ge=1, le=API_MAX_PAGE_SIZE), annotations: bool = False):
+        if status not in SAMPLE_STATUSES:
+            raise HTTPException(status_code=400, detail=f"status must be one of: {', '.join(SAMPLE_STATUSES)}")
+        if status == "all":
+            samples = get_all_samples()
+            total, page = len(samples), samples[offset:offset + limit]
+        else:
+            # Sliced from the store's verified/pending ids, so deep pages cost no more than the first
+            page = get_sample_page(status, offset, limit)
+            total = get_verification_stats()[status]
+        return {
+            "status": status,
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+            "samples": [_sample_record(s, annotations) for s in page],
+        }
+
+    @api.get("/api/samples/{name}")
+    def get_sample(name: str):
+        return _sample_record(resolve(name))
+
+    @api.post("/api/samples/update")
+    def update(request: UpdateRequest):
+        updates = {resolve(name): values for name, values in request.updates.items()}
+        invalid = invalid_updates(updates)
+        if invalid:
+            raise HTTPException(status_code=422, detail={"invalid": invalid})
+        issues = update_samples(updates, request.verify, invalid)
+        return {"updated": len(updates), "verified": request.verify, "issues": issues}
+
+    @api.post("/api/samples/verify")
+    def verify(request: SamplesRequest):
+        sample_ids = [resolve(name) for name in request.samples]
+        return {"newly_verified": approve_samples(sample_ids)}
+
+    @api.post("/api/samples/reject")
+    def reject(request: SamplesRequest):
+        sample_ids = [resolve(name) for name in request.samples]
+        return {"rejected": reject_samples(sample_ids)}
+
+    @api.get("/api/export")
+    def export():
+        # A sync iterator is consumed on the thread pool, chunk by chunk
+        return StreamingResponse(iter_export_lines(), media_type="application/x-ndjson")
+
+    return api
+
+def main():
+    """Serve the API on its own, without the UI"""
+    parser = argparse.ArgumentParser(description="Serve the AOT JSON API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    import uvicorn
+    # Batch requests only queue their writes, like clicks in the UI
+    start_write_behind()
+    uvicorn.run(create_api(), host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,63 +1,79 @@
 import os
+import inspect
 import gradio as gr
 import json
 from PIL import Image
 from typing import Dict, List, Tuple, Optional
-import pandas as pd
-import difflib  # Add difflib for string similarity matching
 
 from data_handler import (get_all_samples, get_image_path, load_json_data, 
-                         save_json_data, mark_as_verified, get_verification_stats,
-                         load_progress, export_dataset_stats, save_progress)
+                         mark_as_verified, mark_as_pending,
+                         get_verification_stats, is_verified,
+                         export_dataset_stats, save_verified_data, load_verified_data, load_draft_data,
+                         delete_verified_data, export_verified_json, get_annotation_store,
+                         export_packed, start_write_behind, flush_writes, get_write_status,
+                         get_verified_count)
 from validation import (get_attribute_options, validate_json_structure, 
                        suggest_fixes, validate_attribute)
 from utils import generate_report, get_timestamp
+from image_cache import load_image, prefetch_neighbors
+from fuzzy_index import find_similar_values
+from gallery import (page_count, get_page, load_page_items, prefetch_page, approve_samples, reject_samples,
+                     propagate_annotation, current_annotation)
+from near_duplicates import get_duplicate_index
+from sessions import AnnotatorSession, work_claims
+from sample_cursor import SampleCursor
+from attribute_index import get_attribute_index, update_attribute_index, parse_query
+from json_codec import PACKED_FORMATS
+from export_shards import export_shards
+from preannotation import start_preannotation, get_prediction, prefill_values, get_preannotation_status
+from scheduler import PRIORITIES, ScheduledView, schedule
 from config import OUTPUT_DIR, VEHICLE_BRANDS, VEHICLE_COLORS, VEHICLE_ORIENTATIONS, VEHICLE_LABELS, VEHICLE_ITYPES, VEHICLE_TYPES, VEHICLE_SPECIAL_TYPES
+from config import RAPID_HOTKEYS, RAPID_VERIFY_NEXT_KEY, RAPID_NEXT_KEY, RAPID_PREV_KEY
+from config import PREANNOTATION_MIN_CONFIDENCE, WORK_QUEUE_PRIORITY
+from config import API_ENABLED, API_HOST, API_PORT
 
-# Global state variables
-current_sample_index = 0
-samples = get_all_samples()
-current_data = {}
-modified = False
-issues = []
-verified_status = False
+# Per-annotator state (current sample, edits, undo history) lives in an
+# AnnotatorSession held in gr.State, see sessions.py
 
-# Add global variable to store previous state
-previous_data = {}
-
-def load_current_sample() -> Tuple[Optional[Image.Image], Dict, str]:
+def load_current_sample(session: AnnotatorSession) -> Tuple[Optional[Image.Image], Dict, str]:
     """Load the current sample (image and JSON)"""
-    global current_data, issues, modified, verified_status
     
-    if not samples or current_sample_index < 0 or current_sample_index >= len(samples):
+    if session.current_path() is None:
         # Empty the current data
-        current_data = {}
-        issues = []
-        modified = False
-        verified_status = False
+        session.current_data = {}
+        session.issues = []
+        session.modified = False
+        session.verified_status = False
         return None, {}, "No samples found"
     
     try:
-        json_path = samples[current_sample_index]
+        json_path = session.samples[session.current_sample_index]
         image_path = get_image_path(json_path)
         
         # Check if verified
-        progress = load_progress()
-        verified_status = json_path in progress["verified"]
+        session.verified_status = is_verified(json_path)
         
-        # If verified, check if there's a verified version in the output directory
-        if verified_status:
-            base_name = os.path.basename(json_path)
-            verified_path = os.path.join(OUTPUT_DIR, base_name)
-            
-            # Load from verified path if it exists, otherwise from original
-            if os.path.exists(verified_path):
-                current_data = load_json_data(verified_path)
-            else:
-                current_data = load_json_data(json_path)
+        # Check if there's a stored copy: the verified version, or a draft with
+        # corrections (e.g. from autofix.py) for a sample that is still pending
+        stored_data = load_verified_data(json_path)
+        if stored_data is None:
+            stored_data = load_draft_data(json_path)
+        
+        # Load the stored version if it exists, otherwise the original
+        if stored_data is not None:
+            session.current_data = stored_data
         else:
-            # Load data from original path
-            current_data = load_json_data(json_path)
+            session.current_data = load_json_data(json_path)
+        
+        # Unsaved edits made the last time this sample was open are gone now
+        update_attribute_index(json_path, session.current_data)
+        
+        # Prefill confident model predictions where a pending sample has no value yet
+        if not session.verified_status and stored_data is None:
+            for attr, value in prefill_values(json_path, PREANNOTATION_MIN_CONFIDENCE).items():
+                if session.current_data.get(attr, "None of the above") == "None of the above":
+                    session.current_data[attr] = value
+                    session.modified = True
         
         # Set default values for all attributes if they don't exist
         attribute_defaults = {
@@ -72,27 +88,90 @@ def load_current_sample() -> Tuple[Optional[Image.Image], Dict, str]:
         
         # Apply defaults for missing attributes
         for attr, default_value in attribute_defaults.items():
-            if attr not in current_data:
-                current_data[attr] = default_value
-                modified = True  # Mark as modified since we added defaults
+            if attr not in session.current_data:
+                session.current_data[attr] = default_value
+                session.modified = True  # Mark as modified since we added defaults
             
-        issues = validate_json_structure(current_data)
+        session.issues = validate_json_structure(session.current_data)
+        
+        # Warm the cache for the samples the annotator is likely to visit next
+        prefetch_neighbors(session.samples, session.current_sample_index)
         
         # Load image if exists
-        if os.path.exists(image_path):
-            image = Image.open(image_path)
-            return image, current_data, f"Sample {current_sample_index + 1}/{len(samples)}: {os.path.basename(json_path)}"
+        image = load_image(image_path, session.full_resolution)
+        if image is not None:
+            return image, session.current_data, f"Sample {session.current_sample_index + 1}/{len(session.samples)}: {os.path.basename(json_path)}"
         else:
-            return None, current_data, f"Image not found for {os.path.basename(json_path)}"
+            return None, session.current_data, f"Image not found for {os.path.basename(json_path)}"
     except Exception as e:
         return None, {}, f"Error loading sample: {str(e)}"
 
-def update_interface() -> List:
-    """Update the Gradio interface with current sample data"""
-    global current_data, issues, verified_status
+def get_status_summary(session: AnnotatorSession) -> str:
+    """Status text for the current sample: position, verification state and overall progress"""
+    
+    # Check verification status
+    verification_status = "✅ Verified" if session.verified_status else "⏳ Pending"
+    
+    # Generate summary with sample information
+    summary = f"Sample {session.current_sample_index + 1}/{len(session.samples)}: {os.path.basename(session.samples[session.current_sample_index])}\n"
+    summary += f"Status: {verification_status}\n"
+    
+    # Claim the sample so other annotators skip it; every refresh also keeps the claim alive
+    holder = work_claims.claim(session.samples[session.current_sample_index], session.session_id)
+    if holder is not None:
+        summary += "Note: another annotator currently has this sample open\n"
+    
+    # Statistics
+    stats = get_verification_stats()
+    summary += f"Overall Progress: {stats['verified']}/{stats['total']} ({stats['progress_percentage']:.2f}%)"
+    
+    # What the pre-annotation model predicted, for samples still to be checked
+    prediction = None if session.verified_status else get_prediction(session.current_path())
+    if prediction:
+        predicted = ", ".join(f"{attr}={value} ({confidence:.2f})" for attr, (value, confidence) in prediction.items())
+        summary += f"\nModel: {predicted}"
+    
+    # Whether queued writes have reached the disk yet
+    write_status = get_write_status()
+    if write_status:
+        summary += f"\n{write_status}"
+    return summary
+
+def drop_unsaved_from_index(session: AnnotatorSession) -> None:
+    """Re-index the current sample as stored, before its unsaved edits are discarded"""
+    current_path = session.current_path()
+    if current_path is None or not session.current_data:
+        return
+    update_attribute_index(current_path, current_annotation(current_path))
+
+def _leave_current_sample(session: AnnotatorSession) -> None:
+    """Save the current sample's edits and clear it, before navigating elsewhere"""
+    
+    # Save current changes if needed
+    if session.modified and session.current_path() is not None:
+        save_changes(session)
+    
+    # Clear current data to force reloading from file
+    drop_unsaved_from_index(session)
+    session.current_data = {}
+    # Have the queued writes written out in the background
+    flush_writes(wait=False)
+    session.modified = False
+    session.issues = []
+    # The sample shown next is claimed when its status is rendered
+    work_claims.release(session.session_id)
+
+def update_interface(session: AnnotatorSession, include_image: bool = True) -> List:
+    """Update the Gradio interface with current sample data
+    
+    Args:
+        include_image: False for updates that keep the same sample on screen;
+            the image is then neither loaded nor returned, so the result
+            starts with the status text
+    """
     
     # Check if we have valid samples
-    if not samples or current_sample_index < 0 or current_sample_index >= len(samples):
+    if session.current_path() is None:
         # No samples or invalid index
         image = None
         label = None
@@ -112,7 +191,7 @@ def update_interface() -> List:
         current_attrs_text = ""
         
         # Return empty UI state
-        return [
+        result = [
             image, 
             summary,
             label, 
@@ -123,26 +202,24 @@ def update_interface() -> List:
             vehicle_type,
             special_type,
             issues_text,
-            verified_status,
+            session.verified_status,
             current_attrs_text
         ]
+        return result if include_image else result[1:]
     
     # If we have valid samples and current_data is empty, load the sample
-    if not current_data:
-        image, data, status = load_current_sample()
+    if not session.current_data:
+        image, data, status = load_current_sample(session)
     else:
         # Use existing data and just load the image
-        json_path = samples[current_sample_index]
+        json_path = session.samples[session.current_sample_index]
         image_path = get_image_path(json_path)
         
-        # Load image if exists
-        if os.path.exists(image_path):
-            image = Image.open(image_path)
-        else:
-            image = None
+        # Load image if exists and the caller needs it
+        image = load_image(image_path, session.full_resolution) if include_image else None
         
-        data = current_data
-        status = f"Sample {current_sample_index + 1}/{len(samples)}: {os.path.basename(json_path)}"
+        data = session.current_data
+        status = f"Sample {session.current_sample_index + 1}/{len(session.samples)}: {os.path.basename(json_path)}"
     
     # Ensure all attributes have default values
     attribute_defaults = {
@@ -157,42 +234,26 @@ def update_interface() -> List:
     
     # Apply defaults for missing attributes in current_data
     for attr, default_value in attribute_defaults.items():
-        if attr not in current_data:
-            current_data[attr] = default_value
+        if attr not in session.current_data:
+            session.current_data[attr] = default_value
     
     # Extract attribute values from current_data (with defaults applied)
-    label = current_data.get("label")
-    orientation = current_data.get("orientation")
-    brand_name = current_data.get("brand_name")
-    vehicle_color = current_data.get("vehicle_color")
-    itype = current_data.get("itype")
-    vehicle_type = current_data.get("type")
-    special_type = current_data.get("special_type")
+    label = session.current_data.get("label")
+    orientation = session.current_data.get("orientation")
+    brand_name = session.current_data.get("brand_name")
+    vehicle_color = session.current_data.get("vehicle_color")
+    itype = session.current_data.get("itype")
+    vehicle_type = session.current_data.get("type")
+    special_type = session.current_data.get("special_type")
     
     # Update issue list
-    issues_text = "\n".join(issues) if issues else "No issues detected"
-    
-    # Check verification status
-    verification_status = "✅ Verified" if verified_status else "⏳ Pending"
+    issues_text = "\n".join(session.issues) if session.issues else "No issues detected"
     
-    # Generate summary with sample information
-    summary = f"Sample {current_sample_index + 1}/{len(samples)}: {os.path.basename(samples[current_sample_index])}\n"
-    summary += f"Status: {verification_status}\n"
-    
-    # Statistics
-    stats = get_verification_stats()
-    summary += f"Overall Progress: {stats['verified']}/{stats['total']} ({stats['progress_percentage']:.2f}%)"
-    
-    # Format current attributes
-    attr_list = []
-    for key, value in current_data.items():
-        if key not in ["img_name", "width", "height"]:  # Skip metadata
-            attr_list.append(f"{key}: {value}")
-    
-    current_attrs_text = "\n".join(attr_list) if attr_list else "No attributes"
+    summary = get_status_summary(session)
+    current_attrs_text = get_formatted_attributes(session)
     
     # Return all the UI elements that need to be updated
-    return [
+    result = [
         image, 
         summary,
         label, 
@@ -203,11 +264,12 @@ def update_interface() -> List:
         vehicle_type,
         special_type,
         issues_text,
-        verified_status,
+        session.verified_status,
         current_attrs_text
     ]
+    return result if include_image else result[1:]
 
-def update_with_status(additional_msg: str = "") -> List:
+def update_with_status(session: AnnotatorSession, additional_msg: str = "", include_image: bool = True) -> List:
     """Update the interface and ensure status text is correctly displayed
     
     This wrapper ensures the status is properly updated when navigating samples
@@ -215,85 +277,63 @@ def update_with_status(additional_msg: str = "") -> List:
     
     Args:
         additional_msg: Optional additional message to include in the status
+        include_image: False to leave the image out of the update (see update_interface)
     
     Returns:
         List: Updated UI elements
     """
     # Get the base interface update
-    result = update_interface()
+    result = update_interface(session, include_image)
+    status_pos = 1 if include_image else 0
     
     # Get the current status text
-    status = result[1]
+    status = result[status_pos]
     
     # Add the additional message if provided
     if additional_msg:
         status += f"\n\n{additional_msg}"
     
     # Replace status text in the result
-    result[1] = status
+    result[status_pos] = status
     
     return result
 
-def next_sample() -> List:
+def next_sample(session: AnnotatorSession) -> List:
     """Move to the next sample"""
-    global current_sample_index, current_data, modified, issues
     
-    # Save current changes if needed
-    if modified and samples and 0 <= current_sample_index < len(samples):
-        save_changes()
-    
-    # Clear current data to force reloading from file
-    current_data = {}
-    modified = False
-    issues = []
+    _leave_current_sample(session)
     
-    if current_sample_index < len(samples) - 1:
-        current_sample_index += 1
+    if session.samples.has(session.current_sample_index + 1):
+        session.current_sample_index += 1
     
-    return update_with_status()
+    return update_with_status(session)
 
-def prev_sample() -> List:
+def prev_sample(session: AnnotatorSession) -> List:
     """Move to the previous sample"""
-    global current_sample_index, current_data, modified, issues
     
-    # Save current changes if needed
-    if modified and samples and 0 <= current_sample_index < len(samples):
-        save_changes()
-    
-    # Clear current data to force reloading from file
-    current_data = {}
-    modified = False
-    issues = []
+    _leave_current_sample(session)
     
-    if current_sample_index > 0:
-        current_sample_index -= 1
+    if session.current_sample_index > 0:
+        session.current_sample_index -= 1
     
-    return update_with_status()
+    return update_with_status(session)
 
-def jump_to_sample(index: int) -> List:
+def jump_to_sample(session: AnnotatorSession, index: int) -> List:
     """Jump to a specific sample by index"""
-    global current_sample_index, current_data, modified, issues
     
-    # Save current changes if needed
-    if modified and samples and 0 <= current_sample_index < len(samples):
-        save_changes()
-    
-    # Clear current data to force reloading from file
-    current_data = {}
-    modified = False
-    issues = []
+    _leave_current_sample(session)
     
-    if not samples:
+    if not session.samples:
         # No samples available
-        current_sample_index = -1
-        return update_with_status("No samples available to navigate to.")
+        session.current_sample_index = -1
+        return update_with_status(session, "No samples available to navigate to.")
     
-    if 0 <= index < len(samples):
-        current_sample_index = index
-        return update_with_status()
+    if session.samples.has(index):
+        session.current_sample_index = index
+        return update_with_status(session)
     else:
         # Invalid index provided
-        return update_with_status(f"Invalid sample number. Please enter a value between 1 and {len(samples)}.")
+        return update_with_status(session, f"Invalid sample number. Please enter a value between 1 and {len(session.samples)}.")
 
 def get_similar_values(attr: str, value: str, max_suggestions: int = 3) -> List[str]:
     """Get similar values from the predefined options for an attribute
@@ -306,24 +346,15 @@ def get_similar_values(attr: str, value: str, max_suggestions: int = 3) -> List[
     Returns:
         List of similar standard values
     """
-    if not value:
-        return []
-    
-    standard_values = get_attribute_options(attr)
-    if not standard_values:
-        return []
-    
-    # Find similar values using difflib
-    similar_values = difflib.get_close_matches(value, standard_values, n=max_suggestions, cutoff=0.6)
-    return similar_values
+    # Trigram index lookup, memoized per (attribute, value)
+    return find_similar_values(attr, value, n=max_suggestions)
 
-def update_attribute(attr: str, value: str) -> Tuple[str, str, str]:
+def update_attribute(session: AnnotatorSession, attr: str, value: str) -> Tuple[str, str, str]:
     """Update an attribute in the current sample
     
     Returns:
         Tuple[str, str, str]: Issues text, formatted attributes, and status message
     """
-    global current_data, modified, issues
     
     status_msg = ""
     
@@ -340,82 +371,82 @@ def update_attribute(attr: str, value: str) -> Tuple[str, str, str]:
                 status_msg = f"Warning: '{value}' is not a standard {attr}. Using custom value."
         
         # Preserve critical data that should never be lost
-        if "img_name" not in current_data and attr != "img_name" and len(current_data) == 0:
+        if "img_name" not in session.current_data and attr != "img_name" and len(session.current_data) == 0:
             # Load original data if current_data is empty to ensure we don't lose metadata
-            if samples and current_sample_index < len(samples):
-                original_data = load_json_data(samples[current_sample_index])
+            if session.current_path() is not None:
+                original_data = load_json_data(session.samples[session.current_sample_index])
                 # Copy basic metadata
                 for meta_key in ["img_name", "width", "height"]:
                     if meta_key in original_data:
-                        current_data[meta_key] = original_data[meta_key]
+                        session.current_data[meta_key] = original_data[meta_key]
         
-        current_data[attr] = value
+        session.current_data[attr] = value
         if not status_msg:
             status_msg = f"Updated {attr} to '{value}' (in memory only, original file untouched)"
-    elif attr in current_data:
+    elif attr in session.current_data:
         # Don't allow removing essential metadata
         if attr not in ["img_name", "width", "height"]:
-            del current_data[attr]
+            del session.current_data[attr]
             status_msg = f"Removed {attr} (in memory only, original file untouched)"
         else:
             status_msg = f"Cannot remove essential metadata: {attr}"
     
-    modified = True
-    issues = validate_json_structure(current_data)
+    session.modified = True
+    session.issues = validate_json_structure(session.current_data)
+    
+    # Keep attribute queries in step with the edit
+    if session.current_path() is not None:
+        update_attribute_index(session.current_path(), session.current_data)
     
     # Return issues, current attributes, and status message
-    issues_text = "\n".join(issues) if issues else "No issues detected"
-    return issues_text, get_formatted_attributes(), status_msg
+    issues_text = "\n".join(session.issues) if session.issues else "No issues detected"
+    return issues_text, get_formatted_attributes(session), status_msg
 
-def get_formatted_attributes() -> str:
+def get_formatted_attributes(session: AnnotatorSession) -> str:
     """Get a formatted string of all current attributes"""
     attr_list = []
-    for key, value in current_data.items():
+    for key, value in session.current_data.items():
         if key not in ["img_name", "width", "height"]:  # Skip metadata
             attr_list.append(f"{key}: {value}")
     
     return "\n".join(attr_list) if attr_list else "No attributes"
 
-def save_changes() -> List:
+def save_changes(session: AnnotatorSession) -> List:
     """Save changes to the current sample
     
     Returns:
         List: UI updates including status message and formatted attributes
     """
-    global modified, previous_data, verified_status
     
-    if not samples or current_sample_index < 0 or current_sample_index >= len(samples):
-        return "No sample selected", get_formatted_attributes()
+    if session.current_path() is None:
+        return "No sample selected", get_formatted_attributes(session)
     
-    current_path = samples[current_sample_index]
+    current_path = session.samples[session.current_sample_index]
     
-    if modified:
+    if session.modified:
         # Store the current state before saving if not already backed up
-        if current_path in previous_data:
+        if current_path in session.previous_data:
             # Don't overwrite previous backup if it exists
             pass
         else:
             # Create a backup of the current state
-            previous_data[current_path] = load_json_data(current_path).copy()
+            session.previous_data[current_path] = load_json_data(current_path).copy()
         
         # Ensure we have essential metadata
         original_data = load_json_data(current_path)
         for meta_key in ["img_name", "width", "height"]:
-            if meta_key not in current_data and meta_key in original_data:
-                current_data[meta_key] = original_data[meta_key]
+            if meta_key not in session.current_data and meta_key in original_data:
+                session.current_data[meta_key] = original_data[meta_key]
         
         # Mark as not modified since we're saving now
-        modified = False
+        session.modified = False
         status_msg = f"Changes recorded for {os.path.basename(current_path)} (original file unchanged)"
         
         # If the sample is verified, also save to the output directory
-        if verified_status:
-            base_name = os.path.basename(current_path)
-            output_file_path = os.path.join(OUTPUT_DIR, base_name)
-            
+        if session.verified_status:
             try:
                 # Save to the verified directory, leaving original untouched
-                save_json_data(current_data, output_file_path)
+                save_verified_data(current_path, session.current_data)
                 status_msg += " and saved to verified output directory"
             except Exception as e:
                 status_msg += f"\nError saving to output directory: {str(e)}"
@@ -423,63 +454,57 @@ def save_changes() -> List:
         status_msg = "No changes to save"
     
     # Get updated status text with the additional message
-    status_text = update_with_status(status_msg)[1]
+    status_text = update_with_status(session, status_msg, include_image=False)[0]
     
-    return status_text, get_formatted_attributes()
+    return status_text, get_formatted_attributes(session)
 
-def undo_changes() -> List:
+def undo_changes(session: AnnotatorSession) -> List:
     """Undo the last saved changes for the current sample"""
-    global current_data, modified, issues, verified_status
     
-    current_path = samples[current_sample_index]
+    current_path = session.samples[session.current_sample_index]
     status_msg = ""
     
-    if current_path in previous_data:
+    if current_path in session.previous_data:
         # Get the original data to ensure we have all metadata
         original_data = load_json_data(current_path)
         
         # Restore the previous state
-        current_data = previous_data[current_path].copy()
+        session.current_data = session.previous_data[current_path].copy()
         
         # Make sure we're not losing any metadata
         for meta_key in ["img_name", "width", "height"]:
-            if meta_key not in current_data and meta_key in original_data:
-                current_data[meta_key] = original_data[meta_key]
+            if meta_key not in session.current_data and meta_key in original_data:
+                session.current_data[meta_key] = original_data[meta_key]
                 
-        modified = True  # Mark as modified so next save will update the file
-        issues = validate_json_structure(current_data)
+        session.modified = True  # Mark as modified so next save will update the file
+        session.issues = validate_json_structure(session.current_data)
         
         # Remove the backup data
-        del previous_data[current_path]
+        del session.previous_data[current_path]
+        update_attribute_index(current_path, session.current_data)
         
         # Update verification status
-        progress = load_progress()
-        verified_status = current_path in progress["verified"]
+        session.verified_status = is_verified(current_path)
         
         status_msg = f"Changes for {os.path.basename(current_path)} have been undone"
     else:
         # No previous state to restore
         status_msg = "No changes available to undo"
     
-    # Return with the status message
-    return update_with_status(status_msg)
+    # Return with the status message; the image stays the same
+    return update_with_status(session, status_msg, include_image=False)
 
-def verify_sample() -> Tuple[str, bool, str]:
+def verify_sample(session: AnnotatorSession) -> Tuple[str, bool, str]:
     """Mark the current sample as verified
     
     Returns:
         Tuple[str, bool, str]: Status message, verification status, and formatted attributes
     """
-    global verified_status, previous_data
     
     # First save any changes to memory (not to the original file)
-    status_msg, attrs = save_changes()
-    
-    current_path = samples[current_sample_index]
+    status_msg, attrs = save_changes(session)
     
-    # Get the output file path
-    base_name = os.path.basename(current_path)
-    output_file_path = os.path.join(OUTPUT_DIR, base_name)
+    current_path = session.samples[session.current_sample_index]
     
     # Only save to the verified_data directory, not to the original file
     try:
@@ -488,8 +513,8 @@ def verify_sample() -> Tuple[str, bool, str]:
         
         # Make sure we're not losing any metadata
         for meta_key in ["img_name", "width", "height"]:
-            if meta_key not in current_data and meta_key in original_data:
-                current_data[meta_key] = original_data[meta_key]
+            if meta_key not in session.current_data and meta_key in original_data:
+                session.current_data[meta_key] = original_data[meta_key]
         
         # Ensure all attributes have values (default to "None of the above")
         attribute_defaults = {
@@ -504,11 +529,11 @@ def verify_sample() -> Tuple[str, bool, str]:
         
         # Apply defaults for missing attributes
         for attr, default_value in attribute_defaults.items():
-            if attr not in current_data:
-                current_data[attr] = default_value
+            if attr not in session.current_data:
+                session.current_data[attr] = default_value
                 
         # Save only to the verified directory, leaving original untouched
-        save_json_data(current_data, output_file_path)  # Save to verified directory
+        save_verified_data(current_path, session.current_data)  # Save to verified directory
         file_saved = True
     except Exception as e:
         file_saved = False
@@ -516,11 +541,16 @@ def verify_sample() -> Tuple[str, bool, str]:
     
     # Mark as verified in the progress tracker
     mark_as_verified(current_path)
-    verified_status = True
+    session.verified_status = True
+    update_attribute_index(current_path, session.current_data)
+    
+    # A scheduled work queue reprioritizes the samples still to come
+    if isinstance(session.samples, ScheduledView):
+        session.samples.verified(current_path, session.current_data)
     
     # Clear undo history for this sample once verified
-    if current_path in previous_data:
-        del previous_data[current_path]
+    if current_path in session.previous_data:
+        del session.previous_data[current_path]
     
     # Build status message
     result_msg = f"{status_msg}\nSample marked as verified"
@@ -529,63 +559,92 @@ def verify_sample() -> Tuple[str, bool, str]:
     
     return result_msg, True, attrs
 
-def filter_samples(filter_verified: bool) -> List:
+def filter_samples(session: AnnotatorSession, filter_verified: bool) -> List:
     """Filter samples based on verification status"""
-    global samples, current_sample_index, current_data, modified, issues
     
-    # Save current changes if needed
-    if modified and samples and 0 <= current_sample_index < len(samples):
-        save_changes()
-    
-    # Clear current data to force reloading from file
-    current_data = {}
-    modified = False
-    issues = []
-    
-    progress = load_progress()
+    _leave_current_sample(session)
     
+    # The views are lazy: only the samples up to the one shown are checked
     if filter_verified:
         # Show only verified samples
-        samples = [s for s in get_all_samples() if s in progress["verified"]]
-        if not samples:
+        session.samples = SampleCursor(get_all_samples(), is_verified, count_hint=get_verified_count)
+        if not session.samples:
             # If no verified samples, set index to invalid and show message
-            current_sample_index = -1
-            return update_with_status("No verified samples found. Verify samples to see them here.")
+            session.current_sample_index = -1
+            return update_with_status(session, "No verified samples found. Verify samples to see them here.")
     else:
-        # Show only pending samples
-        samples = [s for s in get_all_samples() if s in progress["pending"]]
-        if not samples:
+        # Show only pending samples, skipping those other annotators are working on
+        claimed = work_claims.claimed_by_others(session.session_id)
+        session.samples = SampleCursor(get_all_samples(), lambda s: s not in claimed and not is_verified(s),
+                                       count_hint=lambda: get_verification_stats()["pending"])
+        if not session.samples:
             # If no pending samples, set index to invalid and show message
-            current_sample_index = -1
-            return update_with_status("No pending samples found. All samples have been verified!")
+            session.current_sample_index = -1
+            return update_with_status(session, "No pending samples found. All samples have been verified!")
     
     # If we have samples, set to the first one
-    current_sample_index = 0 if samples else -1
+    session.current_sample_index = 0 if session.samples else -1
     
     # Update the interface
-    return update_with_status()
+    return update_with_status(session)
 
-def show_all_samples() -> List:
+def show_all_samples(session: AnnotatorSession) -> List:
     """Show all samples (both verified and pending)"""
-    global samples, current_sample_index, current_data, modified, issues
     
-    # Save current changes if needed
-    if modified and samples and 0 <= current_sample_index < len(samples):
-        save_changes()
+    _leave_current_sample(session)
     
-    # Clear current data to force reloading from file
-    current_data = {}
-    modified = False
-    issues = []
+    session.samples = SampleCursor(get_all_samples())
+    
+    if not session.samples:
+        session.current_sample_index = -1
+        return update_with_status(session, "No samples found in the input directory. Please check your configuration.")
+    
+    session.current_sample_index = 0
+    return update_with_status(session)
+
+def show_scheduled(session: AnnotatorSession, order: str) -> List:
+    """Show pending samples in a work order: model uncertainty, rare classes first, or stratified by class"""
+    
+    _leave_current_sample(session)
+    
+    # Samples verified or claimed by others meanwhile are skipped when they come up
+    claimed = work_claims.claimed_by_others(session.session_id)
+    try:
+        session.samples = schedule(order, get_attribute_index(), get_all_samples(), is_verified,
+                                   lambda s: s not in claimed and not is_verified(s))
+    except ValueError as e:
+        return update_with_status(session, str(e))
+    if not session.samples:
+        session.current_sample_index = -1
+        return update_with_status(session, "No pending samples found. All samples have been verified!")
+    
+    session.current_sample_index = 0
+    message = f"Showing pending samples in {order} order"
+    if order == "uncertainty":
+        message += f"\n{get_preannotation_status()}"
+    return update_with_status(session, message)
+
+def filter_by_query(session: AnnotatorSession, query: str) -> List:
+    """Show only the samples matching an attribute query, e.g. 'label=Bus AND orientation!=Front'"""
     
-    samples = get_all_samples()
+    _leave_current_sample(session)
     
-    if not samples:
-        current_sample_index = -1
-        return update_with_status("No samples found in the input directory. Please check your configuration.")
+    if not query or not query.strip():
+        return show_all_samples(session)
     
-    current_sample_index = 0
-    return update_with_status()
+    try:
+        clauses = parse_query(query)
+    except ValueError as e:
+        return update_with_status(session, f"Invalid query: {str(e)}")
+    
+    matches = get_attribute_index().query(clauses)
+    session.samples = SampleCursor(get_all_samples(), matches.__contains__, count_hint=matches.__len__)
+    if not session.samples:
+        session.current_sample_index = -1
+        return update_with_status(session, f"No samples match: {query}")
+    
+    session.current_sample_index = 0
+    return update_with_status(session, f"Showing samples matching: {query}")
 
 def export_statistics() -> str:
     """Export statistics about the dataset"""
@@ -595,164 +654,390 @@ def export_statistics() -> str:
     
     return f"Report exported to {report_file}"
 
-def reset_changes() -> List:
+def export_verified_files() -> str:
+    """Export verified annotations to the output directory as per-sample JSON files"""
+    count = export_verified_json(OUTPUT_DIR)
+    return f"Exported {count} verified samples to {OUTPUT_DIR}"
+
+def export_packed_dataset(fmt: str) -> str:
+    """Export all verified annotations to one JSONL or msgpack file"""
+    extension, _ = PACKED_FORMATS[fmt]
+    output_path = os.path.join(OUTPUT_DIR, f"AOT_annotations_{get_timestamp()}{extension}")
+    try:
+        count = export_packed(output_path, fmt)
+    except ImportError as e:
+        return str(e)
+    
+    return f"Exported {count} verified samples to {output_path}"
+
+def export_training_shards() -> str:
+    """Export verified samples and images as train/val WebDataset shards"""
+    output_dir = os.path.join(OUTPUT_DIR, f"shards_{get_timestamp()}")
+    manifest = export_shards(output_dir)
+    counts = ", ".join(f"{split}: {info['samples']} samples in {len(info['shards'])} shards"
+                       for split, info in manifest["splits"].items())
+    
+    result_msg = f"Exported {counts} to {output_dir}"
+    if manifest["skipped"]:
+        result_msg += f"\nSkipped {len(manifest['skipped'])} samples with a missing image or annotation"
+    for failure in manifest["failed"]:
+        result_msg += f"\nFailed to write {failure['shard']}: {failure['error']}"
+    return result_msg
+
+def reset_changes(session: AnnotatorSession) -> List:
     """Reset all unsaved changes to the current sample"""
-    global current_data, modified, issues
     
-    current_path = samples[current_sample_index]
+    current_path = session.samples[session.current_sample_index]
     
     # Remember any metadata values we had
     metadata = {}
     for meta_key in ["img_name", "width", "height"]:
-        if meta_key in current_data:
-            metadata[meta_key] = current_data[meta_key]
+        if meta_key in session.current_data:
+            metadata[meta_key] = session.current_data[meta_key]
     
     # Reload the JSON data from disk
-    current_data = load_json_data(current_path)
+    session.current_data = load_json_data(current_path)
     
     # Make sure we don't lose metadata if it was missing in the file
     for meta_key, value in metadata.items():
-        if meta_key not in current_data:
-            current_data[meta_key] = value
+        if meta_key not in session.current_data:
+            session.current_data[meta_key] = value
             
-    modified = False
-    issues = validate_json_structure(current_data)
+    session.modified = False
+    session.issues = validate_json_structure(session.current_data)
+    update_attribute_index(current_path, session.current_data)
     
-    # Return with the status message
-    return update_with_status("Discarded all unsaved changes")
+    # Return with the status message; the image stays the same
+    return update_with_status(session, "Discarded all unsaved changes", include_image=False)
 
-def unmark_verified() -> Tuple[str, bool, str]:
+def unmark_verified(session: AnnotatorSession) -> Tuple[str, bool, str]:
     """Remove a sample from the verified list
     
     Returns:
         Tuple[str, bool, str]: Status message, verification status, and formatted attributes
     """
-    global verified_status
     
-    current_path = samples[current_sample_index]
-    progress = load_progress()
+    current_path = session.samples[session.current_sample_index]
     
-    if current_path in progress["verified"]:
-        # Get the output file path
-        base_name = os.path.basename(current_path)
-        output_file_path = os.path.join(OUTPUT_DIR, base_name)
-        
+    if is_verified(current_path):
         # Remove the file from verified directory if it exists
-        if os.path.exists(output_file_path):
-            try:
-                os.remove(output_file_path)
-                file_deleted = True
-            except Exception as e:
-                file_deleted = False
-                print(f"Error deleting verified file: {str(e)}")
-        else:
+        try:
+            file_deleted = delete_verified_data(current_path)
+        except Exception as e:
             file_deleted = False
+            print(f"Error deleting verified file: {str(e)}")
         
         # Remove from verified and add to pending
-        progress["verified"].remove(current_path)
-        if current_path not in progress["pending"]:
-            progress["pending"].append(current_path)
-        
-        # Save updated progress
-        save_progress(progress)
-        verified_status = False
+        mark_as_pending(current_path)
+        session.verified_status = False
+        # Without the verified copy, queries see the input file again
+        update_attribute_index(current_path, load_json_data(current_path))
         
         # Build status message
         status_msg = f"Sample {os.path.basename(current_path)} unmarked as verified"
         if file_deleted:
             status_msg += " and removed from verified data directory"
         
-        return status_msg, False, get_formatted_attributes()
+        return status_msg, False, get_formatted_attributes(session)
     else:
-        return "Sample was not in verified list", verified_status, get_formatted_attributes()
+        return "Sample was not in verified list", session.verified_status, get_formatted_attributes(session)
 
-def check_verified_status() -> str:
+def check_verified_status(session: AnnotatorSession) -> str:
     """Check if the current sample is verified and prepare confirmation message
     
     Returns:
         str: Confirmation message
     """
-    global verified_status
     
-    if not samples or current_sample_index < 0 or current_sample_index >= len(samples):
+    if session.current_path() is None:
         return "No sample is currently selected"
     
-    if not verified_status:
+    if not session.verified_status:
         return "This sample is not marked as verified"
     
-    current_path = samples[current_sample_index]
+    current_path = session.samples[session.current_sample_index]
     return f"Are you sure you want to unmark sample {os.path.basename(current_path)} as verified? This will delete the file from the verified data directory."
 
-def update_attr_and_refresh(attr, value):
-    """Update an attribute and refresh the entire UI
+def update_attr_and_refresh(session: AnnotatorSession, attr, value):
+    """Update an attribute and refresh the components it affects
     
-    This function updates an attribute value, records any warnings or issues,
-    and ensures the interface is fully refreshed with the current attribute values.
+    The dropdown already shows the new value and the image doesn't change,
+    so only the status, issues and current attributes are sent back.
     
     Args:
         attr: The attribute name to update
         value: The new value for the attribute
         
     Returns:
-        List: Updated UI elements
+        List: Status text, issues text and formatted attributes
     """
-    global current_data, modified, verified_status
     
     # If value is None, do nothing (this happens when dropdown is clicked but no selection is made)
     if value is None:
-        return update_interface()
+        return [gr.update(), gr.update(), gr.update()]
         
     # Call update_attribute to get the warnings and messages
-    issues_txt, attrs_txt, status_msg = update_attribute(attr, value)
+    issues_txt, attrs_txt, status_msg = update_attribute(session, attr, value)
     
     # Explicitly save the changes to ensure they persist
-    if samples and 0 <= current_sample_index < len(samples):
-        current_path = samples[current_sample_index]
+    if session.current_path() is not None:
+        current_path = session.samples[session.current_sample_index]
         
         # Store the current state as a backup
-        if current_path not in previous_data:
+        if current_path not in session.previous_data:
             try:
-                previous_data[current_path] = load_json_data(current_path).copy()
+                session.previous_data[current_path] = load_json_data(current_path).copy()
             except Exception:
-                previous_data[current_path] = {}
+                session.previous_data[current_path] = {}
         
         # If this sample is already verified, immediately update the output file
-        if verified_status:
-            base_name = os.path.basename(current_path)
-            output_file_path = os.path.join(OUTPUT_DIR, base_name)
-            
+        if session.verified_status:
             try:
                 # Save only to the verified directory, leaving original untouched
-                save_json_data(current_data, output_file_path)
+                save_verified_data(current_path, session.current_data)
                 status_msg += "\nChanges saved to verified output directory"
             except Exception as e:
                 status_msg += f"\nError saving to output directory: {str(e)}"
+        
+        status_text = get_status_summary(session)
+    else:
+        status_text = "No sample selected"
     
-    # Now refresh the whole interface with the status message
-    # Force a complete refresh of the UI to ensure all attributes are displayed correctly
-    result = update_interface()
-    
-    # Add the status message to the result
+    # Add the status message to the summary
     if status_msg:
-        result[1] = result[1] + f"\n\n{status_msg}"
+        status_text += f"\n\n{status_msg}"
     
-    return result
+    return [status_text, issues_txt, attrs_txt]
+
+def apply_hotkey(session: AnnotatorSession, attr: str, value: str) -> List:
+    """Set an attribute from a rapid-mode hotkey
+    
+    Returns:
+        List: The attribute's new dropdown value followed by the
+        update_attr_and_refresh outputs
+    """
+    
+    if session.current_path() is None:
+        return [gr.update(), "No sample selected", gr.update(), gr.update()]
+    return [value] + update_attr_and_refresh(session, attr, value)
+
+def verify_and_next(session: AnnotatorSession) -> List:
+    """Verify the current sample and move to the next one in a single round trip"""
+    
+    if session.current_path() is None:
+        return update_with_status(session, "No sample selected")
+    
+    verify_sample(session)
+    name = os.path.basename(session.current_path())
+    
+    at_last = not session.samples.has(session.current_sample_index + 1)
+    next_sample(session)
+    if at_last:
+        return update_with_status(session, f"{name} verified. This is the last sample in the current view.")
+    return update_with_status(session, f"Previous sample {name} verified")
+
+def set_full_resolution(session: AnnotatorSession, enabled: bool) -> Optional[Image.Image]:
+    """Switch the image display between display resolution and full resolution
+    
+    Args:
+        enabled: True to show the original image, e.g. when zooming in
+        
+    Returns:
+        The current sample's image at the requested resolution
+    """
+    
+    session.full_resolution = bool(enabled)
+    
+    if session.current_path() is None:
+        return None
+    
+    return load_image(get_image_path(session.samples[session.current_sample_index]), session.full_resolution)
+
+def show_gallery_page(session: AnnotatorSession, page: int) -> List:
+    """Load one page of the gallery view over the current sample list
+    
+    Only the page's thumbnails are decoded; the next page is prefetched in
+    the background.
+    
+    Returns:
+        List: Gallery items, page info, and the page's sample selection (all ticked)
+    """
+    
+    pages = page_count(session.samples)
+    session.gallery_page = min(max(int(page), 0), pages - 1)
+    sample_ids = get_page(session.samples, session.gallery_page)
+    items = load_page_items(sample_ids)
+    prefetch_page(session.samples, session.gallery_page + 1)
+    
+    names = [os.path.basename(s) for s in sample_ids]
+    info = f"Page {session.gallery_page + 1}/{pages} ({len(session.samples)} samples in current view)"
+    return [items, info, gr.update(choices=names, value=names)]
+
+def toggle_gallery_selection(session: AnnotatorSession, selected: List[str], evt: gr.SelectData) -> List[str]:
+    """Include or exclude the sample whose thumbnail was clicked"""
+    
+    sample_ids = get_page(session.samples, session.gallery_page)
+    if not isinstance(evt.index, int) or not 0 <= evt.index < len(sample_ids):
+        return selected
+    name = os.path.basename(sample_ids[evt.index])
+    selected = list(selected or [])
+    return [n for n in selected if n != name] if name in selected else selected + [name]
+
+def review_gallery_selection(session: AnnotatorSession, selected: List[str], approve: bool) -> List:
+    """Approve or reject the ticked samples of the current gallery page in one batch
+    
+    Returns:
+        List: The refreshed page (see show_gallery_page) and a result message
+    """
+    
+    by_name = {os.path.basename(s): s for s in get_page(session.samples, session.gallery_page)}
+    sample_ids = [by_name[name] for name in (selected or []) if name in by_name]
+    
+    if not sample_ids:
+        result_msg = "No samples selected"
+    else:
+        try:
+            if approve:
+                count = approve_samples(sample_ids)
+                result_msg = f"Approved {len(sample_ids)} samples ({count} newly verified, saved to the output directory)"
+            else:
+                count = reject_samples(sample_ids)
+                result_msg = f"Rejected {len(sample_ids)} samples ({count} removed from the verified data)"
+        except Exception as e:
+            result_msg = f"Error while saving the batch: {str(e)}"
+        
+        # Keep the single-sample view in sync if its sample was part of the batch
+        if session.current_path() in sample_ids:
+            session.verified_status = is_verified(session.current_path())
+    
+    return show_gallery_page(session, session.gallery_page) + [result_msg]
+
+def find_near_duplicates(session: AnnotatorSession) -> str:
+    """Hash all images and group the near-duplicates, returns a summary"""
+    
+    try:
+        index = get_duplicate_index(rebuild=True)
+    except Exception as e:
+        return f"Error while finding near-duplicates: {str(e)}"
+    
+    result_msg = index.summary()
+    current_path = session.current_path()
+    if current_path is not None:
+        result_msg += f"\nCurrent sample has {max(len(index.cluster(current_path)) - 1, 0)} near-duplicates"
+    return result_msg
+
+def show_duplicate_cluster(session: AnnotatorSession) -> List:
+    """Navigate the near-duplicates of the current sample"""
+    
+    current_path = session.current_path()
+    if current_path is None:
+        return update_with_status(session, "No sample selected")
+    cluster = get_duplicate_index().cluster(current_path)
+    if not cluster:
+        return update_with_status(session, f"{os.path.basename(current_path)} has no near-duplicates")
+    
+    _leave_current_sample(session)
+    
+    session.samples = SampleCursor(cluster)
+    session.current_sample_index = cluster.index(current_path)
+    return update_with_status(session, f"Showing {len(cluster)} near-duplicates")
+
+def apply_to_duplicates(session: AnnotatorSession) -> str:
+    """Verify the pending near-duplicates of the current sample with its verified annotation"""
+    
+    current_path = session.current_path()
+    if current_path is None:
+        return "No sample selected"
+    if not session.verified_status:
+        return "Verify this sample first, then apply its annotation to its near-duplicates"
+    
+    # Save edits made since verifying, so the source keeps the values it hands out
+    if session.modified:
+        save_changes(session)
+    
+    # Leave out samples other annotators have open
+    claimed = work_claims.claimed_by_others(session.session_id)
+    cluster = get_duplicate_index().cluster(current_path)
+    pending = [s for s in cluster if s != current_path and not is_verified(s)]
+    targets = [s for s in pending if s not in claimed]
+    if not pending:
+        return f"{os.path.basename(current_path)} has no pending near-duplicates"
+    if not targets:
+        return "All pending near-duplicates are currently open in other sessions"
+    
+    try:
+        count = propagate_annotation(session.current_data, targets)
+    except Exception as e:
+        return f"Error while saving the batch: {str(e)}"
+    result_msg = f"Applied the annotation of {os.path.basename(current_path)} to {count} near-duplicates"
+    if len(targets) < len(pending):
+        result_msg += f" ({len(pending) - len(targets)} skipped, open in other sessions)"
+    return result_msg
+
+def get_hotkey_script(bindings: Dict[str, str]) -> str:
+    """JavaScript that clicks the element with the bound id when a key is pressed
+    
+    Keys only fire while the rapid mode checkbox is ticked and focus isn't in
+    a text field or on a button, so typing custom values still works.
+    
+    Args:
+        bindings: KeyboardEvent.key -> elem_id of the button to click
+    """
+    return """
+() => {
+    if (window.aotHotkeysInstalled) return;
+    window.aotHotkeysInstalled = true;
+    const bindings = %s;
+    document.addEventListener("keydown", (event) => {
+        if (event.ctrlKey || event.metaKey || event.altKey) return;
+        const target = event.composedPath()[0];
+        if (target && (["INPUT", "TEXTAREA", "SELECT", "BUTTON"].includes(target.tagName) || target.isContentEditable)) return;
+        const app = document.querySelector("gradio-app");
+        const root = (app && app.shadowRoot) || document;
+        const toggle = root.querySelector("#aot-rapid-mode input");
+        if (!toggle || !toggle.checked) return;
+        const id = bindings[event.key];
+        if (!id) return;
+        const elem = root.querySelector("#" + id);
+        const button = elem && (elem.tagName === "BUTTON" ? elem : elem.querySelector("button"));
+        if (button) {
+            event.preventDefault();
+            button.click();
+        }
+    });
+}
+""" % json.dumps(bindings)
 
 def build_ui():
     """Build the Gradio UI"""
+    # Clicks only queue output and progress writes; a background thread writes them
+    start_write_behind()
+    # Pre-annotate pending samples in the background if a model is configured
+    start_preannotation([s for s in get_all_samples() if not is_verified(s)])
+    
     with gr.Blocks(title="AOT - AttributeannOtationTool") as app:
         gr.Markdown("# AOT - AttributeannOtationTool")
         gr.Markdown("### Vehicle Attribute Verification and Annotation")
         gr.Markdown("*Note: Original files in the input directory remain untouched. Only verified files are saved to the output directory.*")
         
+        # One AnnotatorSession per browser tab; the class is called on page load.
+        # Newer Gradio versions report closed tabs, whose claims are released
+        # right away; otherwise they expire after CLAIM_TTL_SECONDS
+        if "delete_callback" in inspect.signature(gr.State).parameters:
+            session_state = gr.State(AnnotatorSession,
+                                     delete_callback=lambda session: work_claims.release(session.session_id))
+        else:
+            session_state = gr.State(AnnotatorSession)
+        
         with gr.Row():
             with gr.Column(scale=2):
                 image_display = gr.Image(label="Vehicle Image", type="pil")
+                full_res_toggle = gr.Checkbox(label="Full resolution (for zooming)", value=False)
                 status_text = gr.Textbox(label="Status", interactive=False)
                 
                 with gr.Row():
-                    prev_btn = gr.Button("Previous")
-                    next_btn = gr.Button("Next")
+                    prev_btn = gr.Button("Previous", elem_id="aot-prev")
+                    next_btn = gr.Button("Next", elem_id="aot-next")
                 
                 with gr.Row():
                     sample_index = gr.Number(label="Jump to sample #", value=1, precision=0)
@@ -762,6 +1047,14 @@ def build_ui():
                     show_all_btn = gr.Button("Show All")
                     show_verified_btn = gr.Button("Show Verified")
                     show_pending_btn = gr.Button("Show Pending")
+                
+                with gr.Row():
+                    work_order = gr.Dropdown(choices=PRIORITIES, value=WORK_QUEUE_PRIORITY, label="Work order", scale=3)
+                    schedule_btn = gr.Button("Schedule Pending", scale=1)
+                
+                with gr.Row():
+                    query_input = gr.Textbox(label="Attribute query", placeholder="label=Mini_Bus AND orientation=Side", scale=4)
+                    query_btn = gr.Button("Search", scale=1)
             
             with gr.Column(scale=3):
                 with gr.Group():
@@ -778,6 +1071,16 @@ def build_ui():
                     # Display current attributes
                     current_attrs = gr.Textbox(label="Current Attributes", interactive=False)
                 
+                # Rapid annotation: one key per common value, one key for verify + next
+                with gr.Accordion("Rapid Annotation Mode", open=False):
+                    gr.Checkbox(label="Enable keyboard shortcuts", value=False, elem_id="aot-rapid-mode")
+                    gr.Markdown(f"*{RAPID_VERIFY_NEXT_KEY}: verify + next, {RAPID_NEXT_KEY}/{RAPID_PREV_KEY}: next/previous sample*")
+                    hotkey_buttons = []
+                    with gr.Row():
+                        for i, (key, (attr, value)) in enumerate(RAPID_HOTKEYS.items()):
+                            hotkey_buttons.append((gr.Button(f"[{key}] {value}", elem_id=f"aot-hotkey-{i}"), attr, value))
+                    verify_next_btn = gr.Button(f"[{RAPID_VERIFY_NEXT_KEY}] Verify + Next", variant="primary", elem_id="aot-verify-next")
+                
                 issues_text = gr.Textbox(label="Issues", interactive=False)
                 
                 # Organize buttons for better layout
@@ -804,82 +1107,127 @@ def build_ui():
                         confirm_no_btn = gr.Button("No, Cancel", variant="secondary")
 
                 export_stats_btn = gr.Button("Export Statistics")
+                # Verified files only need exporting when they live in the SQLite store
+                export_json_btn = gr.Button("Export Verified JSON Files", visible=get_annotation_store() is not None)
+                with gr.Row():
+                    packed_format = gr.Dropdown(choices=list(PACKED_FORMATS), value="jsonl", label="Packed Format")
+                    export_packed_btn = gr.Button("Export Packed Dataset")
+                export_shards_btn = gr.Button("Export Training Shards (WebDataset)")
                 export_result = gr.Textbox(label="Export Result", interactive=False)
         
+        # Gallery view: approve or reject a page of samples at once
+        with gr.Accordion("Gallery View (Bulk Verification)", open=False):
+            gr.Markdown("*Shows the samples of the current view page by page. Click a thumbnail to exclude or include it, then approve or reject the ticked samples in one batch.*")
+            with gr.Row():
+                gallery_prev_btn = gr.Button("Previous Page")
+                gallery_load_btn = gr.Button("Load Page")
+                gallery_next_btn = gr.Button("Next Page")
+            gallery_info = gr.Textbox(label="Page", interactive=False)
+            gallery_display = gr.Gallery(label="Samples", columns=6)
+            gallery_selection = gr.CheckboxGroup(label="Samples to approve/reject", choices=[])
+            with gr.Row():
+                gallery_approve_btn = gr.Button("Approve Selected", variant="primary")
+                gallery_reject_btn = gr.Button("Reject Selected (back to pending)", variant="stop")
+            gallery_result = gr.Textbox(label="Batch Result", interactive=False)
+        
+        # Near-duplicate frames: verify one, apply it to the rest of its cluster
+        with gr.Accordion("Near-duplicates", open=False):
+            gr.Markdown("*Groups nearly identical images by perceptual hash. Verify one sample of a group, then apply its annotation to the pending rest.*")
+            with gr.Row():
+                duplicates_find_btn = gr.Button("Find Near-duplicates")
+                duplicates_show_btn = gr.Button("Show Cluster of Current Sample")
+                duplicates_apply_btn = gr.Button("Apply Annotation to Cluster", variant="primary")
+            duplicates_result = gr.Textbox(label="Near-duplicates", interactive=False)
+        
+        # Navigation replaces the whole sample, including the image; edits to
+        # the sample on screen only refresh the attribute components
+        sample_outputs = [image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+        attribute_outputs = sample_outputs[1:]
+        attribute_dropdowns = {"label": label, "orientation": orientation, "brand_name": brand_name,
+                               "vehicle_color": vehicle_color, "itype": itype, "type": vehicle_type,
+                               "special_type": special_type}
+        
         # Event handlers
-        next_btn.click(next_sample, inputs=[], outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs])
-        prev_btn.click(prev_sample, inputs=[], outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs])
+        full_res_toggle.change(set_full_resolution, inputs=[session_state, full_res_toggle], outputs=[image_display])
         
-        jump_btn.click(lambda x: jump_to_sample(int(x) - 1), inputs=[sample_index], outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs])
+        next_btn.click(next_sample, inputs=[session_state], outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs])
+        prev_btn.click(prev_sample, inputs=[session_state], outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs])
+        
+        jump_btn.click(lambda session, x: jump_to_sample(session, int(x) - 1), inputs=[session_state, sample_index], outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs])
         
         # Sample filtering handlers with explicit error handling
-        def safe_filter(filter_verified):
+        def safe_filter(session, filter_verified):
             try:
-                return filter_samples(filter_verified)
+                return filter_samples(session, filter_verified)
             except Exception as e:
                 print(f"Error in filter_samples: {str(e)}")
                 # Set to invalid state
-                global current_sample_index
-                current_sample_index = -1
+                session.current_sample_index = -1
                 # Return a graceful error message
-                return update_with_status(f"An error occurred while filtering samples: {str(e)}")
+                return update_with_status(session, f"An error occurred while filtering samples: {str(e)}")
         
         show_all_btn.click(
-            lambda: show_all_samples(), 
-            inputs=[], 
+            show_all_samples, 
+            inputs=[session_state], 
             outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
         )
         show_verified_btn.click(
-            lambda: safe_filter(True), 
-            inputs=[], 
+            lambda session: safe_filter(session, True), 
+            inputs=[session_state], 
             outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
         )
         show_pending_btn.click(
-            lambda: safe_filter(False), 
-            inputs=[], 
+            lambda session: safe_filter(session, False), 
+            inputs=[session_state], 
             outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
         )
         
+        schedule_btn.click(show_scheduled, inputs=[session_state, work_order], outputs=sample_outputs)
+        
+        query_btn.click(filter_by_query, inputs=[session_state, query_input], outputs=sample_outputs)
+        query_input.submit(filter_by_query, inputs=[session_state, query_input], outputs=sample_outputs)
+        
         # Update the attribute change handlers to be more stable
-        # Only trigger attribute updates when there's a real selection change
+        # Only trigger attribute updates when there's a real selection change.
+        # The dropdown already shows the selection, so only the texts are refreshed
         label.select(
-            lambda x: update_attr_and_refresh("label", x), 
-            inputs=[label], 
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            lambda session, x: update_attr_and_refresh(session, "label", x), 
+            inputs=[session_state, label], 
+            outputs=[status_text, issues_text, current_attrs]
         )
         orientation.select(
-            lambda x: update_attr_and_refresh("orientation", x), 
-            inputs=[orientation], 
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            lambda session, x: update_attr_and_refresh(session, "orientation", x), 
+            inputs=[session_state, orientation], 
+            outputs=[status_text, issues_text, current_attrs]
         )
         brand_name.select(
-            lambda x: update_attr_and_refresh("brand_name", x), 
-            inputs=[brand_name], 
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            lambda session, x: update_attr_and_refresh(session, "brand_name", x), 
+            inputs=[session_state, brand_name], 
+            outputs=[status_text, issues_text, current_attrs]
         )
         vehicle_color.select(
-            lambda x: update_attr_and_refresh("vehicle_color", x), 
-            inputs=[vehicle_color], 
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            lambda session, x: update_attr_and_refresh(session, "vehicle_color", x), 
+            inputs=[session_state, vehicle_color], 
+            outputs=[status_text, issues_text, current_attrs]
         )
         itype.select(
-            lambda x: update_attr_and_refresh("itype", x), 
-            inputs=[itype], 
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            lambda session, x: update_attr_and_refresh(session, "itype", x), 
+            inputs=[session_state, itype], 
+            outputs=[status_text, issues_text, current_attrs]
         )
         vehicle_type.select(
-            lambda x: update_attr_and_refresh("type", x), 
-            inputs=[vehicle_type], 
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            lambda session, x: update_attr_and_refresh(session, "type", x), 
+            inputs=[session_state, vehicle_type], 
+            outputs=[status_text, issues_text, current_attrs]
         )
         special_type.select(
-            lambda x: update_attr_and_refresh("special_type", x), 
-            inputs=[special_type], 
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            lambda session, x: update_attr_and_refresh(session, "special_type", x), 
+            inputs=[session_state, special_type], 
+            outputs=[status_text, issues_text, current_attrs]
         )
         
         # Create a wrapper for save_changes that updates the whole UI
-        def save_and_refresh():
+        def save_and_refresh(session):
             """Save changes and refresh the UI
             
             This function saves changes to the current sample and ensures that
@@ -889,49 +1237,58 @@ def build_ui():
                 List: Updated UI elements
             """
             # Save changes and get the status message
-            status_msg, _ = save_changes()
+            status_msg, _ = save_changes(session)
             
-            # Force a complete UI refresh to ensure all attributes are displayed correctly
-            result = update_interface()
+            # Refresh all attributes; the image stays the same
+            result = update_interface(session, include_image=False)
             
             # Update the status message in the result
             if status_msg:
-                result[1] = status_msg
+                result[0] = status_msg
             
             return result
         
         save_btn.click(
             save_and_refresh, 
-            inputs=[], 
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            inputs=[session_state], 
+            outputs=attribute_outputs
         )
         
         undo_btn.click(
             undo_changes, 
-            inputs=[], 
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            inputs=[session_state], 
+            outputs=attribute_outputs
         )
         reset_btn.click(
             reset_changes,
-            inputs=[],
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            inputs=[session_state],
+            outputs=attribute_outputs
         )
         
         # Define a wrapper function for verify_sample to make it return the correct type
-        def verify_and_update():
-            result, status, _ = verify_sample()
-            return update_with_status(result)
+        def verify_and_update(session):
+            result, status, _ = verify_sample(session)
+            return update_with_status(session, result, include_image=False)
             
         verify_btn.click(
             verify_and_update,
-            inputs=[],
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            inputs=[session_state],
+            outputs=attribute_outputs
         )
         
+        # Rapid mode: hotkey buttons set one attribute, verify + next is a single round trip
+        for button, attr, value in hotkey_buttons:
+            button.click(
+                lambda session, attr=attr, value=value: apply_hotkey(session, attr, value),
+                inputs=[session_state],
+                outputs=[attribute_dropdowns[attr], status_text, issues_text, current_attrs]
+            )
+        verify_next_btn.click(verify_and_next, inputs=[session_state], outputs=sample_outputs)
+        
         # Unverify button shows confirmation
         unverify_btn.click(
             check_verified_status,
-            inputs=[],
+            inputs=[session_state],
             outputs=[unverify_confirm]
         ).then(
             lambda: (gr.update(visible=True), gr.update(visible=True)),
@@ -940,15 +1297,15 @@ def build_ui():
         )
         
         # Define a wrapper function for unmark_verified
-        def unmark_and_update():
-            result, _, _ = unmark_verified()
-            return update_with_status(result)
+        def unmark_and_update(session):
+            result, _, _ = unmark_verified(session)
+            return update_with_status(session, result, include_image=False)
             
         # Confirm or cancel buttons
         confirm_yes_btn.click(
             unmark_and_update,
-            inputs=[],
-            outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs]
+            inputs=[session_state],
+            outputs=attribute_outputs
         ).then(
             lambda: (gr.update(visible=False), gr.update(visible=False)),
             inputs=[],
@@ -956,13 +1313,13 @@ def build_ui():
         )
         
         # Function to cancel unverify operation
-        def cancel_unverify():
+        def cancel_unverify(session):
             # Return status with the cancellation message preserved
-            return update_with_status("Unmarking cancelled")[1]
+            return update_with_status(session, "Unmarking cancelled")[1]
         
         confirm_no_btn.click(
             cancel_unverify,
-            inputs=[],
+            inputs=[session_state],
             outputs=[status_text]
         ).then(
             lambda: (gr.update(visible=False), gr.update(visible=False)),
@@ -971,12 +1328,37 @@ def build_ui():
         )
         
         export_stats_btn.click(export_statistics, inputs=[], outputs=[export_result])
+        export_json_btn.click(export_verified_files, inputs=[], outputs=[export_result])
+        export_packed_btn.click(export_packed_dataset, inputs=[packed_format], outputs=[export_result])
+        export_shards_btn.click(export_training_shards, inputs=[], outputs=[export_result])
+        
+        # Gallery handlers
+        gallery_page_outputs = [gallery_display, gallery_info, gallery_selection]
+        gallery_load_btn.click(lambda session: show_gallery_page(session, session.gallery_page), inputs=[session_state], outputs=gallery_page_outputs)
+        gallery_prev_btn.click(lambda session: show_gallery_page(session, session.gallery_page - 1), inputs=[session_state], outputs=gallery_page_outputs)
+        gallery_next_btn.click(lambda session: show_gallery_page(session, session.gallery_page + 1), inputs=[session_state], outputs=gallery_page_outputs)
+        gallery_display.select(toggle_gallery_selection, inputs=[session_state, gallery_selection], outputs=[gallery_selection])
+        gallery_approve_btn.click(
+            lambda session, selected: review_gallery_selection(session, selected, True),
+            inputs=[session_state, gallery_selection],
+            outputs=gallery_page_outputs + [gallery_result]
+        )
+        gallery_reject_btn.click(
+            lambda session, selected: review_gallery_selection(session, selected, False),
+            inputs=[session_state, gallery_selection],
+            outputs=gallery_page_outputs + [gallery_result]
+        )
+        
+        # Near-duplicate handlers
+        duplicates_find_btn.click(find_near_duplicates, inputs=[session_state], outputs=[duplicates_result])
+        duplicates_show_btn.click(show_duplicate_cluster, inputs=[session_state], outputs=sample_outputs)
+        duplicates_apply_btn.click(apply_to_duplicates, inputs=[session_state], outputs=[duplicates_result])
         
         # Add a function to update all attributes display
-        def refresh_attributes() -> str:
+        def refresh_attributes(session) -> str:
             """Return a formatted string of all current attributes"""
             attr_list = []
-            for key, value in current_data.items():
+            for key, value in session.current_data.items():
                 if key not in ["img_name", "width", "height"]:  # Skip metadata
                     attr_list.append(f"{key}: {value}")
             
@@ -986,13 +1368,26 @@ def build_ui():
         with gr.Row():
             refresh_btn = gr.Button("Refresh Attributes")
         
-        refresh_btn.click(get_formatted_attributes, inputs=[], outputs=[current_attrs])
+        refresh_btn.click(get_formatted_attributes, inputs=[session_state], outputs=[current_attrs])
         
         # Initialize the interface
-        app.load(update_with_status, inputs=[], outputs=[image_display, status_text, label, orientation, brand_name, vehicle_color, itype, vehicle_type, special_type, issues_text, verified_status, current_attrs])
+        app.load(update_with_status, inputs=[session_state], outputs=sample_outputs)
+        
+        # Install the rapid mode key listener in the browser
+        hotkeys = {key: f"aot-hotkey-{i}" for i, key in enumerate(RAPID_HOTKEYS)}
+        hotkeys.update({RAPID_VERIFY_NEXT_KEY: "aot-verify-next", RAPID_NEXT_KEY: "aot-next", RAPID_PREV_KEY: "aot-prev"})
+        # Gradio 4 renamed the load event's _js argument to js
+        js_arg = "js" if int(gr.__version__.split(".")[0]) >= 4 else "_js"
+        app.load(None, inputs=None, outputs=None, **{js_arg: get_hotkey_script(hotkeys)})
     
     return app
 
 if __name__ == "__main__":
     app = build_ui()
-    app.launch(share=False) 
\ No newline at end of file
+    if API_ENABLED:
+        # Serve the JSON API (see api.py) and the UI from one server
+        import uvicorn
+        from api import create_api
+        uvicorn.run(gr.mount_gradio_app(create_api(), app, path="/"), host=API_HOST, port=API_PORT)
+    else:
+        app.launch(share=False) 
\ No newline at end of file
@@ -0,0 +1,171 @@
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import (INPUT_DIR, OUTPUT_DIR, DRAFT_DIR, PROGRESS_FILE, STATS_CACHE_FILE, INDEX_CACHE_FILE,
+                    DRAFT_INDEX_CACHE_FILE)
+from data_handler import get_annotation_store
+from schema import get_schema
+from stats_engine import STATS_ATTRIBUTES, load_attribute_values
+
+# Attributes that can be queried
+INDEXED_ATTRIBUTES = STATS_ATTRIBUTES
+
+# One clause of a query: (attribute, operator, value), operator is "=" or "!="
+Clause = Tuple[str, str, str]
+
+_CLAUSE = re.compile(r'^\s*(\w+)\s*(!=|=)\s*(?:"([^"]*)"|\'([^\']*)\'|(.*?))\s*$')
+_AND = re.compile(r'\s+AND\s+|\s*&&?\s*', re.IGNORECASE)
+
+def parse_query(query: str) -> List[Clause]:
+    """Parse a query like 'label=Bus AND orientation!=Front'
+
+    Clauses are joined with AND (or &). Values may be quoted and are kept as
+    written, so non-standard values can be searched for; AttributeIndex.query
+    falls back to the standard spelling (e.g. bus -> Bus) for values no
+    sample has.
+
+    Raises:
+        ValueError: If the query is empty or a clause can't be parsed
+    """
+    clauses = []
+    for part in _AND.split(query.strip()):
+        if not part.strip():
+            continue
+        match = _CLAUSE.match(part)
+        if not match:
+            raise ValueError(f"Cannot parse '{part.strip()}', expected attribute=value or attribute!=value")
+        attr, op = match.group(1), match.group(2)
+        value = next(v for v in match.group(3, 4, 5) if v is not None)
+        if attr not in INDEXED_ATTRIBUTES:
+            raise ValueError(f"Unknown attribute '{attr}', queryable attributes: {', '.join(INDEXED_ATTRIBUTES)}")
+        clauses.append((attr, op, value))
+    if not clauses:
+        raise ValueError("Empty query")
+    return clauses
+
+class AttributeIndex:
+    """Inverted index from attribute values to the samples that have them
+
+    Holds, per attribute, value -> set of sample ids, plus each sample's
+    indexed values so an update only touches the postings that change.
+    Queries intersect the posting sets of their "=" clauses and subtract
+    those of their "!=" clauses. A value is matched as stored; only if no
+    sample has it is its standard spelling looked up instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, Set[str]]] = {attr: {} for attr in INDEXED_ATTRIBUTES}
+        self._values: Dict[str, Dict[str, str]] = {}
+
+    def update(self, sample_id: str, data: Dict) -> None:
+        """Index a sample's current annotation, replacing what was indexed before"""
+        new_values = {attr: str(data[attr]) for attr in INDEXED_ATTRIBUTES if data.get(attr) is not None}
+        with self._lock:
+            old_values = self._values.get(sample_id, {})
+            for attr in INDEXED_ATTRIBUTES:
+                old, new = old_values.get(attr), new_values.get(attr)
+                if old == new:
+                    continue
+                postings = self._postings[attr]
+                if old is not None:
+                    postings[old].discard(sample_id)
+                    if not postings[old]:
+                        del postings[old]
+                if new is not None:
+                    postings.setdefault(new, set()).add(sample_id)
+            self._values[sample_id] = new_values
+
+    def remove(self, sample_id: str) -> None:
+        """Drop a sample from the index"""
+        self.update(sample_id, {})
+        with self._lock:
+            self._values.pop(sample_id, None)
+
+    def value(self, sample_id: str, attribute: str) -> Optional[str]:
+        """Indexed value of one attribute of a sample"""
+        with self._lock:
+            return self._values.get(sample_id, {}).get(attribute)
+
+    def count(self, attribute: str, value: str) -> int:
+        """Number of samples with attribute == value"""
+        with self._lock:
+            return len(self._postings.get(attribute, {}).get(value, ()))
+
+    def values(self, attribute: str) -> List[str]:
+        """Indexed values of an attribute, most common first"""
+        with self._lock:
+            postings = self._postings.get(attribute, {})
+            return sorted(postings, key=lambda v: -len(postings[v]))
+
+    def _matching(self, attr: str, value: str) -> Set[str]:
+        # Caller holds the lock
+        postings = self._postings[attr]
+        if value in postings:
+            return postings[value]
+        schema = get_schema(attr)
+        canonical = schema.canonical(value) if schema is not None else None
+        return postings.get(canonical, set())
+
+    def query(self, clauses: List[Clause]) -> Set[str]:
+        """Sample ids matching all clauses"""
+        with self._lock:
+            positive = [self._matching(attr, value) for attr, op, value in clauses if op == "="]
+            negative = [self._matching(attr, value) for attr, op, value in clauses if op == "!="]
+            if positive:
+                # Start from the smallest set so the intersections stay cheap
+                positive.sort(key=len)
+                result = set(positive[0])
+                for postings in positive[1:]:
+                    result &= postings
+            else:
+                result = set(self._values)
+            for postings in negative:
+                result -= postings
+            return result
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+def build_attribute_index() -> AttributeIndex:
+    """Index the current annotation of every sample
+
+    Saved copies (verified output, drafts, or the SQLite store) take
+    precedence over the input files. File values come from stats_engine's
+    per-file caches, so rebuilding only parses files that changed.
+    """
+    index = AttributeIndex()
+    values, _ = load_attribute_values(INPUT_DIR, cache_file=INDEX_CACHE_FILE)
+    saved: Dict[str, Dict[str, str]] = {}
+    store = get_annotation_store()
+    if store is not None:
+        saved = {os.path.basename(s): v for s, v in store.attribute_values(INDEXED_ATTRIBUTES).items()}
+    else:
+        if os.path.isdir(DRAFT_DIR):
+            saved, _ = load_attribute_values(DRAFT_DIR, cache_file=DRAFT_INDEX_CACHE_FILE)
+        if os.path.isdir(OUTPUT_DIR):
+            verified, _ = load_attribute_values(OUTPUT_DIR, exclude=(os.path.basename(PROGRESS_FILE),),
+                                                cache_file=STATS_CACHE_FILE)
+            saved.update(verified)
+
+    for name, sample_values in values.items():
+        index.update(os.path.join(INPUT_DIR, name), saved.get(name, sample_values))
+    return index
+
+_attribute_index: Optional[AttributeIndex] = None
+_index_lock = threading.Lock()
+
+def get_attribute_index() -> AttributeIndex:
+    """Get the process-wide attribute index, building it on first use"""
+    global _attribute_index
+    with _index_lock:
+        if _attribute_index is None:
+            _attribute_index = build_attribute_index()
+        return _attribute_index
+
+def update_attribute_index(sample_id: str, data: Dict) -> None:
+    """Keep the index in step with an edit; a no-op until the index has been built"""
+    if _attribute_index is not None:
+        _attribute_index.update(sample_id, data)
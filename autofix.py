@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Bulk auto-fix for AOT (AttributeannOtationTool)
+Applies the suggest_fixes rules (e.g. Maruthi -> Maruti-Suzuki, Grey -> Gray)
+to every input JSON and writes corrected copies to the output directory.
+Original files are never modified. Corrections to samples that are not
+verified yet are saved as drafts, so they don't count as verified.
+
+Usage:
+    python autofix.py [--dry-run] [--workers N] [--output-dir DIR]
+"""
+
+import os
+import sys
+import json
+import difflib
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+from config import INPUT_DIR, OUTPUT_DIR, AUTOFIX_CACHE_FILE
+from data_handler import (load_json_data, save_json_data, save_verified_data, save_draft_data,
+                          get_annotation_store, get_output_path, get_draft_path, is_verified)
+from validation import suggest_fixes
+from batch import iter_json_files, FileResultCache, run_parallel
+
+def apply_fixes(data: Dict) -> Tuple[Dict, Dict[str, Tuple[str, str]]]:
+    """Apply all suggested fixes to a copy of data
+
+    Returns:
+        The fixed data and the applied changes as {attr: (old, new)}
+    """
+    fixed = dict(data)
+    changes = {}
+    for attr, value in suggest_fixes(data).items():
+        changes[attr] = (data.get(attr), value)
+        fixed[attr] = value
+    return fixed, changes
+
+def fix_file(args: Tuple[str, List[str]]) -> Tuple[str, Dict, Optional[Dict]]:
+    """Worker: compute the fixed version of one sample
+
+    An existing copy (the first of the given paths that exists) takes
+    precedence over the input file so annotators' edits are kept;
+    re-running over already fixed data finds nothing to change.
+
+    Returns:
+        (input path, current data, fixed data or None if nothing to fix)
+    """
+    path, copies = args
+    existing = [copy_path for copy_path in copies if os.path.exists(copy_path)]
+    data = load_json_data(existing[0] if existing else path)
+    fixed, changes = apply_fixes(data)
+    return path, data, fixed if changes else None
+
+def format_diff(path: str, before: Dict, after: Dict) -> str:
+    """Unified diff between two versions of a sample"""
+    name = os.path.basename(path)
+    return "".join(difflib.unified_diff(
+        (json.dumps(before, indent=4) + "\n").splitlines(keepends=True),
+        (json.dumps(after, indent=4) + "\n").splitlines(keepends=True),
+        fromfile=f"a/{name}", tofile=f"b/{name}"))
+
+def main():
+    """Main auto-fix function"""
+    parser = argparse.ArgumentParser(description="Apply known attribute fixes to every input sample")
+    parser.add_argument("--input-dir", default=INPUT_DIR, help="Directory with the original samples")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Directory for corrected copies")
+    parser.add_argument("--dry-run", action="store_true", help="Print a diff of the fixes without writing anything")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-check every file, ignoring the cache")
+    args = parser.parse_args()
+
+    # Corrected copies for the configured output directory go through the
+    # storage backend: verified samples get their verified copy fixed, the
+    # others a draft (in the SQLite store when that is enabled)
+    managed = os.path.abspath(args.output_dir) == os.path.abspath(OUTPUT_DIR)
+    store = get_annotation_store() if managed else None
+    cache = FileResultCache(None if args.no_cache or args.dry_run else AUTOFIX_CACHE_FILE)
+
+    def copies(path: str) -> List[str]:
+        if managed:
+            return [get_output_path(path), get_draft_path(path)]
+        return [os.path.join(args.output_dir, os.path.basename(path))]
+
+    files = sorted(iter_json_files([args.input_dir]))
+    to_check = []
+    for path, mtime, size in files:
+        result = cache.get(path, mtime, size)
+        # A fix is only still in place while its corrected copy exists
+        if result == "clean" or (result == "fixed" and (store is not None or any(
+                os.path.exists(copy_path) for copy_path in copies(path)))):
+            continue
+        to_check.append(path)
+
+    print(f"Checking {len(to_check)} files ({len(files) - len(to_check)} unchanged since last run)...")
+    fingerprints = {path: (mtime, size) for path, mtime, size in files}
+    fixed_count = 0
+    for path, data, fixed in run_parallel(fix_file, [(p, copies(p)) for p in to_check], workers=args.workers):
+        if store is not None:
+            stored = store.load_annotation(path)
+            if stored is not None:
+                data = stored
+                fixed, changes = apply_fixes(stored)
+                fixed = fixed if changes else None
+
+        if fixed is None:
+            cache.put(path, *fingerprints[path], "clean")
+            continue
+
+        fixed_count += 1
+        if args.dry_run:
+            sys.stdout.write(format_diff(path, data, fixed))
+            continue
+
+        if managed and is_verified(path):
+            save_verified_data(path, fixed)
+        elif managed:
+            save_draft_data(path, fixed)
+        else:
+            save_json_data(fixed, os.path.join(args.output_dir, os.path.basename(path)))
+        cache.put(path, *fingerprints[path], "fixed")
+
+    cache.prune(fingerprints)
+    cache.save()
+
+    action = "would be fixed" if args.dry_run else "fixed"
+    print(f"{fixed_count} of {len(to_check)} checked files {action}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
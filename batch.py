@@ -0,0 +1,86 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import PROGRESS_FILE
+
+def iter_json_files(directories: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+    """Yield (path, mtime_ns, size) for every sample JSON in the directories
+
+    Hidden files and the progress file are skipped. Directories that don't
+    exist are ignored.
+    """
+    skip = os.path.basename(PROGRESS_FILE)
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.endswith('.json') or name.startswith('.') or name == skip:
+                    continue
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                yield entry.path, st.st_mtime_ns, st.st_size
+
+class FileResultCache:
+    """Results per file, valid as long as the file's mtime and size don't change
+
+    Stored as one JSON object {path: [mtime_ns, size, result]}.
+    """
+
+    def __init__(self, cache_file: Optional[str]):
+        self.cache_file = cache_file
+        self._entries: Dict[str, list] = {}
+        self._dirty = False
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def get(self, path: str, mtime: int, size: int) -> Optional[Any]:
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == mtime and entry[1] == size:
+            return entry[2]
+        return None
+
+    def put(self, path: str, mtime: int, size: int, result: Any) -> None:
+        self._entries[path] = [mtime, size, result]
+        self._dirty = True
+
+    def prune(self, keep: Iterable[str]) -> None:
+        """Forget files that no longer exist"""
+        keep = set(keep)
+        for path in [p for p in self._entries if p not in keep]:
+            del self._entries[path]
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self.cache_file or not self._dirty:
+            return
+        tmp_path = self.cache_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.cache_file)
+        self._dirty = False
+
+def run_parallel(func: Callable[[str], Any], paths: List[str], workers: Optional[int] = None,
+                 chunk_size: int = 64) -> Iterator[Any]:
+    """Apply func to every path on a process pool, yielding results in order
+
+    Results stream back as chunks complete, so callers can write them out
+    without holding the whole dataset in memory. func must be a module-level
+    function so it can be sent to worker processes.
+    """
+    if workers == 1 or len(paths) <= chunk_size:
+        for path in paths:
+            yield func(path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(func, paths, chunksize=chunk_size):
+            yield result
@@ -33,4 +33,147 @@ VEHICLE_SPECIAL_TYPES = ["Army_Vehicle", "Ambulance", "Graminseva_4wheeler",
                         "Graminseva_3wheeler", "Campervan", "None of the above"]
 
 # Progress tracking
-PROGRESS_FILE = os.path.join(OUTPUT_DIR, "verification_progress.json") 
\ No newline at end of file
+PROGRESS_FILE = os.path.join(OUTPUT_DIR, "verification_progress.json")
+
+# Append-only log of verify/unverify events, folded into PROGRESS_FILE every
+# PROGRESS_COMPACT_EVERY events
+PROGRESS_JOURNAL_FILE = os.path.join(OUTPUT_DIR, "verification_progress.journal")
+PROGRESS_COMPACT_EVERY = 1000
+PROGRESS_FSYNC = True
+# 0 fsyncs every journal append; a positive value fsyncs at most once per
+# that many seconds (appends in between are synced by a timer)
+PROGRESS_FSYNC_INTERVAL = 0.0
+# Seconds between checks for progress other processes journaled; reads in
+# between are answered from memory (0 checks on every read)
+PROGRESS_SYNC_INTERVAL = 1.0
+
+# fsync JSON files before renaming them into place. Writes are atomic either
+# way; fsync also protects them against power loss
+JSON_FSYNC = False
+
+# Decoded image cache and background prefetch of neighbouring samples
+IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PREFETCH_RADIUS = 3
+PREFETCH_WORKERS = 2
+
+# Images are scaled so their longest edge is at most DISPLAY_MAX_EDGE before
+# being sent to the browser (None disables downscaling). Scaled copies are
+# cached on disk in THUMBNAIL_DIR.
+DISPLAY_MAX_EDGE = 1024
+THUMBNAIL_DIR = os.path.join(OUTPUT_DIR, ".thumbnails")
+
+# Minimum number of seconds between checks of INPUT_DIR for added/removed samples
+CATALOG_REFRESH_INTERVAL = 2.0
+
+# Storage backend for verification progress and verified annotations:
+# "json" writes one file per verified sample to OUTPUT_DIR, "sqlite" keeps
+# everything in SQLITE_DB_FILE and exports the JSON layout on demand
+STORAGE_BACKEND = "json"
+SQLITE_DB_FILE = os.path.join(OUTPUT_DIR, "annotations.db")
+
+# Corrections to samples that are not verified yet (autofix.py, API updates
+# without verify). Kept out of the verified output so stats and exports only
+# see verified samples; the SQLite backend stores them on the pending sample
+DRAFT_DIR = os.path.join(OUTPUT_DIR, "drafts")
+
+# Seconds after which an annotator's claim on the sample they have open expires
+CLAIM_TTL_SECONDS = 15 * 60
+
+# Dataset statistics: per-file cache of parsed attribute values, worker
+# processes (None = one per CPU) and files parsed per work item
+STATS_CACHE_FILE = os.path.join(OUTPUT_DIR, ".stats_cache")
+STATS_WORKERS = None
+STATS_CHUNK_SIZE = 500
+
+# How export_dataset_stats computes the JSON backend's statistics: "engine"
+# counts with stats_engine, "pandas" uses the cached categorical DataFrame in
+# analytics.py (ANALYTICS_FRAME_FILE, extension added by format)
+STATS_MODE = "engine"
+ANALYTICS_FRAME_FILE = os.path.join(OUTPUT_DIR, ".analytics_frame")
+
+# Per-file results of validate_dataset.py, reused until a file changes
+VALIDATION_CACHE_FILE = os.path.join(OUTPUT_DIR, ".validation_cache")
+
+# Per-file results of autofix.py ("clean"/"fixed"), reused until an input file changes
+AUTOFIX_CACHE_FILE = os.path.join(OUTPUT_DIR, ".autofix_cache")
+
+# Optional JSON or YAML file with attribute options and aliases, e.g.
+# {"attributes": {"brand_name": {"options": [...], "aliases": {"Maruthi": "Maruti-Suzuki"}}}}
+# Attributes defined there replace the built-in lists above
+ATTRIBUTE_SCHEMA_FILE = None
+
+# Rapid annotation mode: single-key shortcuts, active while the mode is
+# switched on and no text field has focus. Keys follow JavaScript's KeyboardEvent.key
+RAPID_HOTKEYS = {
+    "1": ("label", "Car"),
+    "2": ("label", "Motorbike"),
+    "3": ("label", "Bus"),
+    "4": ("label", "Truck"),
+    "5": ("label", "E-Rikshaw"),
+    "q": ("orientation", "Front"),
+    "w": ("orientation", "Back"),
+    "e": ("orientation", "Side"),
+}
+RAPID_VERIFY_NEXT_KEY = "Enter"
+RAPID_NEXT_KEY = "ArrowRight"
+RAPID_PREV_KEY = "ArrowLeft"
+
+# Gallery view for bulk verification: samples per page and thumbnail size
+GALLERY_PAGE_SIZE = 24
+GALLERY_THUMB_EDGE = 256
+
+# Per-file cache of input attribute values for the query index
+INDEX_CACHE_FILE = os.path.join(OUTPUT_DIR, ".index_cache")
+DRAFT_INDEX_CACHE_FILE = os.path.join(OUTPUT_DIR, ".draft_index_cache")
+
+# JSON library for annotation I/O: "auto" uses orjson or ujson when
+# installed, otherwise the standard json module
+JSON_LIBRARY = "auto"
+# Write output JSON without indentation (smaller, faster; for machine consumption)
+JSON_COMPACT = False
+
+# The UI queues verified-output and progress writes and a background thread
+# applies them every WRITE_BEHIND_INTERVAL seconds (and on navigation and
+# exit), coalescing repeated writes of a sample. 0 writes synchronously
+WRITE_BEHIND_INTERVAL = 2.0
+
+# Model-assisted pre-annotation of pending samples: None disables it, "stub"
+# uses a simple colour heuristic for trying the workflow, otherwise the path
+# of an ONNX classifier whose per-attribute class names are listed in
+# PREANNOTATION_LABELS_FILE (needs onnxruntime)
+PREANNOTATION_MODEL = None
+PREANNOTATION_LABELS_FILE = None
+PREANNOTATION_INPUT_SIZE = 224
+PREANNOTATION_BATCH_SIZE = 32
+# Predictions below this confidence are not prefilled into the dropdowns
+PREANNOTATION_MIN_CONFIDENCE = 0.5
+PREANNOTATION_CACHE_FILE = os.path.join(OUTPUT_DIR, ".predictions")
+# Seconds between saves of the prediction cache while the worker runs (it is
+# also saved when the run ends)
+PREANNOTATION_CACHE_SAVE_INTERVAL = 30.0
+
+# Default order of "Schedule Pending": "uncertainty" (model pre-annotation),
+# "rare" (least common labels first) or "stratified" (even progress per label)
+WORK_QUEUE_PRIORITY = "stratified"
+
+# Near-duplicate detection: 64-bit dHashes of the input images (cached per
+# file), grouped when at most DUPLICATE_MAX_DISTANCE bits differ
+DUPLICATE_HASH_CACHE_FILE = os.path.join(OUTPUT_DIR, ".dhash_cache")
+DUPLICATE_MAX_DISTANCE = 6
+DUPLICATE_WORKERS = None
+
+# Headless JSON API (api.py, needs fastapi and uvicorn). With API_ENABLED,
+# app.py serves it under /api next to the UI on API_HOST:API_PORT
+API_ENABLED = False
+API_HOST = "127.0.0.1"
+API_PORT = 7860
+# Worker threads for API requests, and the largest page of the sample listing
+API_THREADS = 40
+API_MAX_PAGE_SIZE = 1000
+
+# Training export (export_shards.py): samples per WebDataset tar shard,
+# share of each label held out for validation, split seed and parallel writers
+EXPORT_SHARD_SIZE = 1000
+EXPORT_VAL_FRACTION = 0.1
+EXPORT_SPLIT_SEED = "aot"
+EXPORT_WORKERS = 4
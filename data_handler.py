@@ -1,14 +1,35 @@
 import os
-import json
-import glob
-from typing import Dict, List, Tuple, Optional
+import atexit
+import threading
+from typing import Dict, Iterator, List, Tuple, Optional, Union
 import shutil
-from config import INPUT_DIR, OUTPUT_DIR, PROGRESS_FILE
+from config import (INPUT_DIR, OUTPUT_DIR, PROGRESS_FILE, PROGRESS_JOURNAL_FILE,
+                    PROGRESS_COMPACT_EVERY, PROGRESS_FSYNC, PROGRESS_FSYNC_INTERVAL, PROGRESS_SYNC_INTERVAL,
+                    JSON_FSYNC, CATALOG_REFRESH_INTERVAL, DRAFT_DIR,
+                    STORAGE_BACKEND, SQLITE_DB_FILE, STATS_MODE, WRITE_BEHIND_INTERVAL)
+from progress_store import ProgressStore
+from write_behind import WriteBehindBuffer
+import json_codec
+from sample_catalog import SampleCatalog
+from sqlite_store import SQLiteAnnotationStore
+from stats_engine import compute_attribute_stats, STATS_ATTRIBUTES, CROSS_TABS
+from analytics import load_annotation_frame, compute_frame_stats
+
+_sample_catalog = None
+
+def get_sample_catalog() -> SampleCatalog:
+    """Get the process-wide catalog of samples in the input directory"""
+    global _sample_catalog
+    if _sample_catalog is None:
+        _sample_catalog = SampleCatalog(INPUT_DIR, refresh_interval=CATALOG_REFRESH_INTERVAL)
+    return _sample_catalog
 
 def get_all_samples() -> List[str]:
-    """Get all JSON files from input directory"""
-    json_files = glob.glob(os.path.join(INPUT_DIR, "*.json"))
-    return sorted(json_files)
+    """Get all JSON files from input directory
+    
+    The list comes from the cached catalog and is shared, do not modify it.
+    """
+    return get_sample_catalog().samples()
 
 def get_image_path(json_path: str) -> str:
     """Get the corresponding image path for a JSON file"""
@@ -19,15 +40,38 @@ def get_image_path(json_path: str) -> str:
 def load_json_data(json_path: str) -> Dict:
     """Load JSON data from file"""
     try:
-        with open(json_path, 'r') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
+        return json_codec.load_file(json_path)
+    except ValueError:
         # Return empty dict if JSON is invalid
         return {}
 
+def _write_temp_json(data: Dict, target_path: str) -> str:
+    """Write JSON data to a temporary file next to target_path, returns its path
+    
+    The name is hidden and unique per process and thread, so concurrent
+    writers and the directory scanners never pick it up.
+    """
+    directory, name = os.path.split(target_path)
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            # Indented for readability unless JSON_COMPACT is set
+            f.write(json_codec.dumps(data))
+            f.flush()
+            if JSON_FSYNC:
+                os.fsync(f.fileno())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path
+
 def save_json_data(data: Dict, target_path: str) -> str:
     """Save JSON data to the specified path
     
+    The data is written to a temporary file that is then renamed over the
+    target, so readers and crashes never see a partially written file.
+    
     Args:
         data: The JSON data to save
         target_path: Path where to save the data
@@ -38,83 +82,379 @@ def save_json_data(data: Dict, target_path: str) -> str:
     # Create parent directory if it doesn't exist
     os.makedirs(os.path.dirname(target_path), exist_ok=True)
     
-    # Write the data to the file
-    with open(target_path, 'w') as f:
-        json.dump(data, f, indent=4)  # Add indentation for better readability
-    
+    os.replace(_write_temp_json(data, target_path), target_path)
     return target_path
 
-def load_progress() -> Dict:
-    """Load verification progress"""
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {"verified": [], "pending": get_all_samples()}
+_progress_store = None
+
+def _json_progress_store() -> ProgressStore:
+    store = ProgressStore(PROGRESS_FILE, get_all_samples,
+                          journal_file=PROGRESS_JOURNAL_FILE,
+                          compact_every=PROGRESS_COMPACT_EVERY,
+                          fsync=PROGRESS_FSYNC,
+                          fsync_interval=PROGRESS_FSYNC_INTERVAL,
+                          sync_interval=PROGRESS_SYNC_INTERVAL)
+    # Don't leave batched journal appends unsynced at shutdown
+    atexit.register(store.sync)
+    return store
+
+def get_progress_store() -> Union[ProgressStore, SQLiteAnnotationStore]:
+    """Get the process-wide progress store for the configured backend, loading it on first use"""
+    global _progress_store
+    if _progress_store is None:
+        if STORAGE_BACKEND == "sqlite":
+            # A fresh database imports whatever the JSON progress file already
+            # tracks, along with the verified JSON files in the output directory
+            _progress_store = SQLiteAnnotationStore(SQLITE_DB_FILE, get_all_samples,
+                                                    initial_progress=lambda: _json_progress_store().as_dict(),
+                                                    initial_annotation=_load_output_json)
+        else:
+            _progress_store = _json_progress_store()
+    return _progress_store
+
+def _load_output_json(sample_id: str) -> Optional[Dict]:
+    """The verified JSON file a sample has in the output directory, None if it has none"""
+    output_path = get_output_path(sample_id)
+    if not os.path.exists(output_path):
+        return None
+    return load_json_data(output_path) or None
+
+def get_annotation_store() -> Optional[SQLiteAnnotationStore]:
+    """Get the SQLite annotation store, or None when using the JSON backend"""
+    store = get_progress_store()
+    return store if isinstance(store, SQLiteAnnotationStore) else None
+
+def get_output_path(sample_id: str) -> str:
+    """Get the path of the verified JSON file for a sample"""
+    return os.path.join(OUTPUT_DIR, os.path.basename(sample_id))
+
+def get_draft_path(sample_id: str) -> str:
+    """Get the path of the draft JSON file for a sample"""
+    return os.path.join(DRAFT_DIR, os.path.basename(sample_id))
+
+_write_buffer = None
+
+def start_write_behind(interval: float = WRITE_BEHIND_INTERVAL) -> Optional[WriteBehindBuffer]:
+    """Queue verified-output and progress writes in a background write-behind buffer
+    
+    Started by the UI so that clicks never wait on disk; the batch tools
+    don't start it and keep writing synchronously. A non-positive interval
+    leaves writes synchronous.
+    """
+    global _write_buffer
+    if _write_buffer is None and interval > 0:
+        # Load the store first: its shutdown sync then runs after the final flush
+        get_progress_store()
+        _write_buffer = WriteBehindBuffer(_apply_writes, interval)
+        _write_buffer.start()
+        atexit.register(_write_buffer.close)
+    return _write_buffer
+
+def flush_writes(wait: bool = True) -> None:
+    """Write out queued changes, or with wait=False only ask the writer thread to"""
+    if _write_buffer is None:
+        return
+    if wait:
+        _write_buffer.flush()
     else:
-        # Initialize with all samples as pending
-        return {"verified": [], "pending": get_all_samples()}
+        _write_buffer.request_flush()
+
+def get_write_status() -> str:
+    """Flush state of the write-behind buffer for the UI, empty when writes are synchronous"""
+    return _write_buffer.status_text() if _write_buffer is not None else ""
+
+def _save_json_files(annotations: Dict[str, Dict]) -> None:
+    """Write verified JSON files so that either all or none of them are replaced
+    
+    Every file is first written to a temporary file next to its target;
+    only once all of them were written are they renamed into place.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    staged = []
+    try:
+        for sample_id, data in annotations.items():
+            target_path = get_output_path(sample_id)
+            staged.append((_write_temp_json(data, target_path), target_path))
+    except Exception:
+        for tmp_path, _ in staged:
+            os.remove(tmp_path)
+        raise
+    
+    for tmp_path, target_path in staged:
+        os.replace(tmp_path, target_path)
+    for sample_id in annotations:
+        _delete_draft(sample_id)
+
+def _apply_writes(annotations: Dict[str, Optional[Dict]], statuses: Dict[str, bool]) -> None:
+    """Apply a batch from the write-behind buffer: output files first, then progress"""
+    store = get_annotation_store()
+    saves = {sample_id: data for sample_id, data in annotations.items() if data is not None}
+    for sample_id, data in annotations.items():
+        if data is None:
+            _delete_verified_now(sample_id)
+    if store is not None:
+        for sample_id, data in saves.items():
+            store.save_annotation(sample_id, data)
+    elif saves:
+        _save_json_files(saves)
+    
+    progress = get_progress_store()
+    verified = [sample_id for sample_id, status in statuses.items() if status]
+    pending = [sample_id for sample_id, status in statuses.items() if not status]
+    if verified:
+        progress.mark_verified_many(verified)
+    if pending:
+        progress.mark_pending_many(pending)
+
+def save_verified_data(sample_id: str, data: Dict) -> str:
+    """Save the verified annotation of a sample to the configured backend
+    
+    Returns:
+        str: Where the data was (or, with write-behind, will be) saved
+    """
+    store = get_annotation_store()
+    if _write_buffer is not None:
+        _write_buffer.put({sample_id: data})
+    elif store is not None:
+        store.save_annotation(sample_id, data)
+    else:
+        save_json_data(data, get_output_path(sample_id))
+        _delete_draft(sample_id)
+    return store.db_file if store is not None else get_output_path(sample_id)
+
+def load_verified_data(sample_id: str) -> Optional[Dict]:
+    """Load the verified annotation of a sample, or None if there is none"""
+    if _write_buffer is not None:
+        queued, data = _write_buffer.annotation(sample_id)
+        if queued:
+            return data
+    store = get_annotation_store()
+    if store is not None:
+        # Pending samples may have data too: their drafts
+        return store.load_annotation(sample_id, status="verified")
+    output_path = get_output_path(sample_id)
+    if os.path.exists(output_path):
+        return load_json_data(output_path)
+    return None
+
+def save_draft_data(sample_id: str, data: Dict) -> str:
+    """Save corrections to a sample that is not verified yet
+    
+    Drafts never count as verified: with the JSON backend they go to
+    DRAFT_DIR instead of the output directory, with the SQLite backend they
+    are stored on the still pending sample. Verifying the sample replaces
+    its draft.
+    
+    Returns:
+        str: Where the data was saved
+    """
+    store = get_annotation_store()
+    if store is not None:
+        store.save_annotation(sample_id, data, action="draft")
+        return store.db_file
+    return save_json_data(data, get_draft_path(sample_id))
+
+def load_draft_data(sample_id: str) -> Optional[Dict]:
+    """Load the draft of a sample, or None if there is none"""
+    store = get_annotation_store()
+    if store is not None:
+        return store.load_annotation(sample_id, status="pending")
+    draft_path = get_draft_path(sample_id)
+    if os.path.exists(draft_path):
+        return load_json_data(draft_path)
+    return None
+
+def _delete_draft(sample_id: str) -> None:
+    draft_path = get_draft_path(sample_id)
+    if os.path.exists(draft_path):
+        os.remove(draft_path)
+
+def delete_verified_data(sample_id: str) -> bool:
+    """Delete the verified annotation of a sample, returns True if one existed"""
+    if _write_buffer is not None:
+        existed = load_verified_data(sample_id) is not None
+        _write_buffer.put({sample_id: None})
+        return existed
+    return _delete_verified_now(sample_id)
+
+def _delete_verified_now(sample_id: str) -> bool:
+    store = get_annotation_store()
+    if store is not None:
+        return store.delete_annotation(sample_id)
+    output_path = get_output_path(sample_id)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+        return True
+    return False
+
+def save_verified_batch(annotations: Dict[str, Dict]) -> int:
+    """Save several verified annotations and mark them verified as one commit
+    
+    With the SQLite backend this is a single transaction. With the JSON
+    backend all files are replaced together and the whole batch recorded
+    with one progress journal write, so a failure part-way leaves neither
+    output files nor progress changes behind. With write-behind the batch
+    is queued and later applied the same way.
+    
+    Args:
+        annotations: sample id -> annotation to save
+        
+    Returns:
+        int: The number of samples that were not verified before
+    """
+    if _write_buffer is not None:
+        newly_verified = sum(1 for sample_id in annotations if not is_verified(sample_id))
+        _write_buffer.put(annotations, {sample_id: True for sample_id in annotations})
+        return newly_verified
+    
+    store = get_annotation_store()
+    if store is not None:
+        return store.verify_annotations(annotations)
+    
+    _save_json_files(annotations)
+    return get_progress_store().mark_verified_many(annotations)
+
+def reject_verified_batch(sample_ids: List[str]) -> int:
+    """Move several samples back to pending, removing their verified copies
+    
+    Returns:
+        int: The number of samples that were verified before
+    """
+    verified = [s for s in sample_ids if is_verified(s)]
+    if _write_buffer is not None:
+        _write_buffer.put({s: None for s in verified}, {s: False for s in sample_ids})
+        return len(verified)
+    
+    for sample_id in verified:
+        delete_verified_data(sample_id)
+    get_progress_store().mark_pending_many(sample_ids)
+    return len(verified)
+
+def export_verified_json(output_dir: str = OUTPUT_DIR) -> int:
+    """Write verified annotations as one JSON file per sample
+    
+    With the JSON backend the files are already there and this only counts
+    them; with the SQLite backend they are exported from the database.
+    """
+    flush_writes()
+    store = get_annotation_store()
+    if store is not None:
+        return store.export_json(output_dir)
+    
+    verified_files = [f for f in os.listdir(OUTPUT_DIR) if f.endswith('.json') and f != os.path.basename(PROGRESS_FILE)]
+    if os.path.abspath(output_dir) != os.path.abspath(OUTPUT_DIR):
+        os.makedirs(output_dir, exist_ok=True)
+        for file_name in verified_files:
+            shutil.copy2(os.path.join(OUTPUT_DIR, file_name), os.path.join(output_dir, file_name))
+    return len(verified_files)
+
+def iter_verified_annotations() -> Iterator[Tuple[str, Dict]]:
+    """Yield (file name, annotation) for every verified sample, loading one at a time"""
+    flush_writes()
+    for sample_id in get_progress_store().as_dict()["verified"]:
+        data = load_verified_data(sample_id)
+        if data is not None:
+            yield os.path.basename(sample_id), data
+
+def get_sample_page(status: str, offset: int, limit: int) -> List[str]:
+    """A page of the "verified" or "pending" sample ids, in the progress store's order"""
+    flush_writes()
+    return get_progress_store().page_ids(status, offset, limit)
+
+def export_packed(output_path: str, fmt: str = "jsonl") -> int:
+    """Export all verified annotations to a single packed file
+    
+    Args:
+        output_path: Target file
+        fmt: A json_codec.PACKED_FORMATS name ("jsonl" or "msgpack")
+        
+    Returns:
+        int: The number of samples exported
+    """
+    _, writer = json_codec.PACKED_FORMATS[fmt]
+    records = iter_verified_annotations()
+    
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    count = writer(tmp_path, records)
+    os.replace(tmp_path, output_path)
+    return count
+
+def load_progress() -> Dict:
+    """Load verification progress
+    
+    Returns a copy of the in-memory progress; prefer is_verified() and
+    get_verification_stats() when only membership or counts are needed.
+    """
+    flush_writes()
+    return get_progress_store().as_dict()
 
 def save_progress(progress: Dict) -> None:
     """Save verification progress"""
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f)
+    flush_writes()
+    get_progress_store().replace(progress)
+
+def is_verified(sample_id: str) -> bool:
+    """Check whether a sample is marked as verified"""
+    if _write_buffer is not None:
+        status = _write_buffer.status(sample_id)
+        if status is not None:
+            return status
+    return get_progress_store().is_verified(sample_id)
 
 def mark_as_verified(sample_id: str) -> None:
     """Mark a sample as verified in the progress tracker"""
-    progress = load_progress()
-    
-    if sample_id in progress["pending"]:
-        progress["pending"].remove(sample_id)
-        
-    if sample_id not in progress["verified"]:
-        progress["verified"].append(sample_id)
-    
-    save_progress(progress)
+    if _write_buffer is not None:
+        _write_buffer.put(statuses={sample_id: True})
+    else:
+        get_progress_store().mark_verified(sample_id)
+
+def mark_as_pending(sample_id: str) -> None:
+    """Move a sample from verified back to pending in the progress tracker"""
+    if _write_buffer is not None:
+        _write_buffer.put(statuses={sample_id: False})
+    else:
+        get_progress_store().mark_pending(sample_id)
+
+def get_verified_count() -> int:
+    """Number of verified samples, counting queued changes"""
+    store = get_progress_store()
+    verified = store.verified_count()
+    if _write_buffer is not None:
+        for sample_id, status in _write_buffer.statuses().items():
+            if status != store.is_verified(sample_id):
+                verified += 1 if status else -1
+    return verified
 
 def get_verification_stats() -> Dict:
     """Get verification statistics"""
-    progress = load_progress()
-    total = len(progress["verified"]) + len(progress["pending"])
+    store = get_progress_store()
+    verified = get_verified_count()
+    total = store.verified_count() + store.pending_count()
     
     return {
         "total": total,
-        "verified": len(progress["verified"]),
-        "pending": len(progress["pending"]),
-        "progress_percentage": (len(progress["verified"]) / total * 100) if total > 0 else 0
+        "verified": verified,
+        "pending": total - verified,
+        "progress_percentage": (verified / total * 100) if total > 0 else 0
     }
 
 def export_dataset_stats() -> Dict:
     """Export statistics about the dataset and verification"""
-    all_verified_jsons = [f for f in os.listdir(OUTPUT_DIR) if f.endswith('.json') and f != os.path.basename(PROGRESS_FILE)]
-    stats = {}
-    
-    # Load all verified JSON files
-    verified_data = []
-    for json_file in all_verified_jsons:
-        with open(os.path.join(OUTPUT_DIR, json_file), 'r') as f:
-            try:
-                data = json.load(f)
-                verified_data.append(data)
-            except:
-                continue
-    
-    # Count attributes
-    attribute_counts = {}
-    for attr in ["label", "orientation", "brand_name", "vehicle_color", "itype", "type", "special_type"]:
-        attribute_counts[attr] = {}
-        
-    for data in verified_data:
-        for attr in attribute_counts.keys():
-            if attr in data:
-                val = data[attr]
-                if val in attribute_counts[attr]:
-                    attribute_counts[attr][val] += 1
-                else:
-                    attribute_counts[attr][val] = 1
-    
-    stats["attribute_counts"] = attribute_counts
+    flush_writes()
+    store = get_annotation_store()
+    if store is not None:
+        stats = {
+            "attribute_counts": store.attribute_counts(STATS_ATTRIBUTES),
+            "cross_tabs": {f"{a} x {b}": store.cross_tab(a, b) for a, b in CROSS_TABS}
+        }
+    elif STATS_MODE == "pandas":
+        # Vectorized groupby over the cached categorical DataFrame
+        stats = compute_frame_stats(load_annotation_frame())
+    else:
+        # Parallel, per-file cached counting over the verified JSON files
+        stats = compute_attribute_stats(OUTPUT_DIR, exclude=(os.path.basename(PROGRESS_FILE),))
+    
     stats["verification_stats"] = get_verification_stats()
     
-    return stats 
\ No newline at end of file
+    return stats
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Training-ready export for AOT (AttributeannOtationTool)
+Streams the verified annotations and their images into WebDataset tar
+shards: each sample is a "<key>.json" annotation plus "<key>.jpg" image,
+and shards are split into train and val, stratified by label.
+
+Usage:
+    python export_shards.py [--output DIR] [--shard-size N] [--val-fraction F] [--seed S] [--workers N]
+"""
+
+import io
+import os
+import sys
+import json
+import hashlib
+import tarfile
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from config import OUTPUT_DIR, EXPORT_SHARD_SIZE, EXPORT_VAL_FRACTION, EXPORT_SPLIT_SEED, EXPORT_WORKERS
+from data_handler import get_image_path, get_progress_store, load_verified_data, flush_writes
+from attribute_index import get_attribute_index
+from utils import get_timestamp
+import json_codec
+
+SPLITS = ["train", "val"]
+
+def sample_key(sample_id: str) -> str:
+    """WebDataset key of a sample: its file stem, without dots (they separate key and extension)"""
+    return os.path.splitext(os.path.basename(sample_id))[0].replace(".", "_")
+
+def split_rank(sample_id: str, seed: str) -> str:
+    return hashlib.sha1(f"{seed}:{os.path.basename(sample_id)}".encode("utf-8")).hexdigest()
+
+def assign_splits(labels: Dict[str, str], val_fraction: float, seed: str) -> Dict[str, List[str]]:
+    """Split samples into train and val, stratified by label
+
+    Within each label the samples are ranked by a seeded hash of their name
+    and the first round(n * val_fraction) go to val, so every label gets
+    its share and the same verified set always gives the same split.
+
+    Returns:
+        Dict[str, List[str]]: split -> sample ids, sorted
+    """
+    by_label: Dict[str, List[str]] = defaultdict(list)
+    for sample_id, label in labels.items():
+        by_label[label].append(sample_id)
+
+    splits: Dict[str, List[str]] = {split: [] for split in SPLITS}
+    for names in by_label.values():
+        names.sort(key=lambda s: split_rank(s, seed))
+        val_count = round(len(names) * val_fraction)
+        splits["val"].extend(names[:val_count])
+        splits["train"].extend(names[val_count:])
+    for sample_ids in splits.values():
+        sample_ids.sort()
+    return splits
+
+def _add_member(tar: tarfile.TarFile, name: str, payload: bytes) -> None:
+    # Fixed metadata, so the same samples always give byte-identical shards
+    info = tarfile.TarInfo(name)
+    info.size = len(payload)
+    info.mtime = 0
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(payload))
+
+def write_shard(path: str, sample_ids: List[str]) -> Tuple[int, List[str]]:
+    """Write one tar shard, holding a single sample in memory at a time
+
+    Returns:
+        Tuple[int, List[str]]: Samples written, and samples skipped because
+        their annotation or image couldn't be read
+    """
+    written, skipped = 0, []
+    tmp_path = path + ".tmp"
+    try:
+        with tarfile.open(tmp_path, "w") as tar:
+            for sample_id in sample_ids:
+                data = load_verified_data(sample_id)
+                try:
+                    with open(get_image_path(sample_id), 'rb') as f:
+                        image_bytes = f.read()
+                except OSError:
+                    image_bytes = None
+                if data is None or image_bytes is None:
+                    skipped.append(sample_id)
+                    continue
+                key = sample_key(sample_id)
+                _add_member(tar, f"{key}.json", json_codec.dumps(data, compact=True))
+                _add_member(tar, f"{key}.jpg", image_bytes)
+                written += 1
+        os.replace(tmp_path, path)
+    finally:
+        # Only left behind if writing failed
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return written, skipped
+
+def export_shards(output_dir: str, shard_size: int = EXPORT_SHARD_SIZE, val_fraction: float = EXPORT_VAL_FRACTION,
+                  seed: str = EXPORT_SPLIT_SEED, workers: Optional[int] = EXPORT_WORKERS) -> Dict:
+    """Export all verified samples as train/val WebDataset shards plus a manifest.json
+
+    Labels for the split come from the attribute index, so annotations are
+    only read once, while their shard is written; shards are written in
+    parallel. A shard that fails is listed under "failed" in the manifest
+    and the others are still written.
+
+    Returns:
+        Dict: The manifest: shard files, sample and label counts per split
+    """
+    flush_writes()
+    index = get_attribute_index()
+    labels = {sample_id: index.value(sample_id, "label") or "None of the above"
+              for sample_id in get_progress_store().as_dict()["verified"]}
+    splits = assign_splits(labels, val_fraction, seed)
+
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    for split, sample_ids in splits.items():
+        for shard_no, start in enumerate(range(0, len(sample_ids), shard_size)):
+            jobs.append((split, os.path.join(output_dir, f"{split}-{shard_no:06d}.tar"), sample_ids[start:start + shard_size]))
+
+    manifest = {
+        "seed": seed,
+        "val_fraction": val_fraction,
+        "shard_size": shard_size,
+        "splits": {split: {"samples": 0, "shards": [], "labels": Counter()} for split in SPLITS},
+        "skipped": [],
+        "failed": [],
+    }
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(write_shard, path, sample_ids) for _, path, sample_ids in jobs]
+        for (split, path, sample_ids), future in zip(jobs, futures):
+            try:
+                written, skipped = future.result()
+            except Exception as e:
+                manifest["failed"].append({"shard": os.path.basename(path), "samples": len(sample_ids), "error": str(e)})
+                continue
+            info = manifest["splits"][split]
+            info["samples"] += written
+            info["shards"].append(os.path.basename(path))
+            skipped_set = set(skipped)
+            info["labels"].update(labels[s] for s in sample_ids if s not in skipped_set)
+            manifest["skipped"].extend(os.path.basename(s) for s in skipped)
+
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    with open(manifest_path + ".tmp", 'w') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+def main():
+    """Export the verified samples as WebDataset shards"""
+    parser = argparse.ArgumentParser(description="Export verified samples as train/val WebDataset tar shards")
+    parser.add_argument("--output", help="Output directory (default: shards_<timestamp> in the output directory)")
+    parser.add_argument("--shard-size", type=int, default=EXPORT_SHARD_SIZE, help="Samples per shard (default: %(default)s)")
+    parser.add_argument("--val-fraction", type=float, default=EXPORT_VAL_FRACTION,
+                        help="Share of each label that goes to val (default: %(default)s)")
+    parser.add_argument("--seed", default=EXPORT_SPLIT_SEED, help="Seed of the train/val split (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=EXPORT_WORKERS, help="Shards written in parallel (default: %(default)s)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(OUTPUT_DIR, f"shards_{get_timestamp()}")
+    manifest = export_shards(output, args.shard_size, args.val_fraction, args.seed, args.workers)
+    counts = ", ".join(f"{split}: {info['samples']} samples in {len(info['shards'])} shards"
+                       for split, info in manifest["splits"].items())
+    print(f"Exported {counts} to {output}")
+    if manifest["skipped"]:
+        print(f"Skipped {len(manifest['skipped'])} samples with a missing image or annotation")
+    for failure in manifest["failed"]:
+        print(f"Failed to write {failure['shard']}: {failure['error']}")
+    return 1 if manifest["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
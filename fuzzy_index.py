@@ -0,0 +1,116 @@
+import heapq
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from schema import SCHEMA, normalize_value
+
+# Candidates ranked by trigram overlap that get a full similarity check
+SHORTLIST_SIZE = 10
+
+# Share of the query's trigrams a candidate must have in common with it
+MIN_OVERLAP = 0.25
+
+def _trigrams(key: str) -> Set[str]:
+    """Character trigrams of a normalized value, padded so short values still match"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class FuzzyIndex:
+    """Trigram inverted index over the standard values of one attribute
+
+    Lookups only score the entries sharing trigrams with the query, so their
+    cost depends on the matching entries rather than the vocabulary size.
+    Entries are (lookup key, value) pairs so aliases can point to their
+    standard value.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        self._keys: List[str] = []
+        self._values: List[str] = []
+        self._grams: List[Set[str]] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for key, value in entries:
+            key = normalize_value(key)
+            if not key:
+                continue
+            grams = _trigrams(key)
+            entry_id = len(self._keys)
+            self._keys.append(key)
+            self._values.append(value)
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings[gram].append(entry_id)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def search(self, value: str, n: int = 3, cutoff: float = 0.6) -> List[str]:
+        """Find up to n values similar to value, best match first
+
+        Similarity is difflib's ratio on the normalized strings, so results
+        match difflib.get_close_matches without comparing against every value.
+        """
+        key = normalize_value(value)
+        if not key:
+            return []
+
+        # Prefix filtering: a candidate sharing at least min_overlap trigrams
+        # shares one of the (len - min_overlap + 1) rarest, so the long
+        # posting lists of common trigrams never need to be walked
+        grams = sorted(_trigrams(key), key=lambda gram: len(self._postings.get(gram, ())))
+        min_overlap = max(1, int(len(grams) * MIN_OVERLAP))
+        candidates = set()
+        for gram in grams[:len(grams) - min_overlap + 1]:
+            candidates.update(self._postings.get(gram, ()))
+
+        # Dice coefficient of the trigram sets picks the shortlist
+        query = set(grams)
+        overlap = Counter()
+        for entry_id in candidates:
+            common = len(query & self._grams[entry_id])
+            if common >= min_overlap:
+                overlap[entry_id] = 2.0 * common / (len(query) + len(self._grams[entry_id]))
+        shortlist = heapq.nlargest(SHORTLIST_SIZE, overlap.items(), key=lambda item: item[1])
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(key)
+        scored = {}
+        for entry_id, _ in shortlist:
+            matcher.set_seq1(self._keys[entry_id])
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= cutoff:
+                target = self._values[entry_id]
+                scored[target] = max(ratio, scored.get(target, 0.0))
+
+        return [target for target, _ in sorted(scored.items(), key=lambda item: -item[1])[:n]]
+
+_indexes: Dict[str, FuzzyIndex] = {}
+
+def get_fuzzy_index(attribute: str) -> Optional[FuzzyIndex]:
+    """Get the fuzzy index of an attribute, built on first use"""
+    index = _indexes.get(attribute)
+    if index is None:
+        schema = SCHEMA.get(attribute)
+        if schema is None:
+            return None
+        entries = [(option, option) for option in schema.options]
+        entries.extend(schema.aliases.items())
+        index = _indexes[attribute] = FuzzyIndex(entries)
+    return index
+
+@lru_cache(maxsize=4096)
+def _cached_matches(attribute: str, value: str, n: int, cutoff: float) -> Tuple[str, ...]:
+    index = get_fuzzy_index(attribute)
+    if index is None:
+        return ()
+    return tuple(index.search(value, n, cutoff))
+
+def find_similar_values(attribute: str, value: str, n: int = 3, cutoff: float = 0.6) -> List[str]:
+    """Standard values of an attribute similar to value (memoized)"""
+    if not value:
+        return []
+    return list(_cached_matches(attribute, value, n, cutoff))
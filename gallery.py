@@ -0,0 +1,120 @@
+import os
+from typing import Dict, List, Tuple
+from PIL import Image
+
+from config import GALLERY_PAGE_SIZE, GALLERY_THUMB_EDGE
+from data_handler import (get_image_path, load_json_data, load_verified_data, load_draft_data,
+                          is_verified, save_verified_batch, reject_verified_batch)
+from image_cache import get_image_cache
+from attribute_index import update_attribute_index
+
+# Values verify_sample fills in for attributes a sample doesn't have
+ATTRIBUTE_DEFAULTS = {
+    "label": "None of the above",
+    "orientation": "None of the above",
+    "brand_name": "None of the above",
+    "vehicle_color": "None of the above",
+    "itype": "None of the above",
+    "type": "None of the above",
+    "special_type": "None of the above"
+}
+
+# Attributes shown in the thumbnail captions
+CAPTION_ATTRIBUTES = ["label", "orientation", "brand_name", "vehicle_color"]
+
+def page_count(samples: List[str], page_size: int = GALLERY_PAGE_SIZE) -> int:
+    """Number of gallery pages needed for the samples"""
+    return max(1, (len(samples) + page_size - 1) // page_size)
+
+def get_page(samples: List[str], page: int, page_size: int = GALLERY_PAGE_SIZE) -> List[str]:
+    """Sample ids on a page (0-based)"""
+    start = page * page_size
+    return samples[start:start + page_size]
+
+def current_annotation(sample_id: str) -> Dict:
+    """The annotation a sample would be verified with: its verified copy or draft if any, else the input file"""
+    data = load_verified_data(sample_id)
+    if data is None:
+        data = load_draft_data(sample_id)
+    if data is None:
+        data = load_json_data(sample_id)
+    return data
+
+def load_thumbnail(sample_id: str) -> Image.Image:
+    """Thumbnail of a sample's image, a grey placeholder if the image is missing"""
+    image_path = get_image_path(sample_id)
+    if not os.path.exists(image_path):
+        return Image.new("RGB", (GALLERY_THUMB_EDGE, GALLERY_THUMB_EDGE), "gray")
+    return get_image_cache().get(image_path, GALLERY_THUMB_EDGE)
+
+def load_page_items(sample_ids: List[str]) -> List[Tuple[Image.Image, str]]:
+    """(thumbnail, caption) pairs for the samples of one page
+
+    Captions show the verification status and the main attributes, so a
+    page can be checked at a glance.
+    """
+    items = []
+    for sample_id in sample_ids:
+        data = current_annotation(sample_id)
+        status = "✅" if is_verified(sample_id) else "⏳"
+        values = " | ".join(str(data.get(attr, "-")) for attr in CAPTION_ATTRIBUTES)
+        items.append((load_thumbnail(sample_id), f"{status} {os.path.basename(sample_id)}\n{values}"))
+    return items
+
+def prefetch_page(samples: List[str], page: int) -> None:
+    """Start decoding the thumbnails of a page in the background"""
+    sample_ids = get_page(samples, page)
+    get_image_cache().prefetch([get_image_path(s) for s in sample_ids], GALLERY_THUMB_EDGE)
+
+def approve_samples(sample_ids: List[str]) -> int:
+    """Verify samples as they currently are, in one batch commit
+
+    Returns:
+        int: The number of samples that were not verified before
+    """
+    annotations = {}
+    for sample_id in sample_ids:
+        data = dict(current_annotation(sample_id))
+        if not data:
+            # Unreadable sample, needs to be looked at individually
+            continue
+        for attr, default_value in ATTRIBUTE_DEFAULTS.items():
+            data.setdefault(attr, default_value)
+        annotations[sample_id] = data
+    return _verify_batch(annotations)
+
+def propagate_annotation(source: Dict, sample_ids: List[str]) -> int:
+    """Verify samples with the attribute values of another annotation, in one batch commit
+
+    Each sample keeps its own metadata (img_name, width, height).
+
+    Returns:
+        int: The number of samples that were not verified before
+    """
+    values = {attr: source.get(attr, default_value) for attr, default_value in ATTRIBUTE_DEFAULTS.items()}
+    annotations = {}
+    for sample_id in sample_ids:
+        data = dict(current_annotation(sample_id))
+        if not data:
+            continue
+        data.update(values)
+        annotations[sample_id] = data
+    return _verify_batch(annotations)
+
+def _verify_batch(annotations: Dict[str, Dict]) -> int:
+    count = save_verified_batch(annotations)
+    for sample_id, data in annotations.items():
+        update_attribute_index(sample_id, data)
+    return count
+
+def reject_samples(sample_ids: List[str]) -> int:
+    """Send samples back to pending for individual review
+
+    Returns:
+        int: The number of samples that were verified before
+    """
+    count = reject_verified_batch(sample_ids)
+    # Without their verified copies, queries see the input files again
+    for sample_id in sample_ids:
+        update_attribute_index(sample_id, load_json_data(sample_id))
+    return count
@@ -0,0 +1,178 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+
+from config import (IMAGE_CACHE_MAX_BYTES, PREFETCH_RADIUS, PREFETCH_WORKERS,
+                    DISPLAY_MAX_EDGE, THUMBNAIL_DIR)
+from data_handler import get_image_path
+
+# Cache key: source path, the maximum edge it was scaled to (None = full
+# resolution) and the source's mtime, so a replaced image is decoded again
+CacheKey = Tuple[str, Optional[int], int]
+
+def image_nbytes(image: Image.Image) -> int:
+    """Approximate the decoded size of an image in memory"""
+    return image.width * image.height * len(image.getbands())
+
+def get_thumbnail_path(image_path: str, max_edge: int) -> str:
+    """Get the on-disk thumbnail path for a source image
+
+    The name is derived from the source path, its mtime and the target size,
+    so editing or replacing the source naturally invalidates old thumbnails.
+    """
+    mtime = os.stat(image_path).st_mtime_ns
+    key = f"{os.path.abspath(image_path)}|{mtime}|{max_edge}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(THUMBNAIL_DIR, digest[:2], digest + ".jpg")
+
+def decode_image(image_path: str, max_edge: Optional[int] = None) -> Image.Image:
+    """Decode an image, downscaled so its longest edge is at most max_edge
+
+    JPEGs are reduced while decoding via draft(), which is much cheaper than
+    decoding the full frame and resizing afterwards. Downscaled results are
+    stored in THUMBNAIL_DIR and reused on later runs.
+    """
+    if max_edge is None:
+        image = Image.open(image_path)
+        # Force decoding now so the cached object no longer touches the file
+        image.load()
+        return image
+
+    thumb_path = get_thumbnail_path(image_path, max_edge)
+    if os.path.exists(thumb_path):
+        try:
+            image = Image.open(thumb_path)
+            image.load()
+            return image
+        except OSError:
+            # Corrupt or partially written thumbnail, rebuild it below
+            pass
+
+    image = Image.open(image_path)
+    if image.format == "JPEG":
+        image.draft("RGB", (max_edge, max_edge))
+    image.load()
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    # Unique per process and thread, so concurrent writers of the same thumbnail don't collide
+    tmp_path = f"{thumb_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        image.convert("RGB").save(tmp_path, "JPEG", quality=90)
+        os.replace(tmp_path, thumb_path)
+    except OSError as e:
+        print(f"Error writing thumbnail for {image_path}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return image
+
+class ImageCache:
+    """Bounded LRU cache of decoded images with background prefetching
+
+    Entries are keyed by (path, max_edge, mtime) and evicted least-recently-used
+    first once the decoded size of all cached images exceeds ``max_bytes``.
+    Prefetch requests run on a small thread pool; a foreground request for
+    an image that is still being prefetched waits for that load instead of
+    decoding it twice.
+    """
+
+    def __init__(self, max_bytes: int, workers: int = 2):
+        self.max_bytes = max_bytes
+        self._images: "OrderedDict[CacheKey, Image.Image]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[CacheKey, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aot-prefetch")
+
+    def _store(self, key: CacheKey, image: Image.Image) -> None:
+        with self._lock:
+            if key in self._images:
+                self._size -= image_nbytes(self._images.pop(key))
+            self._images[key] = image
+            self._size += image_nbytes(image)
+            while self._size > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= image_nbytes(evicted)
+
+    def _load(self, key: CacheKey) -> Image.Image:
+        try:
+            image = decode_image(key[0], key[1])
+            self._store(key, image)
+            return image
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, path: str, max_edge: Optional[int] = None) -> Image.Image:
+        """Return the decoded image for path, loading it if needed"""
+        key = (path, max_edge, os.stat(path).st_mtime_ns)
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+            future = self._inflight.get(key)
+
+        if future is not None:
+            return future.result()
+        return self._load(key)
+
+    def prefetch(self, paths: List[str], max_edge: Optional[int] = None) -> None:
+        """Start loading images in the background if not cached or in flight"""
+        for path in paths:
+            try:
+                key = (path, max_edge, os.stat(path).st_mtime_ns)
+            except OSError:
+                continue
+            with self._lock:
+                if key in self._images or key in self._inflight:
+                    continue
+                self._inflight[key] = self._executor.submit(self._load, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+
+_image_cache = None
+
+def get_image_cache() -> ImageCache:
+    """Get the process-wide image cache"""
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache(IMAGE_CACHE_MAX_BYTES, workers=PREFETCH_WORKERS)
+    return _image_cache
+
+def load_image(image_path: str, full_resolution: bool = False) -> Optional[Image.Image]:
+    """Load an image through the cache, returns None if the file is missing
+
+    By default the image is scaled down to DISPLAY_MAX_EDGE, which is all the
+    browser can show anyway; pass full_resolution=True when zooming in.
+    """
+    if not os.path.exists(image_path):
+        return None
+    max_edge = None if full_resolution or not DISPLAY_MAX_EDGE else DISPLAY_MAX_EDGE
+    return get_image_cache().get(image_path, max_edge)
+
+def prefetch_neighbors(samples: List[str], index: int, radius: int = PREFETCH_RADIUS) -> None:
+    """Prefetch the display images of the next and previous `radius` samples"""
+    if not samples or radius <= 0:
+        return
+
+    neighbors = []
+    for offset in range(1, radius + 1):
+        # Interleave forward and backward so the likely next click is loaded first
+        for i in (index + offset, index - offset):
+            if i < 0:
+                continue
+            try:
+                neighbors.append(get_image_path(samples[i]))
+            except IndexError:
+                # Past the end; filtered views only know their length once fully scanned
+                continue
+    get_image_cache().prefetch(neighbors, DISPLAY_MAX_EDGE or None)
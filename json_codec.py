@@ -0,0 +1,109 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+from config import JSON_LIBRARY, JSON_COMPACT
+
+def _import_library(name: str):
+    try:
+        return __import__(name)
+    except ImportError:
+        return None
+
+def _select_library() -> Tuple[str, Any]:
+    """Pick the JSON library: JSON_LIBRARY, or the fastest installed one for "auto" """
+    candidates = ["orjson", "ujson"] if JSON_LIBRARY == "auto" else [JSON_LIBRARY]
+    for name in candidates:
+        if name == "json":
+            break
+        module = _import_library(name)
+        if module is not None:
+            return name, module
+        if JSON_LIBRARY != "auto":
+            print(f"JSON library {name} is not installed, falling back to json")
+    return "json", json
+
+# Name of the library in use ("orjson", "ujson" or "json")
+BACKEND, _lib = _select_library()
+
+def loads(data: bytes) -> Any:
+    """Parse JSON from bytes or str
+
+    Raises:
+        ValueError: If the data is not valid JSON (whatever the backend)
+    """
+    return _lib.loads(data)
+
+def dumps(obj: Any, compact: bool = JSON_COMPACT) -> bytes:
+    """Serialize to UTF-8 JSON bytes
+
+    Compact output (no whitespace) uses the fast backend. Indented output
+    always goes through the json module so files keep the familiar
+    4-space layout whichever library is installed.
+    """
+    if not compact:
+        return json.dumps(obj, indent=4).encode("utf-8")
+    if BACKEND == "orjson":
+        return _lib.dumps(obj)
+    if BACKEND == "ujson":
+        return _lib.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def load_file(path: str) -> Any:
+    """Read and parse a JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+# Packed formats: one file holding many (sample name, annotation) records
+
+def write_jsonl(path: str, records: Iterable[Tuple[str, Dict]]) -> int:
+    """Write records as JSON Lines, one {"sample": name, "data": {...}} per line
+
+    Returns:
+        int: The number of records written
+    """
+    count = 0
+    with open(path, 'wb') as f:
+        for name, data in records:
+            f.write(dumps({"sample": name, "data": data}, compact=True) + b"\n")
+            count += 1
+    return count
+
+def read_jsonl(path: str) -> Iterator[Tuple[str, Dict]]:
+    """Read the records of a JSON Lines file written by write_jsonl"""
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                record = loads(line)
+                yield record["sample"], record["data"]
+
+def write_msgpack(path: str, records: Iterable[Tuple[str, Dict]]) -> int:
+    """Write records as a stream of msgpack [name, data] arrays (needs msgpack)
+
+    Returns:
+        int: The number of records written
+    """
+    msgpack = _import_library("msgpack")
+    if msgpack is None:
+        raise ImportError("msgpack is required for the msgpack export format; install it or use jsonl")
+    packer = msgpack.Packer()
+    count = 0
+    with open(path, 'wb') as f:
+        for name, data in records:
+            f.write(packer.pack([name, data]))
+            count += 1
+    return count
+
+def read_msgpack(path: str) -> Iterator[Tuple[str, Dict]]:
+    """Read the records of a file written by write_msgpack"""
+    msgpack = _import_library("msgpack")
+    if msgpack is None:
+        raise ImportError("msgpack is required to read msgpack exports")
+    with open(path, 'rb') as f:
+        for name, data in msgpack.Unpacker(f, raw=False):
+            yield name, data
+
+# Packed export formats: name -> (file extension, writer)
+PACKED_FORMATS = {
+    "jsonl": (".jsonl", write_jsonl),
+    "msgpack": (".msgpack", write_msgpack),
+}
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for AOT (AttributeannOtationTool)
+Groups images in the input directory that are nearly identical (e.g.
+consecutive frames of a camera feed) by comparing perceptual hashes, so one
+verified annotation can be applied to the whole group.
+
+Usage:
+    python near_duplicates.py [--max-distance N] [--output FILE] [--workers N]
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+from config import DUPLICATE_HASH_CACHE_FILE, DUPLICATE_MAX_DISTANCE, DUPLICATE_WORKERS, OUTPUT_DIR
+from batch import FileResultCache, run_parallel
+from data_handler import get_all_samples, get_image_path
+from utils import get_timestamp
+
+# dHash compares hash_size + 1 columns of hash_size rows: 64 bits for 8
+HASH_SIZE = 8
+
+def dhash(image_path: str, hash_size: int = HASH_SIZE) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny grayscale copy"""
+    image = Image.open(image_path)
+    if image.format == "JPEG":
+        # Decode at reduced scale, the hash only needs a few pixels
+        image.draft("L", (hash_size * 8, hash_size * 8))
+    pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def _hash_file(image_path: str) -> Tuple[str, Optional[int]]:
+    """Hash one image for the process pool, None if it can't be read"""
+    try:
+        return image_path, dhash(image_path)
+    except OSError:
+        return image_path, None
+
+def compute_hashes(image_paths: List[str], cache_file: Optional[str] = DUPLICATE_HASH_CACHE_FILE,
+                   workers: Optional[int] = DUPLICATE_WORKERS) -> Dict[str, int]:
+    """dHash every image, in parallel, reusing cached hashes of unchanged files"""
+    cache = FileResultCache(cache_file)
+    hashes: Dict[str, int] = {}
+    fingerprints = {}
+    to_hash = []
+    for path in image_paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        fingerprints[path] = (st.st_mtime_ns, st.st_size)
+        cached = cache.get(path, st.st_mtime_ns, st.st_size)
+        if cached is not None:
+            hashes[path] = cached
+        else:
+            to_hash.append(path)
+
+    for path, value in run_parallel(_hash_file, to_hash, workers=workers):
+        if value is not None:
+            hashes[path] = value
+            cache.put(path, *fingerprints[path], value)
+
+    cache.prune(fingerprints)
+    cache.save()
+    return hashes
+
+if hasattr(int, "bit_count"):
+    # Python 3.10+: popcount without building a string
+    def hamming(a: int, b: int) -> int:
+        return (a ^ b).bit_count()
+else:
+    def hamming(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+class HammingIndex:
+    """Multi-index hashing for Hamming-radius search over fixed-width hashes
+
+    Each hash is split into m blocks of about 16 bits, with one hash table
+    per block. Two hashes within r bits of each other differ in at most
+    r // m bits in at least one block (pigeonhole), so a query looks up
+    each of its blocks with up to r // m bits flipped and only compares
+    against the hashes found there, instead of against all of them.
+    """
+
+    def __init__(self, max_distance: int, bits: int = HASH_SIZE * HASH_SIZE, block_bits: int = 16):
+        self.max_distance = max_distance
+        blocks = max(1, bits // block_bits)
+        self._radius = max_distance // blocks
+        # (shift, width) per block, widths as even as possible
+        self._blocks = []
+        start = 0
+        for i in range(blocks):
+            width = bits // blocks + (1 if i < bits % blocks else 0)
+            self._blocks.append((start, width))
+            start += width
+        # Bit flips to probe per block: every combination of up to radius bits
+        self._probes = {width: [sum(1 << b for b in combo) for k in range(self._radius + 1)
+                                for combo in combinations(range(width), k)]
+                        for width in {w for _, w in self._blocks}}
+        self._tables: List[Dict[int, List[str]]] = [defaultdict(list) for _ in self._blocks]
+        self._hashes: Dict[str, int] = {}
+
+    def add(self, key: str, value: int) -> None:
+        self._hashes[key] = value
+        for table, (shift, width) in zip(self._tables, self._blocks):
+            table[(value >> shift) & ((1 << width) - 1)].append(key)
+
+    def search(self, value: int) -> List[str]:
+        """Keys whose hash is within max_distance bits of value"""
+        seen = set()
+        matches = []
+        for table, (shift, width) in zip(self._tables, self._blocks):
+            block = (value >> shift) & ((1 << width) - 1)
+            for flips in self._probes[width]:
+                for key in table.get(block ^ flips, ()):
+                    if key not in seen:
+                        seen.add(key)
+                        if hamming(value, self._hashes[key]) <= self.max_distance:
+                            matches.append(key)
+        return matches
+
+def cluster_hashes(hashes: Dict[str, int], max_distance: int = DUPLICATE_MAX_DISTANCE) -> List[List[str]]:
+    """Group keys whose hashes are within max_distance bits, transitively
+
+    Returns:
+        List[List[str]]: Groups of two or more keys, each sorted
+    """
+    # Union-find over the near pairs
+    parent = {key: key for key in hashes}
+
+    def find(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    # Each key is searched among the keys added before it, so every pair is checked once
+    index = HammingIndex(max_distance)
+    for key, value in hashes.items():
+        for other in index.search(value):
+            a, b = find(key), find(other)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+        index.add(key, value)
+
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for key in hashes:
+        groups[find(key)].append(key)
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+class DuplicateIndex:
+    """Near-duplicate clusters of the samples, by their images"""
+
+    def __init__(self, clusters: List[List[str]]):
+        self.clusters = clusters
+        self._cluster_of = {sample_id: i for i, cluster in enumerate(clusters) for sample_id in cluster}
+
+    def cluster(self, sample_id: str) -> List[str]:
+        """The samples in the same cluster as sample_id (including it), empty if it has no duplicates"""
+        i = self._cluster_of.get(sample_id)
+        return list(self.clusters[i]) if i is not None else []
+
+    def summary(self) -> str:
+        covered = sum(len(cluster) for cluster in self.clusters)
+        return f"{len(self.clusters)} near-duplicate clusters covering {covered} samples"
+
+def build_duplicate_index(sample_ids: Iterable[str], max_distance: int = DUPLICATE_MAX_DISTANCE,
+                          workers: Optional[int] = DUPLICATE_WORKERS) -> DuplicateIndex:
+    """Hash the images of the samples and cluster the near-duplicates"""
+    sample_of = {get_image_path(sample_id): sample_id for sample_id in sample_ids}
+    hashes = compute_hashes(list(sample_of), workers=workers)
+    clusters = cluster_hashes({sample_of[path]: value for path, value in hashes.items()}, max_distance)
+    return DuplicateIndex(clusters)
+
+_duplicate_index: Optional[DuplicateIndex] = None
+_duplicate_lock = threading.Lock()
+
+def get_duplicate_index(rebuild: bool = False) -> DuplicateIndex:
+    """Get the near-duplicate clusters of all samples, computing them on first use"""
+    global _duplicate_index
+    with _duplicate_lock:
+        if _duplicate_index is None or rebuild:
+            _duplicate_index = build_duplicate_index(get_all_samples())
+        return _duplicate_index
+
+def main():
+    """Write the near-duplicate clusters of the input directory as JSON Lines"""
+    parser = argparse.ArgumentParser(description="Find near-duplicate images in the input directory")
+    parser.add_argument("--max-distance", type=int, default=DUPLICATE_MAX_DISTANCE,
+                        help="Maximum Hamming distance between 64-bit dHashes (default: %(default)s)")
+    parser.add_argument("--output", help="Report path (default: duplicates_<timestamp>.jsonl in the output directory)")
+    parser.add_argument("--workers", type=int, default=DUPLICATE_WORKERS, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    index = build_duplicate_index(get_all_samples(), args.max_distance, args.workers)
+    output = args.output or os.path.join(OUTPUT_DIR, f"duplicates_{get_timestamp()}.jsonl")
+    with open(output, 'w') as f:
+        for cluster in index.clusters:
+            f.write(json.dumps({"size": len(cluster), "samples": cluster}) + "\n")
+
+    print(f"{index.summary()}. Report written to {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import (PREANNOTATION_MODEL, PREANNOTATION_LABELS_FILE, PREANNOTATION_INPUT_SIZE,
+                    PREANNOTATION_BATCH_SIZE, PREANNOTATION_CACHE_FILE, PREANNOTATION_CACHE_SAVE_INTERVAL)
+from batch import FileResultCache
+from data_handler import get_image_path
+from schema import get_schema
+
+# Model output for one image: attribute -> (value, confidence in [0, 1])
+Prediction = Dict[str, Tuple[str, float]]
+
+class Predictor(ABC):
+    """A CPU classifier that pre-annotates images
+
+    Subclasses set ``name`` (stored with cached predictions, so changing the
+    model invalidates them) and implement predict_batch.
+    """
+
+    name = "predictor"
+
+    @abstractmethod
+    def predict_batch(self, images: List[Image.Image]) -> List[Prediction]:
+        """Predict attributes for a batch of RGB images of size input_size x input_size"""
+
+class StubPredictor(Predictor):
+    """Stand-in model for trying the workflow without a trained classifier
+
+    Predicts vehicle_color from the mean colour of the image centre, with a
+    confidence that falls off with the distance to the nearest palette colour.
+    """
+
+    name = "stub"
+
+    PALETTE = {
+        "White": (235, 235, 235), "Black": (25, 25, 25), "Gray": (128, 128, 128),
+        "Silver": (190, 190, 195), "Red": (200, 30, 30), "Blue": (30, 60, 190),
+        "Yellow": (230, 200, 40), "Green": (40, 150, 60), "Brown": (120, 80, 40),
+    }
+
+    def predict_batch(self, images: List[Image.Image]) -> List[Prediction]:
+        names = list(self.PALETTE)
+        palette = np.array([self.PALETTE[n] for n in names], dtype=np.float32)
+        batch = np.stack([np.asarray(image, dtype=np.float32) for image in images])
+        h, w = batch.shape[1:3]
+        means = batch[:, h // 4:3 * h // 4, w // 4:3 * w // 4].reshape(len(images), -1, 3).mean(axis=1)
+        distances = np.linalg.norm(means[:, None, :] - palette[None, :, :], axis=2)
+        nearest = distances.argmin(axis=1)
+        # Distance 0 -> confidence 1, half the RGB diagonal or more -> 0
+        confidence = np.clip(1 - distances.min(axis=1) / (255 * np.sqrt(3) / 2), 0, 1)
+        return [{"vehicle_color": (names[i], float(c))} for i, c in zip(nearest, confidence)]
+
+class OnnxPredictor(Predictor):
+    """ONNX classifier run with onnxruntime on the CPU
+
+    The model takes a float32 NCHW batch of RGB images normalized with the
+    ImageNet mean/std and has one output of class scores per attribute. The
+    labels file maps each attribute to its class names, in the order of the
+    model's outputs: {"label": ["Bus", "Car", ...], "orientation": [...]}.
+    """
+
+    MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+    STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+    def __init__(self, model_path: str, labels_file: str):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("onnxruntime is required for ONNX pre-annotation models (pip install onnxruntime)")
+        with open(labels_file, 'r') as f:
+            self.labels: Dict[str, List[str]] = json.load(f)
+        self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.name = f"onnx:{os.path.abspath(model_path)}:{os.stat(model_path).st_mtime_ns}"
+
+    def predict_batch(self, images: List[Image.Image]) -> List[Prediction]:
+        batch = np.stack([np.asarray(image, dtype=np.float32) / 255 for image in images])
+        batch = ((batch - self.MEAN) / self.STD).transpose(0, 3, 1, 2)
+        outputs = self.session.run(None, {self.input_name: np.ascontiguousarray(batch)})
+        predictions: List[Prediction] = [{} for _ in images]
+        for (attr, classes), scores in zip(self.labels.items(), outputs):
+            # Softmax over the classes of each image
+            scores = scores - scores.max(axis=1, keepdims=True)
+            probs = np.exp(scores)
+            probs /= probs.sum(axis=1, keepdims=True)
+            for prediction, row in zip(predictions, probs):
+                best = int(row.argmax())
+                prediction[attr] = (classes[best], float(row[best]))
+        return predictions
+
+def load_predictor(model: Optional[str] = PREANNOTATION_MODEL) -> Optional[Predictor]:
+    """Create the configured predictor, None if pre-annotation is disabled"""
+    if not model:
+        return None
+    if model == "stub":
+        return StubPredictor()
+    if not PREANNOTATION_LABELS_FILE:
+        raise ValueError("PREANNOTATION_LABELS_FILE must be set for an ONNX pre-annotation model")
+    return OnnxPredictor(model, PREANNOTATION_LABELS_FILE)
+
+def load_model_input(image_path: str, size: int = PREANNOTATION_INPUT_SIZE) -> Image.Image:
+    """Decode an image as a size x size RGB model input"""
+    image = Image.open(image_path)
+    if image.format == "JPEG":
+        # Decode at reduced scale, much cheaper than resizing the full frame
+        image.draft("RGB", (size, size))
+    return image.convert("RGB").resize((size, size), Image.BILINEAR)
+
+class PreannotationWorker:
+    """Runs a predictor over samples in batches on a background thread
+
+    Predictions are cached per image in a FileResultCache (valid while the
+    image's mtime and size and the model stay the same), so restarting the
+    tool only predicts new or changed images. The cache file is rewritten
+    at most once per ``save_interval`` seconds and when the run ends.
+    """
+
+    def __init__(self, predictor: Predictor, cache_file: Optional[str] = PREANNOTATION_CACHE_FILE,
+                 batch_size: int = PREANNOTATION_BATCH_SIZE,
+                 save_interval: float = PREANNOTATION_CACHE_SAVE_INTERVAL):
+        self.predictor = predictor
+        self.batch_size = batch_size
+        self.save_interval = save_interval
+        self._cache = FileResultCache(cache_file)
+        self._lock = threading.Lock()
+        self._predictions: Dict[str, Prediction] = {}
+        # Samples in the order their predictions arrived, for predicted_since()
+        self._predicted: List[str] = []
+        self._thread: Optional[threading.Thread] = None
+        self.total = 0
+        self.done = 0
+        self.error: Optional[str] = None
+
+    def start(self, sample_ids: List[str]) -> None:
+        """Predict the given samples in the background"""
+        self.total = len(sample_ids)
+        self._thread = threading.Thread(target=self._run, args=(list(sample_ids),), name="preannotation", daemon=True)
+        self._thread.start()
+
+    def _run(self, sample_ids: List[str]) -> None:
+        try:
+            self._predict_all(sample_ids)
+        finally:
+            self._cache.save()
+
+    def _predict_all(self, sample_ids: List[str]) -> None:
+        # Pick up cached predictions first, then predict the rest batch by batch
+        todo = []
+        for sample_id in sample_ids:
+            image_path = get_image_path(sample_id)
+            try:
+                st = os.stat(image_path)
+            except OSError:
+                self.total -= 1
+                continue
+            cached = self._cache.get(image_path, st.st_mtime_ns, st.st_size)
+            if cached is not None and cached.get("model") == self.predictor.name:
+                with self._lock:
+                    self._predictions[sample_id] = {attr: tuple(p) for attr, p in cached["predictions"].items()}
+                    self._predicted.append(sample_id)
+                self.done += 1
+            else:
+                todo.append((sample_id, image_path, st.st_mtime_ns, st.st_size))
+        
+        last_save = time.monotonic()
+        for start in range(0, len(todo), self.batch_size):
+            batch, images = [], []
+            for item in todo[start:start + self.batch_size]:
+                try:
+                    images.append(load_model_input(item[1]))
+                    batch.append(item)
+                except OSError as e:
+                    # Unreadable image: leave the sample without a prediction
+                    print(f"Error loading {item[1]} for pre-annotation: {str(e)}")
+                    self.total -= 1
+            if not batch:
+                continue
+            try:
+                predictions = self.predictor.predict_batch(images)
+            except Exception as e:
+                self.error = str(e)
+                print(f"Error in pre-annotation: {str(e)}")
+                return
+            with self._lock:
+                for (sample_id, image_path, mtime, size), prediction in zip(batch, predictions):
+                    self._predictions[sample_id] = prediction
+                    self._predicted.append(sample_id)
+                    self._cache.put(image_path, mtime, size,
+                                    {"model": self.predictor.name, "predictions": prediction})
+            self.done += len(batch)
+            if time.monotonic() - last_save >= self.save_interval:
+                self._cache.save()
+                last_save = time.monotonic()
+
+    def prediction(self, sample_id: str) -> Optional[Prediction]:
+        with self._lock:
+            return self._predictions.get(sample_id)
+
+    def predicted_since(self, position: int) -> Tuple[List[str], int]:
+        """Samples predicted after the first ``position`` predictions, and the new position"""
+        with self._lock:
+            return self._predicted[position:], len(self._predicted)
+
+    def uncertainty(self, sample_id: str) -> Optional[float]:
+        """1 - the lowest confidence over the predicted attributes, None if not predicted yet"""
+        prediction = self.prediction(sample_id)
+        if not prediction:
+            return None
+        return 1 - min(confidence for _, confidence in prediction.values())
+
+    def status_text(self) -> str:
+        if self.error is not None:
+            return f"Pre-annotation stopped: {self.error}"
+        return f"Pre-annotated {self.done}/{self.total} samples with {self.predictor.name}"
+
+_worker: Optional[PreannotationWorker] = None
+
+def start_preannotation(sample_ids: List[str]) -> Optional[PreannotationWorker]:
+    """Start pre-annotating samples with the configured model, if there is one"""
+    global _worker
+    if _worker is None:
+        try:
+            predictor = load_predictor()
+        except Exception as e:
+            print(f"Pre-annotation disabled: {str(e)}")
+            return None
+        if predictor is None:
+            return None
+        _worker = PreannotationWorker(predictor)
+        _worker.start(sample_ids)
+    return _worker
+
+def get_prediction(sample_id: str) -> Optional[Prediction]:
+    """Cached model prediction for a sample, None if there is none (yet)"""
+    return _worker.prediction(sample_id) if _worker is not None else None
+
+def prefill_values(sample_id: str, min_confidence: float) -> Dict[str, str]:
+    """Predicted values to prefill, limited to confident predictions of known values"""
+    values = {}
+    for attr, (value, confidence) in (get_prediction(sample_id) or {}).items():
+        schema = get_schema(attr)
+        value = schema.canonical(value) if schema is not None else None
+        if value is not None and confidence >= min_confidence:
+            values[attr] = value
+    return values
+
+def get_predicted_since(position: int) -> Tuple[List[str], int]:
+    """Samples predicted since position (0 at first, then the returned position)"""
+    return _worker.predicted_since(position) if _worker is not None else ([], position)
+
+def get_uncertainty(sample_id: str) -> Optional[float]:
+    """Model uncertainty of a sample (1 - lowest confidence), None if it has no prediction"""
+    return _worker.uncertainty(sample_id) if _worker is not None else None
+
+def get_preannotation_status() -> str:
+    """Progress of the pre-annotation worker for the UI"""
+    if _worker is None:
+        return "Pre-annotation is off (set PREANNOTATION_MODEL in config.py)"
+    return _worker.status_text()
@@ -0,0 +1,495 @@
+import os
+import json
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, threads are still serialised
+    fcntl = None
+
+class ProgressStore:
+    """In-memory index of verification progress
+
+    Verified and pending samples are kept in insertion-ordered dicts, which
+    gives O(1) membership checks and counts while preserving the order used
+    in the progress file.
+
+    Persistence is journaled: the progress file is a snapshot, and every
+    state flip is appended as one line to the journal file. At startup the
+    snapshot is loaded and the journal replayed on top of it. Once the
+    journal holds ``compact_every`` events it is folded into a new snapshot
+    and replaced by an empty journal. Every compaction raises a generation
+    number, recorded in the snapshot and in the first line of the journal.
+
+    Snapshots are written to a temporary file and renamed into place; the
+    previous snapshot is kept as ``<progress_file>.bak`` and the journal it
+    was compacted from as ``<journal_file>.prev``. If the snapshot can't be
+    read, the backup plus both journals are replayed instead, which gives
+    the same state, rather than starting over with everything pending.
+
+    Several processes may share the same files. Writers hold an exclusive
+    lock on ``<progress_file>.lock`` and first catch up on events other
+    processes appended, so concurrent verifications never overwrite each
+    other; readers pick up new events by tailing the journal, checking for
+    them at most once per ``sync_interval`` seconds so membership tests and
+    counts stay in memory. A journal whose generation differs from the one
+    read (or that is shorter than the offset read up to) was compacted by
+    another process, and the snapshot is loaded again. Inode numbers can't
+    tell journals apart: file systems reuse them as soon as they are freed.
+    """
+
+    def __init__(self, progress_file: str, all_samples: Callable[[], List[str]],
+                 journal_file: Optional[str] = None, compact_every: int = 1000,
+                 fsync: bool = True, fsync_interval: float = 0.0, sync_interval: float = 1.0):
+        """
+        Args:
+            fsync: fsync journal appends and snapshots
+            fsync_interval: If > 0, journal appends are fsynced at most once
+                per this many seconds (a timer syncs the rest), trading up to
+                that much of a window on power loss for fewer disk flushes
+            sync_interval: Reads check the journal for events appended by
+                other processes at most once per this many seconds (0 checks
+                on every read); writes always catch up first
+        """
+        self.progress_file = progress_file
+        self.journal_file = journal_file or os.path.splitext(progress_file)[0] + ".journal"
+        self.lock_file = progress_file + ".lock"
+        self.backup_file = progress_file + ".bak"
+        self.prev_journal_file = self.journal_file + ".prev"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.sync_interval = sync_interval
+        self._last_sync = 0.0
+        self._last_fsync = 0.0
+        self._fsync_timer: Optional[threading.Timer] = None
+        # False while the snapshot on disk is known to be unreadable, so it
+        # doesn't get rotated over the good backup
+        self._snapshot_ok = True
+        self._all_samples = all_samples
+        self._lock = threading.RLock()
+        self._verified: Dict[str, None] = {}
+        self._pending: Dict[str, None] = {}
+        # "verified"/"pending" -> the ids as a list for paging, dropped on any change
+        self._id_lists: Dict[str, List[str]] = {}
+        self._journal_entries = 0
+        # Generation of the journal we are reading (None until one is
+        # adopted in reload) and how far into it we have read
+        self._generation: Optional[int] = None
+        self._snapshot_generation = 0
+        self._journal_offset = 0
+        self._file_lock_depth = 0
+        self._loaded = False
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold the cross-process lock on the progress files
+        
+        Re-entrant within the thread holding self._lock, which callers
+        always acquire first.
+        """
+        if fcntl is None or self._file_lock_depth:
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+            return
+        with open(self.lock_file, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _ensure_loaded(self, force: bool = False) -> None:
+        """Load on first use, then catch up on other processes' events
+
+        Args:
+            force: Check the journal now instead of at most once per
+                sync_interval; writers pass it so they never miss an event
+        """
+        if not self._loaded:
+            self.reload()
+            return
+        now = time.monotonic()
+        if force or now - self._last_sync >= self.sync_interval:
+            self._last_sync = now
+            self._sync()
+
+    def _sync(self) -> None:
+        """Apply events appended to the journal by other processes"""
+        if not self._replay_journal(truncate_torn=False):
+            # Another process compacted: the snapshot is newer than what we loaded
+            self.reload()
+
+    def reload(self) -> None:
+        """(Re)read the snapshot and replay the journal"""
+        with self._lock, self._file_lock():
+            progress, from_backup = self._load_snapshot()
+            if progress is None:
+                # Initialize with all samples as pending
+                progress = {"verified": [], "pending": self._all_samples()}
+            self._set(progress.get("verified", []), progress.get("pending", []))
+            self._snapshot_generation = progress.get("generation", 0)
+            if from_backup:
+                # The events that went into the unreadable snapshot
+                self._replay_file(self.prev_journal_file)
+            self._generation = None
+            self._journal_offset = 0
+            self._journal_entries = 0
+            self._replay_journal(truncate_torn=True)
+            if self._generation is None:
+                # No journal yet; the first append starts one at this generation
+                self._generation = self._snapshot_generation
+            self._loaded = True
+            self._last_sync = time.monotonic()
+            
+            if self._journal_entries >= self.compact_every:
+                self._compact()
+
+    def _load_snapshot(self) -> Tuple[Optional[Dict], bool]:
+        """Read the snapshot, falling back to the backup if it is unreadable
+        
+        Returns:
+            The progress (None if there is none) and whether it came from the backup
+        """
+        self._snapshot_ok = True
+        for path in (self.progress_file, self.backup_file):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r') as f:
+                    progress = json.load(f)
+                if not isinstance(progress, dict):
+                    raise ValueError("not a progress object")
+            except (OSError, ValueError) as e:
+                print(f"Error reading progress snapshot {path}: {str(e)}")
+                if path == self.progress_file:
+                    self._snapshot_ok = False
+                    # Keep a copy for manual recovery before it gets replaced
+                    shutil.copy2(path, path + ".corrupt")
+                continue
+            if path == self.backup_file:
+                print(f"Recovered progress from last good snapshot {path}")
+            return progress, path == self.backup_file
+        
+        if not self._snapshot_ok:
+            print("No readable progress snapshot; rebuilding from the journal with all other samples pending")
+        return None, False
+
+    def _replay_file(self, path: str) -> None:
+        """Apply every complete event in a journal file, without tracking offsets"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if event.get("op") == "verify":
+                    self._apply_verified(event["id"])
+                elif event.get("op") == "unverify":
+                    self._apply_pending(event["id"])
+
+    @staticmethod
+    def _journal_header(f) -> Tuple[int, int]:
+        """Read the header of an open journal
+        
+        Returns:
+            The journal's generation (0 for journals written before headers)
+            and the offset its events start at
+        """
+        line = f.readline()
+        if line.endswith(b"\n"):
+            try:
+                header = json.loads(line)
+            except json.JSONDecodeError:
+                header = None
+            if isinstance(header, dict) and "generation" in header:
+                return header["generation"], len(line)
+        return 0, 0
+
+    @staticmethod
+    def _header_line(generation: int) -> str:
+        return json.dumps({"generation": generation}) + "\n"
+
+    def _replay_journal(self, truncate_torn: bool) -> bool:
+        """Apply journaled events from the current offset onwards
+        
+        Returns:
+            False, without applying anything, if the journal was replaced by
+            a compaction since it was last read
+        """
+        try:
+            f = open(self.journal_file, 'rb')
+        except FileNotFoundError:
+            return True
+        
+        with f:
+            # Header, offset and events all come from this one open file, so
+            # a compaction in between can't mix two journals
+            generation, start = self._journal_header(f)
+            if self._generation is None:
+                self._generation = generation
+                self._journal_offset = start
+            elif generation != self._generation or os.fstat(f.fileno()).st_size < self._journal_offset:
+                return False
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A torn last line from a crash mid-append (or, when
+                    # tailing, an append still in progress); stop before it
+                    break
+                self._journal_offset += len(line)
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if event.get("op") == "verify":
+                    self._apply_verified(event["id"])
+                elif event.get("op") == "unverify":
+                    self._apply_pending(event["id"])
+                self._journal_entries += 1
+        
+        # Drop the torn tail so the next append starts on a fresh line
+        if truncate_torn and self._journal_offset < os.path.getsize(self.journal_file):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(self._journal_offset)
+        return True
+
+    def _set(self, verified: Iterable[str], pending: Iterable[str]) -> None:
+        self._verified = dict.fromkeys(verified)
+        self._pending = dict.fromkeys(pending)
+        self._id_lists.clear()
+
+    def _append_journal(self, op: str, sample_id: str) -> None:
+        self._append_journal_many(op, [sample_id])
+
+    def _append_journal_many(self, op: str, sample_ids: List[str]) -> None:
+        """Append one event per sample with a single write (and fsync)"""
+        lines = "".join(json.dumps({"op": op, "id": sample_id}) + "\n" for sample_id in sample_ids)
+        with open(self.journal_file, 'a') as f:
+            if f.tell() == 0:
+                # A new journal starts with the generation it continues
+                header = self._header_line(self._generation)
+                f.write(header)
+                self._journal_offset = len(header.encode("utf-8"))
+            f.write(lines)
+            f.flush()
+            if self.fsync:
+                self._fsync_journal(f)
+        
+        self._journal_offset += len(lines.encode("utf-8"))
+        self._journal_entries += len(sample_ids)
+        if self._journal_entries >= self.compact_every:
+            self._compact()
+
+    def _fsync_journal(self, f) -> None:
+        """fsync an open journal now, or later when batching within fsync_interval"""
+        now = time.monotonic()
+        if self.fsync_interval <= 0 or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(f.fileno())
+            self._last_fsync = now
+        elif self._fsync_timer is None:
+            self._fsync_timer = threading.Timer(self.fsync_interval - (now - self._last_fsync), self.sync)
+            self._fsync_timer.daemon = True
+            self._fsync_timer.start()
+
+    def sync(self) -> None:
+        """fsync journal appends that are still waiting for a batched fsync"""
+        with self._lock:
+            if self._fsync_timer is not None:
+                self._fsync_timer.cancel()
+                self._fsync_timer = None
+            if not os.path.exists(self.journal_file):
+                return
+            with open(self.journal_file, 'a') as f:
+                os.fsync(f.fileno())
+            self._last_fsync = time.monotonic()
+
+    def _write_snapshot(self, generation: int) -> bool:
+        """Write the state as the new snapshot, returns True if the old one became the backup"""
+        tmp_path = self.progress_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"verified": list(self._verified), "pending": list(self._pending),
+                       "generation": generation}, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        
+        # Keep the previous snapshot as the last good one. Between the two
+        # renames only the backup exists, and loading it plus the journal
+        # (not yet compacted) still gives the current state
+        rotated = self._snapshot_ok and os.path.exists(self.progress_file)
+        if rotated:
+            os.replace(self.progress_file, self.backup_file)
+        os.replace(tmp_path, self.progress_file)
+        self._snapshot_ok = True
+        self._snapshot_generation = generation
+        return rotated
+
+    def save(self) -> None:
+        """Write the current state as a new snapshot"""
+        with self._lock, self._file_lock():
+            self._ensure_loaded(force=True)
+            self._write_snapshot(self._generation)
+
+    def _compact(self) -> None:
+        # Caller holds both locks. The generation only goes up, also past a
+        # journal we haven't read (replace() doesn't catch up first)
+        generation = max(self._generation or 0, self._snapshot_generation, self._disk_generation()) + 1
+        rotated = self._write_snapshot(generation)
+        # Keep the compacted events next to the backup snapshot they apply to
+        if rotated and os.path.exists(self.journal_file):
+            os.replace(self.journal_file, self.prev_journal_file)
+        # Swap in a new journal holding just the header, so other processes
+        # see the generation change and reload the snapshot
+        header = self._header_line(generation)
+        tmp_path = self.journal_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(header)
+        os.replace(tmp_path, self.journal_file)
+        self._generation = generation
+        self._journal_offset = len(header.encode("utf-8"))
+        self._journal_entries = 0
+
+    def _disk_generation(self) -> int:
+        """Generation of the journal on disk (0 if there is none)"""
+        try:
+            with open(self.journal_file, 'rb') as f:
+                return self._journal_header(f)[0]
+        except FileNotFoundError:
+            return 0
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and start an empty journal
+        
+        Replaying an event twice is harmless, so a crash between writing the
+        snapshot and replacing the journal does not lose or corrupt state.
+        """
+        with self._lock, self._file_lock():
+            self._ensure_loaded(force=True)
+            self._compact()
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        """Return the progress in the on-disk {"verified", "pending"} layout"""
+        with self._lock:
+            self._ensure_loaded()
+            return {"verified": list(self._verified), "pending": list(self._pending)}
+
+    def replace(self, progress: Dict) -> None:
+        """Replace the whole state and persist it"""
+        with self._lock, self._file_lock():
+            self._set(progress.get("verified", []), progress.get("pending", []))
+            self._loaded = True
+            self._compact()
+
+    def is_verified(self, sample_id: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return sample_id in self._verified
+
+    def is_pending(self, sample_id: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return sample_id in self._pending
+
+    def verified_ids(self) -> Set[str]:
+        with self._lock:
+            self._ensure_loaded()
+            return set(self._verified)
+
+    def pending_ids(self) -> Set[str]:
+        with self._lock:
+            self._ensure_loaded()
+            return set(self._pending)
+
+    def page_ids(self, status: str, offset: int, limit: int) -> List[str]:
+        """A page of the "verified" or "pending" ids, in progress-file order
+
+        The list is built once per change of the progress, so paging
+        through it costs O(limit) per page instead of O(offset).
+        """
+        with self._lock:
+            self._ensure_loaded()
+            ids = self._id_lists.get(status)
+            if ids is None:
+                ids = self._id_lists[status] = list(self._verified if status == "verified" else self._pending)
+            return ids[offset:offset + limit]
+
+    def verified_count(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._verified)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._pending)
+
+    def _apply_verified(self, sample_id: str) -> bool:
+        changed = False
+        if sample_id in self._pending:
+            del self._pending[sample_id]
+            changed = True
+        if sample_id not in self._verified:
+            self._verified[sample_id] = None
+            changed = True
+        if changed:
+            self._id_lists.clear()
+        return changed
+
+    def _apply_pending(self, sample_id: str) -> bool:
+        changed = False
+        if sample_id in self._verified:
+            del self._verified[sample_id]
+            changed = True
+        if sample_id not in self._pending:
+            self._pending[sample_id] = None
+            changed = True
+        if changed:
+            self._id_lists.clear()
+        return changed
+
+    def mark_verified(self, sample_id: str) -> bool:
+        """Move a sample to the verified set, returns True if anything changed"""
+        with self._lock, self._file_lock():
+            self._ensure_loaded(force=True)
+            changed = self._apply_verified(sample_id)
+            if changed:
+                self._append_journal("verify", sample_id)
+            return changed
+
+    def mark_pending(self, sample_id: str) -> bool:
+        """Move a sample back to the pending set, returns True if anything changed"""
+        with self._lock, self._file_lock():
+            self._ensure_loaded(force=True)
+            changed = self._apply_pending(sample_id)
+            if changed:
+                self._append_journal("unverify", sample_id)
+            return changed
+
+    def _mark_many(self, op: str, sample_ids: Iterable[str]) -> int:
+        apply = self._apply_verified if op == "verify" else self._apply_pending
+        with self._lock, self._file_lock():
+            self._ensure_loaded(force=True)
+            changed = [sample_id for sample_id in sample_ids if apply(sample_id)]
+            if changed:
+                self._append_journal_many(op, changed)
+            return len(changed)
+
+    def mark_verified_many(self, sample_ids: Iterable[str]) -> int:
+        """Move several samples to the verified set in one journal write, returns how many changed"""
+        return self._mark_many("verify", sample_ids)
+
+    def mark_pending_many(self, sample_ids: Iterable[str]) -> int:
+        """Move several samples back to the pending set in one journal write, returns how many changed"""
+        return self._mark_many("unverify", sample_ids)
@@ -0,0 +1,93 @@
+import os
+import time
+import bisect
+import threading
+from typing import List, Optional, Set
+
+class SampleCatalog:
+    """Cached, sorted list of the JSON samples in a directory
+
+    The directory is listed with os.scandir once; afterwards it is only
+    listed again when its mtime changes, which happens whenever files are
+    added, removed or renamed. Added and removed names are merged into the
+    existing sorted list instead of re-sorting everything. To keep
+    network shares from being hit on every click, the mtime itself is
+    checked at most once per ``refresh_interval`` seconds.
+    """
+
+    def __init__(self, directory: str, extension: str = ".json", refresh_interval: float = 2.0):
+        self.directory = directory
+        self.extension = extension
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._names: List[str] = []
+        self._paths: List[str] = []
+        self._name_set: Set[str] = set()
+        self._dir_mtime: Optional[int] = None
+        self._last_check = 0.0
+
+    def _scan(self) -> Set[str]:
+        names = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                # glob's "*.json" skipped hidden files, keep doing the same
+                if entry.name.endswith(self.extension) and not entry.name.startswith(".") and entry.is_file():
+                    names.add(entry.name)
+        return names
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-list the directory if it changed, returns True if the catalog changed"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._dir_mtime is not None and now - self._last_check < self.refresh_interval:
+                return False
+            self._last_check = now
+
+            try:
+                dir_mtime = os.stat(self.directory).st_mtime_ns
+            except FileNotFoundError:
+                changed = bool(self._names)
+                self._names, self._paths, self._name_set = [], [], set()
+                self._dir_mtime = None
+                return changed
+
+            if not force and dir_mtime == self._dir_mtime:
+                return False
+            self._dir_mtime = dir_mtime
+
+            names = self._scan()
+            added = names - self._name_set
+            removed = self._name_set - names
+            if not added and not removed:
+                return False
+
+            if len(added) + len(removed) > len(names) // 4:
+                # Large change (or first scan): a fresh sort is cheaper than merging
+                new_names = sorted(names)
+            else:
+                new_names = [n for n in self._names if n not in removed] if removed else list(self._names)
+                for name in added:
+                    bisect.insort(new_names, name)
+
+            # Swap in new lists rather than mutating, callers may hold the old ones
+            self._names = new_names
+            self._paths = [os.path.join(self.directory, n) for n in new_names]
+            self._name_set = names
+            return True
+
+    def samples(self) -> List[str]:
+        """Return the sorted sample paths, refreshing if the directory changed
+
+        The returned list is shared and must not be modified by the caller.
+        """
+        self.refresh()
+        return self._paths
+
+    def __contains__(self, sample_path: str) -> bool:
+        self.refresh()
+        return (os.path.dirname(sample_path) == self.directory
+                and os.path.basename(sample_path) in self._name_set)
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._names)
@@ -0,0 +1,91 @@
+from array import array
+from typing import Callable, Iterator, List, Optional, Sequence, Union
+
+class SampleCursor:
+    """Lazily filtered view over a list of sample paths
+
+    Without a predicate the view is the list itself. With one, matching
+    positions are found on demand: looking up index i only scans the list
+    until the (i + 1)-th match, so opening a view or showing its first page
+    costs O(page) rather than a pass over the whole dataset. Matches are
+    kept as positions in a compact int array, not as a copy of the paths.
+
+    The paths list must not be modified afterwards; SampleCatalog swaps in
+    new lists instead of mutating, so a cursor keeps a consistent snapshot.
+    """
+
+    def __init__(self, paths: Sequence[str], predicate: Optional[Callable[[str], bool]] = None,
+                 count_hint: Optional[Callable[[], int]] = None):
+        """
+        Args:
+            paths: All sample paths, in navigation order
+            predicate: Keep only paths for which this returns True
+            count_hint: Cheap estimate of the number of matches (e.g. a count
+                from the progress store), used by len() until the view has
+                been scanned to the end
+        """
+        self._paths = paths
+        self._predicate = predicate
+        self._count_hint = count_hint
+        self._positions = array('l')
+        self._scan_pos = 0
+        self._complete = predicate is None
+
+    def _fill(self, index: int) -> bool:
+        """Scan forward until position `index` is known, returns False if there are fewer matches"""
+        if self._predicate is None:
+            return index < len(self._paths)
+        while len(self._positions) <= index and self._scan_pos < len(self._paths):
+            if self._predicate(self._paths[self._scan_pos]):
+                self._positions.append(self._scan_pos)
+            self._scan_pos += 1
+        if self._scan_pos >= len(self._paths):
+            self._complete = True
+        return index < len(self._positions)
+
+    def has(self, index: int) -> bool:
+        """Check whether the view has a sample at index, scanning only as far as needed"""
+        return index >= 0 and self._fill(index)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            if index.stop is None or (index.start or 0) < 0 or index.stop < 0:
+                # Open-ended or negative slices need the full view
+                self.materialize()
+            start, stop, step = index.indices(len(self))
+            return [self[i] for i in range(start, stop, step) if self.has(i)]
+        if index < 0:
+            index += len(self.materialize())
+        if not self.has(index):
+            raise IndexError("sample index out of range")
+        if self._predicate is None:
+            return self._paths[index]
+        return self._paths[self._positions[index]]
+
+    def __len__(self) -> int:
+        """Number of samples in the view
+
+        Exact once the view has been scanned to the end; before that the
+        count hint is used if there is one, otherwise the rest is scanned.
+        """
+        if self._predicate is None:
+            return len(self._paths)
+        if not self._complete and self._count_hint is not None:
+            # Never report fewer than we have already found
+            return max(self._count_hint(), len(self._positions))
+        self._fill(len(self._paths))
+        return len(self._positions)
+
+    def __bool__(self) -> bool:
+        return self.has(0)
+
+    def __iter__(self) -> Iterator[str]:
+        i = 0
+        while self.has(i):
+            yield self[i]
+            i += 1
+
+    def materialize(self) -> "SampleCursor":
+        """Scan the whole view so len() is exact"""
+        self._fill(len(self._paths))
+        return self
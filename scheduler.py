@@ -0,0 +1,285 @@
+import heapq
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from attribute_index import AttributeIndex
+from preannotation import get_uncertainty, get_predicted_since
+
+# Attribute whose classes are boosted or stratified
+SCHEDULE_ATTRIBUTE = "label"
+
+class Priority(ABC):
+    """Scores samples for the work queue; higher scores are served first
+
+    Scores may drop at any time: the queue re-checks a sample's score when
+    it reaches the top. Scores may only rise for the samples verified() or
+    risen() return, which the queue re-scores.
+    """
+
+    @abstractmethod
+    def score(self, sample_id: str) -> float:
+        """Priority of a sample, higher first"""
+
+    def served(self, sample_id: str) -> None:
+        """Called when the queue hands out a sample"""
+
+    def verified(self, sample_id: str, data: Dict) -> Iterable[str]:
+        """Called when a sample has been verified with the given annotation
+
+        Returns:
+            Iterable[str]: Samples whose score may have risen as a result
+        """
+        return ()
+
+    def risen(self) -> Iterable[str]:
+        """Samples whose score may have risen since the last call, for reasons other than verified()
+
+        The queue asks before every pop.
+        """
+        return ()
+
+class UncertaintyPriority(Priority):
+    """Samples the pre-annotation model is least sure about first, unpredicted ones last"""
+
+    def __init__(self):
+        # How many of the worker's predictions risen() has reported; the
+        # queue scores its samples after this, so the earlier ones are in
+        _, self._position = get_predicted_since(0)
+
+    def score(self, sample_id: str) -> float:
+        uncertainty = get_uncertainty(sample_id)
+        return -1.0 if uncertainty is None else uncertainty
+
+    def risen(self) -> Iterable[str]:
+        # New predictions lift samples above the unpredicted ones
+        sample_ids, self._position = get_predicted_since(self._position)
+        return sample_ids
+
+class ClassPriority(Priority):
+    """Base for priorities that score samples by their class (the value of one attribute)"""
+
+    def __init__(self, index: AttributeIndex, attribute: str = SCHEDULE_ATTRIBUTE):
+        self.index = index
+        self.attribute = attribute
+        # Class of each handed-out sample when it was served
+        self._served_as: Dict[str, Optional[str]] = {}
+
+    def served(self, sample_id: str) -> None:
+        self._served_as[sample_id] = self.index.value(sample_id, self.attribute)
+
+    def verified(self, sample_id: str, data: Dict) -> Iterable[str]:
+        # A sample that left its class makes that class rarer (or less done),
+        # which raises the scores of the samples still in it
+        old, new = self._served_as.get(sample_id), data.get(self.attribute)
+        if sample_id not in self._served_as or new is None or old == new:
+            return ()
+        self._served_as[sample_id] = new
+        self.moved(old, new)
+        if old is None:
+            return ()
+        return self.index.query([(self.attribute, "=", old)])
+
+    def moved(self, old: Optional[str], new: str) -> None:
+        """Called when a served sample was verified with a different class"""
+
+class RareClassPriority(ClassPriority):
+    """Samples of the rarest classes first, by the current annotation counts"""
+
+    def score(self, sample_id: str) -> float:
+        value = self.index.value(sample_id, self.attribute)
+        if value is None:
+            return 0.0
+        return 1.0 / max(self.index.count(self.attribute, value), 1)
+
+class StratifiedPriority(ClassPriority):
+    """Spread the work evenly over the classes
+
+    Serves the class with the smallest share of its samples verified or
+    already handed out next, so every class advances at the same rate.
+    """
+
+    def __init__(self, index: AttributeIndex, sample_ids: Iterable[str], is_verified: Callable[[str], bool],
+                 attribute: str = SCHEDULE_ATTRIBUTE):
+        super().__init__(index, attribute)
+        self.done = Counter(index.value(s, attribute) for s in sample_ids if is_verified(s))
+
+    def score(self, sample_id: str) -> float:
+        value = self.index.value(sample_id, self.attribute)
+        return -(self.done[value] + 1) / (self.index.count(self.attribute, value) + 1)
+
+    def served(self, sample_id: str) -> None:
+        super().served(sample_id)
+        self.done[self._served_as[sample_id]] += 1
+
+    def moved(self, old: Optional[str], new: str) -> None:
+        # Move the sample's count over to the class the annotator chose
+        self.done[old] -= 1
+        self.done[new] += 1
+
+class WorkQueue:
+    """Max-priority queue of samples on a binary heap with lazy deletion
+
+    Removing or re-scoring a sample only invalidates its heap entry (O(1))
+    and pushes a new one (O(log n)); stale entries are discarded when they
+    surface. Scores are re-checked when a sample reaches the top, and a
+    sample whose score has dropped below the next one's is pushed back, so
+    dropping scores never require re-sorting the whole queue. Rising scores
+    are pushed again (O(log n) each), unless so many rose at once that
+    re-scoring the whole heap (O(n)) is cheaper.
+    """
+
+    def __init__(self, priority: Priority, sample_ids: Iterable[str],
+                 eligible: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            priority: Scores the samples
+            sample_ids: Samples to queue; ties are served in this order
+            eligible: Checked when a sample is popped; samples that are no
+                longer eligible (e.g. verified or claimed meanwhile) are dropped
+        """
+        self.priority = priority
+        self._eligible = eligible
+        self._order: Dict[str, int] = {}
+        self._entries: Dict[str, list] = {}
+        self._heap: List[list] = []
+        for position, sample_id in enumerate(sample_ids):
+            self._order[sample_id] = position
+            entry = [-priority.score(sample_id), position, sample_id, True]
+            self._entries[sample_id] = entry
+            self._heap.append(entry)
+        heapq.heapify(self._heap)
+
+    def push(self, sample_id: str) -> None:
+        """Add a sample, or re-score it if it is already queued"""
+        self.remove(sample_id)
+        position = self._order.setdefault(sample_id, len(self._order))
+        entry = [-self.priority.score(sample_id), position, sample_id, True]
+        self._entries[sample_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, sample_id: str) -> None:
+        """Drop a sample from the queue"""
+        entry = self._entries.pop(sample_id, None)
+        if entry is not None:
+            entry[-1] = False
+
+    def rescore(self) -> None:
+        """Re-score every queued sample and rebuild the heap, dropping stale entries"""
+        self._heap = list(self._entries.values())
+        for entry in self._heap:
+            entry[0] = -self.priority.score(entry[2])
+        heapq.heapify(self._heap)
+
+    def pop(self) -> Optional[str]:
+        """Take the highest-priority sample, None when the queue is empty"""
+        risen = [sample_id for sample_id in self.priority.risen() if sample_id in self._entries]
+        if len(risen) > len(self._entries) // 4:
+            self.rescore()
+        else:
+            for sample_id in risen:
+                self.push(sample_id)
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            key, position, sample_id, valid = entry
+            if not valid:
+                continue
+            if self._eligible is not None and not self._eligible(sample_id):
+                del self._entries[sample_id]
+                continue
+            fresh_key = -self.priority.score(sample_id)
+            if fresh_key > key and self._heap and [fresh_key, position] > self._heap[0][:2]:
+                # Its score dropped below the next sample's, queue it again
+                entry[0] = fresh_key
+                heapq.heappush(self._heap, entry)
+                continue
+            del self._entries[sample_id]
+            self.priority.served(sample_id)
+            return sample_id
+        return None
+
+    def __contains__(self, sample_id: str) -> bool:
+        return sample_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class ScheduledView:
+    """Navigation view over a WorkQueue, with the same interface as SampleCursor
+
+    Samples are taken from the queue as the annotator moves forward and
+    remembered, so going back shows the same samples again.
+    """
+
+    def __init__(self, queue: WorkQueue):
+        self.queue = queue
+        self._served: List[str] = []
+
+    def _fill(self, index: int) -> bool:
+        while len(self._served) <= index:
+            sample_id = self.queue.pop()
+            if sample_id is None:
+                return False
+            self._served.append(sample_id)
+        return True
+
+    def has(self, index: int) -> bool:
+        return index >= 0 and self._fill(index)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            if index.stop is None or (index.start or 0) < 0 or index.stop < 0:
+                self.materialize()
+            start, stop, step = index.indices(len(self))
+            return [self[i] for i in range(start, stop, step) if self.has(i)]
+        if index < 0:
+            index += len(self.materialize())
+        if not self.has(index):
+            raise IndexError("sample index out of range")
+        return self._served[index]
+
+    def __len__(self) -> int:
+        """Samples handed out so far plus those still queued (some may be dropped as ineligible)"""
+        return len(self._served) + len(self.queue)
+
+    def __bool__(self) -> bool:
+        return self.has(0)
+
+    def __iter__(self) -> Iterator[str]:
+        i = 0
+        while self.has(i):
+            yield self[i]
+            i += 1
+
+    def materialize(self) -> "ScheduledView":
+        """Drain the queue so len() is exact"""
+        while self._fill(len(self._served)):
+            pass
+        return self
+
+    def verified(self, sample_id: str, data: Dict) -> None:
+        """Reprioritize after a sample was verified, O(k log n) for k samples whose score rose"""
+        self.queue.remove(sample_id)
+        for other in self.queue.priority.verified(sample_id, data):
+            if other in self.queue:
+                self.queue.push(other)
+
+# Work orders offered in the UI
+PRIORITIES = ["uncertainty", "rare", "stratified"]
+
+def make_priority(name: str, index: AttributeIndex, sample_ids: List[str],
+                  is_verified: Callable[[str], bool]) -> Priority:
+    """Create one of the PRIORITIES"""
+    if name == "uncertainty":
+        return UncertaintyPriority()
+    if name == "rare":
+        return RareClassPriority(index)
+    if name == "stratified":
+        return StratifiedPriority(index, sample_ids, is_verified)
+    raise ValueError(f"Unknown work order '{name}', expected one of: {', '.join(PRIORITIES)}")
+
+def schedule(name: str, index: AttributeIndex, all_samples: List[str], is_verified: Callable[[str], bool],
+             eligible: Callable[[str], bool]) -> ScheduledView:
+    """Build a navigation view of the eligible samples in the named work order"""
+    priority = make_priority(name, index, all_samples, is_verified)
+    return ScheduledView(WorkQueue(priority, (s for s in all_samples if eligible(s)), eligible))
@@ -0,0 +1,103 @@
+import os
+import re
+import json
+from typing import Dict, FrozenSet, List, Optional
+
+from config import (VEHICLE_BRANDS, VEHICLE_COLORS, VEHICLE_ORIENTATIONS,
+                    VEHICLE_LABELS, VEHICLE_ITYPES, VEHICLE_TYPES, VEHICLE_SPECIAL_TYPES,
+                    ATTRIBUTE_SCHEMA_FILE)
+
+# Built-in schema, used unless ATTRIBUTE_SCHEMA_FILE points to a schema file.
+# Aliases map known misspellings/variants to their standard value.
+DEFAULT_SCHEMA = {
+    "brand_name": {"options": VEHICLE_BRANDS,
+                   "aliases": {"Maruthi": "Maruti-Suzuki", "Tata": "Tata-Motors", "Hero Honda": "Hero-Honda"}},
+    "vehicle_color": {"options": VEHICLE_COLORS,
+                      "aliases": {"Grey": "Gray", "Golden": "Yellow"}},
+    "orientation": {"options": VEHICLE_ORIENTATIONS},
+    "label": {"options": VEHICLE_LABELS},
+    "itype": {"options": VEHICLE_ITYPES},
+    "type": {"options": VEHICLE_TYPES},
+    "special_type": {"options": VEHICLE_SPECIAL_TYPES},
+}
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize_value(value: str) -> str:
+    """Normalize a value for lookups: lowercase, without spaces or punctuation"""
+    return _NON_ALNUM.sub("", str(value).lower())
+
+class AttributeSchema:
+    """Compiled definition of one attribute category
+
+    Attributes:
+        options: Allowed values in display order
+        allowed: The same values as a frozenset for O(1) validation
+        aliases: Known variant -> standard value
+        normalized: normalize_value(value or alias) -> standard value
+    """
+
+    def __init__(self, name: str, options: List[str], aliases: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.options: List[str] = list(options)
+        self.allowed: FrozenSet[str] = frozenset(self.options)
+        self.aliases: Dict[str, str] = dict(aliases or {})
+
+        unknown = [target for target in self.aliases.values() if target not in self.allowed]
+        if unknown:
+            raise ValueError(f"Aliases for {name} point to values that are not options: {unknown}")
+
+        self.normalized: Dict[str, str] = {}
+        for alias, target in self.aliases.items():
+            self.normalized[normalize_value(alias)] = target
+        # Exact options win over aliases that normalize to the same key
+        for option in self.options:
+            self.normalized[normalize_value(option)] = option
+
+    def canonical(self, value: str) -> Optional[str]:
+        """Map a value to its standard form, or None if it isn't recognised"""
+        if value in self.allowed:
+            return value
+        if value in self.aliases:
+            return self.aliases[value]
+        return self.normalized.get(normalize_value(value))
+
+    def to_dict(self) -> Dict:
+        return {"options": list(self.options), "aliases": dict(self.aliases)}
+
+def compile_schema(definition: Dict) -> Dict[str, AttributeSchema]:
+    """Compile a {attr: {"options": [...], "aliases": {...}}} definition"""
+    return {name: AttributeSchema(name, spec["options"], spec.get("aliases"))
+            for name, spec in definition.items()}
+
+def load_schema_file(path: str) -> Dict:
+    """Read a schema definition from a JSON or YAML file
+
+    The file holds {"attributes": {attr: {"options": [...], "aliases": {...}}}}.
+    Attributes it defines replace the built-in ones; others are kept.
+    """
+    with open(path, 'r') as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError(f"PyYAML is required to read {path}; install it or use a JSON schema file")
+            content = yaml.safe_load(f)
+        else:
+            content = json.load(f)
+
+    definition = dict(DEFAULT_SCHEMA)
+    definition.update(content.get("attributes", {}))
+    return definition
+
+def _build_registry() -> Dict[str, AttributeSchema]:
+    if ATTRIBUTE_SCHEMA_FILE and os.path.exists(ATTRIBUTE_SCHEMA_FILE):
+        return compile_schema(load_schema_file(ATTRIBUTE_SCHEMA_FILE))
+    return compile_schema(DEFAULT_SCHEMA)
+
+# Compiled once at import
+SCHEMA: Dict[str, AttributeSchema] = _build_registry()
+
+def get_schema(attribute: str) -> Optional[AttributeSchema]:
+    """Get the compiled schema of an attribute, None for free-form attributes"""
+    return SCHEMA.get(attribute)
@@ -0,0 +1,96 @@
+import time
+import uuid
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from config import CLAIM_TTL_SECONDS
+from data_handler import get_all_samples
+from sample_cursor import SampleCursor
+
+class AnnotatorSession:
+    """Navigation and editing state of one annotator (one browser tab)
+
+    An instance lives in a gr.State, so every tab gets its own copy instead
+    of sharing module globals with every other tab on the server.
+    """
+
+    def __init__(self):
+        self.session_id = uuid.uuid4().hex
+        self.current_sample_index = 0
+        self.samples = SampleCursor(get_all_samples())
+        self.current_data = {}
+        self.modified = False
+        self.issues = []
+        self.verified_status = False
+        self.full_resolution = False
+        # Last saved state per sample, used by undo
+        self.previous_data = {}
+        # Page shown in the gallery view (0-based)
+        self.gallery_page = 0
+
+    def current_path(self) -> Optional[str]:
+        """Path of the sample being viewed, or None if the index is invalid"""
+        if not self.samples.has(self.current_sample_index):
+            return None
+        return self.samples[self.current_sample_index]
+
+class WorkClaims:
+    """Tracks which annotator session is working on which sample
+
+    A session holds at most one claim, taken when it opens a sample. Other
+    sessions skip claimed samples when building their pending queue, so
+    annotators sharing a server don't end up verifying the same sample.
+    Claims expire after ``ttl`` seconds so closed tabs don't hold work forever.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # sample_id -> (session_id, claimed_at)
+        self._claims: Dict[str, Tuple[str, float]] = {}
+        # session_id -> sample_id
+        self._by_session: Dict[str, str] = {}
+
+    def _expire(self, now: float) -> None:
+        expired = [s for s, (_, claimed_at) in self._claims.items() if now - claimed_at > self.ttl]
+        for sample_id in expired:
+            session_id, _ = self._claims.pop(sample_id)
+            if self._by_session.get(session_id) == sample_id:
+                del self._by_session[session_id]
+
+    def claim(self, sample_id: str, session_id: str) -> Optional[str]:
+        """Claim a sample for a session, releasing the session's previous claim
+
+        Returns:
+            The id of the session that already holds the sample, or None if
+            the claim succeeded (or the sample was already ours).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+
+            holder = self._claims.get(sample_id)
+            if holder is not None and holder[0] != session_id:
+                return holder[0]
+
+            previous = self._by_session.get(session_id)
+            if previous is not None and previous != sample_id:
+                self._claims.pop(previous, None)
+            self._claims[sample_id] = (session_id, now)
+            self._by_session[session_id] = sample_id
+            return None
+
+    def release(self, session_id: str) -> None:
+        """Release whatever the session has claimed"""
+        with self._lock:
+            sample_id = self._by_session.pop(session_id, None)
+            if sample_id is not None and self._claims.get(sample_id, (None,))[0] == session_id:
+                del self._claims[sample_id]
+
+    def claimed_by_others(self, session_id: str) -> Set[str]:
+        """Samples currently claimed by any other session"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return {s for s, (holder, _) in self._claims.items() if holder != session_id}
+
+work_claims = WorkClaims(CLAIM_TTL_SECONDS)
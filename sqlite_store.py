@@ -0,0 +1,334 @@
+import os
+import json
+import sqlite3
+import threading
+import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    sample_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    data TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_samples_status ON samples(status);
+
+CREATE TABLE IF NOT EXISTS attributes (
+    sample_id TEXT NOT NULL,
+    attr TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (sample_id, attr)
+);
+CREATE INDEX IF NOT EXISTS idx_attributes_value ON attributes(attr, value);
+
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sample_id TEXT NOT NULL,
+    action TEXT NOT NULL,
+    data TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_sample ON history(sample_id);
+"""
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+class SQLiteAnnotationStore:
+    """Annotations, verification status and edit history in one SQLite file
+
+    Exposes the same progress interface as ProgressStore, so it can be used
+    as a drop-in progress backend, plus storage for verified annotations.
+    Attribute values are mirrored into an indexed table, which turns stats
+    and filters into GROUP BY / WHERE queries instead of directory scans.
+    """
+
+    def __init__(self, db_file: str, all_samples: Callable[[], List[str]],
+                 initial_progress: Optional[Callable[[], Dict]] = None,
+                 initial_annotation: Optional[Callable[[str], Optional[Dict]]] = None):
+        """
+        Args:
+            initial_progress: Existing progress to import into a new database
+            initial_annotation: Existing verified annotation of a sample to
+                import into a new database, None if it has none
+        """
+        self.db_file = db_file
+        self._all_samples = all_samples
+        self._initial_progress = initial_progress
+        self._initial_annotation = initial_annotation
+        self._lock = threading.RLock()
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            # Gradio calls us from worker threads; access is serialised by self._lock
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._populate_if_empty()
+        return self._conn
+
+    def _populate_if_empty(self) -> None:
+        """Seed the samples table, importing existing JSON progress and verified annotations if any"""
+        if self._conn.execute("SELECT 1 FROM samples LIMIT 1").fetchone():
+            return
+        if self._initial_progress is not None:
+            progress = self._initial_progress()
+        else:
+            progress = {"verified": [], "pending": self._all_samples()}
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO samples (sample_id, status, updated_at) VALUES (?, 'verified', ?)",
+                [(s, _now()) for s in progress.get("verified", [])])
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO samples (sample_id, status, updated_at) VALUES (?, 'pending', ?)",
+                [(s, _now()) for s in progress.get("pending", [])])
+            if self._initial_annotation is not None:
+                for sample_id in progress.get("verified", []):
+                    data = self._initial_annotation(sample_id)
+                    if data is not None:
+                        self._write_annotation(sample_id, data, "import")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Progress interface (same as ProgressStore)
+
+    def reload(self) -> None:
+        with self._lock:
+            self.close()
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        with self._lock:
+            return {"verified": self._ids_with_status("verified"),
+                    "pending": self._ids_with_status("pending")}
+
+    def replace(self, progress: Dict) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE samples SET status = 'none'")
+            for status in ("verified", "pending"):
+                self.conn.executemany(
+                    "INSERT INTO samples (sample_id, status, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(sample_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                    [(s, status, _now()) for s in progress.get(status, [])])
+
+    def _ids_with_status(self, status: str) -> List[str]:
+        rows = self.conn.execute("SELECT sample_id FROM samples WHERE status = ? ORDER BY rowid", (status,))
+        return [row[0] for row in rows]
+
+    def _status(self, sample_id: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT status FROM samples WHERE sample_id = ?", (sample_id,)).fetchone()
+            return row[0] if row else None
+
+    def is_verified(self, sample_id: str) -> bool:
+        return self._status(sample_id) == "verified"
+
+    def is_pending(self, sample_id: str) -> bool:
+        return self._status(sample_id) == "pending"
+
+    def verified_ids(self) -> Set[str]:
+        with self._lock:
+            return set(self._ids_with_status("verified"))
+
+    def pending_ids(self) -> Set[str]:
+        with self._lock:
+            return set(self._ids_with_status("pending"))
+
+    def page_ids(self, status: str, offset: int, limit: int) -> List[str]:
+        """A page of the "verified" or "pending" ids, in insertion order, read through the status index"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT sample_id FROM samples WHERE status = ? ORDER BY rowid LIMIT ? OFFSET ?",
+                (status, limit, offset))
+            return [row[0] for row in rows]
+
+    def _count(self, status: str) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM samples WHERE status = ?", (status,)).fetchone()[0]
+
+    def verified_count(self) -> int:
+        return self._count("verified")
+
+    def pending_count(self) -> int:
+        return self._count("pending")
+
+    def _set_status(self, sample_id: str, status: str, action: str) -> bool:
+        with self._lock, self.conn:
+            if self._status(sample_id) == status:
+                return False
+            self.conn.execute(
+                "INSERT INTO samples (sample_id, status, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(sample_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                (sample_id, status, _now()))
+            self.conn.execute("INSERT INTO history (sample_id, action, created_at) VALUES (?, ?, ?)",
+                              (sample_id, action, _now()))
+            return True
+
+    def mark_verified(self, sample_id: str) -> bool:
+        return self._set_status(sample_id, "verified", "verify")
+
+    def mark_pending(self, sample_id: str) -> bool:
+        return self._set_status(sample_id, "pending", "unverify")
+
+    def _set_status_many(self, sample_ids: Iterable[str], status: str, action: str) -> int:
+        # Caller holds self._lock and an open transaction
+        changed = [s for s in sample_ids if self._status(s) != status]
+        self.conn.executemany(
+            "INSERT INTO samples (sample_id, status, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(sample_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+            [(s, status, _now()) for s in changed])
+        self.conn.executemany("INSERT INTO history (sample_id, action, created_at) VALUES (?, ?, ?)",
+                              [(s, action, _now()) for s in changed])
+        return len(changed)
+
+    def mark_verified_many(self, sample_ids: Iterable[str]) -> int:
+        """Mark several samples verified in one transaction, returns how many changed"""
+        with self._lock, self.conn:
+            return self._set_status_many(sample_ids, "verified", "verify")
+
+    def mark_pending_many(self, sample_ids: Iterable[str]) -> int:
+        """Mark several samples pending in one transaction, returns how many changed"""
+        with self._lock, self.conn:
+            return self._set_status_many(sample_ids, "pending", "unverify")
+
+    # Annotation storage
+
+    def _write_annotation(self, sample_id: str, data: Dict, action: str) -> None:
+        # Caller holds self._lock and an open transaction
+        payload = json.dumps(data)
+        self.conn.execute(
+            "INSERT INTO samples (sample_id, data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(sample_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (sample_id, payload, _now()))
+        self.conn.execute("DELETE FROM attributes WHERE sample_id = ?", (sample_id,))
+        self.conn.executemany(
+            "INSERT INTO attributes (sample_id, attr, value) VALUES (?, ?, ?)",
+            [(sample_id, attr, str(value)) for attr, value in data.items()])
+        self.conn.execute("INSERT INTO history (sample_id, action, data, created_at) VALUES (?, ?, ?, ?)",
+                          (sample_id, action, payload, _now()))
+
+    def save_annotation(self, sample_id: str, data: Dict, action: str = "save") -> None:
+        """Store the annotation for a sample and record it in the history"""
+        with self._lock, self.conn:
+            self._write_annotation(sample_id, data, action)
+
+    def verify_annotations(self, annotations: Dict[str, Dict]) -> int:
+        """Store several annotations and mark them verified in one transaction
+        
+        Returns:
+            The number of samples that were not verified before
+        """
+        with self._lock, self.conn:
+            for sample_id, data in annotations.items():
+                self._write_annotation(sample_id, data, "batch_verify")
+            return self._set_status_many(annotations, "verified", "verify")
+
+    def load_annotation(self, sample_id: str, status: Optional[str] = None) -> Optional[Dict]:
+        """The stored annotation of a sample, if status is given only while the sample has that status"""
+        with self._lock:
+            if status is None:
+                row = self.conn.execute("SELECT data FROM samples WHERE sample_id = ?", (sample_id,)).fetchone()
+            else:
+                row = self.conn.execute("SELECT data FROM samples WHERE sample_id = ? AND status = ?",
+                                        (sample_id, status)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0])
+
+    def delete_annotation(self, sample_id: str) -> bool:
+        """Drop the stored annotation, returns True if there was one"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "UPDATE samples SET data = NULL, updated_at = ? WHERE sample_id = ? AND data IS NOT NULL",
+                (_now(), sample_id))
+            self.conn.execute("DELETE FROM attributes WHERE sample_id = ?", (sample_id,))
+            if cursor.rowcount:
+                self.conn.execute("INSERT INTO history (sample_id, action, created_at) VALUES (?, 'delete', ?)",
+                                  (sample_id, _now()))
+            return cursor.rowcount > 0
+
+    def get_history(self, sample_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT action, data, created_at FROM history WHERE sample_id = ? ORDER BY id",
+                (sample_id,)).fetchall()
+        return [{"action": action, "data": json.loads(data) if data else None, "created_at": created_at}
+                for action, data, created_at in rows]
+
+    def attribute_counts(self, attributes: Iterable[str], status: str = "verified") -> Dict[str, Dict[str, int]]:
+        """Count attribute values over samples with the given status"""
+        attributes = list(attributes)
+        counts = {attr: {} for attr in attributes}
+        placeholders = ", ".join("?" for _ in attributes)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT a.attr, a.value, COUNT(*) FROM attributes a "
+                f"JOIN samples s ON s.sample_id = a.sample_id "
+                f"WHERE s.status = ? AND a.attr IN ({placeholders}) "
+                f"GROUP BY a.attr, a.value",
+                [status] + attributes).fetchall()
+        for attr, value, count in rows:
+            counts[attr][value] = count
+        return counts
+
+    def cross_tab(self, attr_a: str, attr_b: str, status: str = "verified") -> Dict[str, Dict[str, int]]:
+        """Count value pairs of two attributes over samples with the given status"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT a.value, b.value, COUNT(*) FROM attributes a "
+                "JOIN attributes b ON b.sample_id = a.sample_id AND b.attr = ? "
+                "JOIN samples s ON s.sample_id = a.sample_id "
+                "WHERE s.status = ? AND a.attr = ? "
+                "GROUP BY a.value, b.value",
+                (attr_b, status, attr_a)).fetchall()
+        table: Dict[str, Dict[str, int]] = {}
+        for value_a, value_b, count in rows:
+            table.setdefault(value_a, {})[value_b] = count
+        return table
+
+    def attribute_values(self, attributes: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """Values of the given attributes for every sample with a stored annotation"""
+        attributes = list(attributes)
+        placeholders = ", ".join("?" for _ in attributes)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT sample_id, attr, value FROM attributes WHERE attr IN ({placeholders})",
+                attributes).fetchall()
+        values: Dict[str, Dict[str, str]] = {}
+        for sample_id, attr, value in rows:
+            values.setdefault(sample_id, {})[attr] = value
+        return values
+
+    def find_samples(self, attr: str, value: str) -> List[str]:
+        """Return the samples whose stored annotation has attr == value"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT sample_id FROM attributes WHERE attr = ? AND value = ? ORDER BY sample_id",
+                (attr, value)).fetchall()
+        return [row[0] for row in rows]
+
+    def export_json(self, output_dir: str, status: str = "verified") -> int:
+        """Write stored annotations to output_dir as one JSON file per sample
+
+        Mirrors the layout the JSON backend writes directly, returns the
+        number of files written.
+        """
+        # Imported here: data_handler imports this module
+        from data_handler import save_json_data
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT sample_id, data FROM samples WHERE status = ? AND data IS NOT NULL",
+                (status,)).fetchall()
+        os.makedirs(output_dir, exist_ok=True)
+        for sample_id, data in rows:
+            save_json_data(json.loads(data), os.path.join(output_dir, os.path.basename(sample_id)))
+        return len(rows)
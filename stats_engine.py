@@ -0,0 +1,169 @@
+import os
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import json_codec
+from config import STATS_CACHE_FILE, STATS_WORKERS, STATS_CHUNK_SIZE
+
+# Attributes counted in the dataset statistics
+STATS_ATTRIBUTES = ["label", "orientation", "brand_name", "vehicle_color", "itype", "type", "special_type"]
+
+# Attribute pairs reported as cross-tabulations
+CROSS_TABS = [("label", "itype"), ("brand_name", "vehicle_color")]
+
+# Per-file cache entry: [mtime_ns, size, {attribute: value}] (values is None for unparsable files)
+CacheEntry = list
+
+def file_fingerprint(path: str) -> Tuple[int, int]:
+    """Fingerprint a file by mtime and size"""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def _extract(path: str) -> Optional[Dict[str, str]]:
+    """Read the attribute values the statistics need from one JSON file"""
+    try:
+        data = json_codec.load_file(path)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    return {attr: data[attr] for attr in STATS_ATTRIBUTES if attr in data}
+
+def _new_counters() -> Dict[str, Counter]:
+    counters = {attr: Counter() for attr in STATS_ATTRIBUTES}
+    for a, b in CROSS_TABS:
+        counters[f"{a} x {b}"] = Counter()
+    return counters
+
+def _count_into(counters: Dict[str, Counter], values: Dict[str, str]) -> None:
+    for attr in STATS_ATTRIBUTES:
+        if attr in values:
+            counters[attr][values[attr]] += 1
+    for a, b in CROSS_TABS:
+        if a in values and b in values:
+            counters[f"{a} x {b}"][(values[a], values[b])] += 1
+
+def _parse_chunk(paths: List[str]) -> Tuple[Dict[str, CacheEntry], Dict[str, Counter]]:
+    """Worker: parse a chunk of files, returning cache entries and partial counters"""
+    entries = {}
+    counters = _new_counters()
+    for path in paths:
+        try:
+            mtime, size = file_fingerprint(path)
+        except OSError:
+            continue
+        values = _extract(path)
+        entries[os.path.basename(path)] = [mtime, size, values]
+        if values is not None:
+            _count_into(counters, values)
+    return entries, counters
+
+def _load_cache(cache_file: str) -> Dict[str, CacheEntry]:
+    try:
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache_file: str, cache: Dict[str, CacheEntry]) -> None:
+    tmp_path = cache_file + ".tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_file)
+    except OSError as e:
+        print(f"Error writing stats cache: {str(e)}")
+
+def _update_cache(directory: str, exclude: Tuple[str, ...], cache_file: str,
+                  workers: Optional[int], chunk_size: int) -> Tuple[Dict[str, CacheEntry], List[str], Dict[str, Counter]]:
+    """Bring the per-file value cache up to date with the JSON files in a directory
+
+    Returns:
+        The updated cache, the names reused from the previous cache, and the
+        merged counters of the files that had to be (re)parsed
+    """
+    cache = _load_cache(cache_file) if cache_file else {}
+    new_cache: Dict[str, CacheEntry] = {}
+    reused = []
+    stale = []
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.endswith('.json') or name.startswith('.') or name in exclude:
+                continue
+            st = entry.stat()
+            cached = cache.get(name)
+            if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                new_cache[name] = cached
+                reused.append(name)
+            else:
+                stale.append(entry.path)
+
+    chunks = [stale[i:i + chunk_size] for i in range(0, len(stale), chunk_size)]
+    if len(chunks) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_parse_chunk, chunks))
+    else:
+        # Not worth starting worker processes for a single chunk
+        results = [_parse_chunk(chunk) for chunk in chunks]
+
+    counters = _new_counters()
+    for chunk_entries, chunk_counters in results:
+        new_cache.update(chunk_entries)
+        for key, counter in chunk_counters.items():
+            counters[key].update(counter)
+
+    if cache_file and (stale or len(new_cache) != len(cache)):
+        _save_cache(cache_file, new_cache)
+
+    return new_cache, reused, counters
+
+def load_attribute_values(directory: str, exclude: Tuple[str, ...] = (),
+                          cache_file: str = STATS_CACHE_FILE,
+                          workers: Optional[int] = STATS_WORKERS,
+                          chunk_size: int = STATS_CHUNK_SIZE) -> Tuple[Dict[str, Dict[str, str]], str]:
+    """Get the statistics attribute values of every JSON file in a directory
+
+    Returns:
+        The values per file name, and a signature of the underlying files
+        that changes whenever any of them is added, removed or modified
+    """
+    cache, _, _ = _update_cache(directory, exclude, cache_file, workers, chunk_size)
+    signature = "{}-{}-{}".format(len(cache), sum(e[0] for e in cache.values()), sum(e[1] for e in cache.values()))
+    return {name: entry[2] for name, entry in cache.items() if entry[2] is not None}, signature
+
+def compute_attribute_stats(directory: str, exclude: Tuple[str, ...] = (),
+                            cache_file: str = STATS_CACHE_FILE,
+                            workers: Optional[int] = STATS_WORKERS,
+                            chunk_size: int = STATS_CHUNK_SIZE) -> Dict:
+    """Count attribute values and cross-tabs over the JSON files in a directory
+
+    Files whose mtime and size match the cache are counted from the cached
+    values; only new or changed files are parsed, in chunks across a process
+    pool, and the partial counters are merged.
+
+    Returns:
+        Dict with "attribute_counts" ({attr: {value: count}}) and
+        "cross_tabs" ({"a x b": {value_a: {value_b: count}}})
+    """
+    cache, reused, counters = _update_cache(directory, exclude, cache_file, workers, chunk_size)
+    for name in reused:
+        values = cache[name][2]
+        if values is not None:
+            _count_into(counters, values)
+
+    cross_tabs = {}
+    for a, b in CROSS_TABS:
+        key = f"{a} x {b}"
+        table: Dict[str, Dict[str, int]] = {}
+        for (value_a, value_b), count in counters[key].items():
+            table.setdefault(value_a, {})[value_b] = count
+        cross_tabs[key] = table
+
+    return {
+        "attribute_counts": {attr: dict(counters[attr]) for attr in STATS_ATTRIBUTES},
+        "cross_tabs": cross_tabs
+    }
@@ -52,5 +52,27 @@ def generate_report(stats: Dict, output_file: str = None) -> str:
             for value, count in sorted_items:
                 percentage = (count / verification_stats['verified']) * 100 if verification_stats['verified'] > 0 else 0
                 f.write(f"- {value}: {count} ({percentage:.2f}%)\n")
+        
+        # Write class balance if it was computed
+        class_balance = stats.get("class_balance", {})
+        if class_balance:
+            f.write("\n## Class Balance (label)\n")
+        for value, row in class_balance.items():
+            f.write(f"- {value}: {row['count']} ({row['share'] * 100:.2f}%, {row['ratio_to_largest']:.2f}x of largest class)\n")
+        
+        # Write cross-tabulations of attribute pairs
+        cross_tabs = stats.get("cross_tabs", {})
+        if cross_tabs:
+            f.write("\n## Cross-Tabulations\n")
+        for name, table in cross_tabs.items():
+            f.write(f"\n### {name}\n")
+            
+            # Sort rows by their total count (descending)
+            sorted_rows = sorted(table.items(), key=lambda x: sum(x[1].values()), reverse=True)
+            
+            for row_value, columns in sorted_rows:
+                cells = ", ".join(f"{value}: {count}" for value, count in
+                                  sorted(columns.items(), key=lambda x: x[1], reverse=True))
+                f.write(f"- {row_value}: {cells}\n")
     
     return output_file 
\ No newline at end of file
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Batch validation for AOT (AttributeannOtationTool)
+Runs validate_json_structure and suggest_fixes over every JSON file in the
+input and output directories and writes a machine-readable issue report.
+Invalid values without a known fix get the closest standard values instead.
+
+Usage:
+    python validate_dataset.py [--format jsonl|csv] [--output FILE] [--workers N]
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+from typing import Dict, Tuple
+
+from config import INPUT_DIR, OUTPUT_DIR, VALIDATION_CACHE_FILE
+from data_handler import load_json_data
+from validation import validate_json_structure, suggest_fixes, validate_attribute
+from fuzzy_index import find_similar_values
+from schema import SCHEMA
+from batch import iter_json_files, FileResultCache, run_parallel
+from utils import get_timestamp
+
+def validate_file(path: str) -> Tuple[str, Dict]:
+    """Validate one JSON file, returns (path, result)"""
+    try:
+        data = load_json_data(path)
+    except OSError as e:
+        return path, {"issues": [f"Unreadable file: {str(e)}"], "suggestions": {}, "close_matches": {}}
+    if not data:
+        return path, {"issues": ["Invalid or empty JSON"], "suggestions": {}, "close_matches": {}}
+    
+    suggestions = suggest_fixes(data)
+    close_matches = {}
+    for attr in SCHEMA:
+        value = data.get(attr)
+        if isinstance(value, str) and attr not in suggestions and not validate_attribute(attr, value):
+            matches = find_similar_values(attr, value)
+            if matches:
+                close_matches[attr] = matches
+    return path, {"issues": validate_json_structure(data), "suggestions": suggestions,
+                  "close_matches": close_matches}
+
+def main():
+    """Main batch validation function"""
+    parser = argparse.ArgumentParser(description="Validate every sample JSON in the dataset")
+    parser.add_argument("--dirs", nargs="+", default=[INPUT_DIR, OUTPUT_DIR],
+                        help="Directories to scan (default: input and output directories)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="Report format")
+    parser.add_argument("--output", help="Report path (default: validation_report_<timestamp> in the output directory)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--all", action="store_true", help="Also report files without issues")
+    parser.add_argument("--no-cache", action="store_true", help="Re-validate every file, ignoring the cache")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(OUTPUT_DIR, f"validation_report_{get_timestamp()}.{args.format}")
+    cache = FileResultCache(None if args.no_cache else VALIDATION_CACHE_FILE)
+
+    files = sorted(iter_json_files(args.dirs))
+    to_validate = [path for path, mtime, size in files if cache.get(path, mtime, size) is None]
+    print(f"Validating {len(to_validate)} files ({len(files) - len(to_validate)} unchanged since last run)...")
+
+    # Fresh results come back in the same order as `files`, so the report can
+    # be streamed out while the workers are still running
+    fresh = run_parallel(validate_file, to_validate, workers=args.workers)
+
+    with_issues = 0
+    with open(output, 'w', newline='') as f:
+        writer = csv.writer(f) if args.format == "csv" else None
+        if writer:
+            writer.writerow(["file", "issue_count", "issues", "suggestions", "close_matches"])
+        for path, mtime, size in files:
+            result = cache.get(path, mtime, size)
+            if result is None:
+                _, result = next(fresh)
+                cache.put(path, mtime, size, result)
+            
+            if result["issues"]:
+                with_issues += 1
+            elif not args.all:
+                continue
+            if writer:
+                writer.writerow([path, len(result["issues"]), "; ".join(result["issues"]),
+                                 json.dumps(result["suggestions"]),
+                                 json.dumps(result.get("close_matches", {}))])
+            else:
+                f.write(json.dumps({"file": path, **result}) + "\n")
+
+    cache.prune(path for path, _, _ in files)
+    cache.save()
+
+    print(f"{with_issues} of {len(files)} files have issues. Report written to {output}")
+    return 1 if with_issues else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,19 @@
 from typing import Dict, List, Optional
-from config import (VEHICLE_BRANDS, VEHICLE_COLORS, VEHICLE_ORIENTATIONS,
-                   VEHICLE_LABELS, VEHICLE_ITYPES, VEHICLE_TYPES, VEHICLE_SPECIAL_TYPES)
+from schema import get_schema, SCHEMA
 
 def validate_attribute(attribute: str, value: str) -> bool:
     """Validate if an attribute value is in the allowed list"""
-    if attribute == "brand_name":
-        return value in VEHICLE_BRANDS
-    elif attribute == "vehicle_color":
-        return value in VEHICLE_COLORS
-    elif attribute == "orientation":
-        return value in VEHICLE_ORIENTATIONS
-    elif attribute == "label":
-        return value in VEHICLE_LABELS
-    elif attribute == "itype":
-        return value in VEHICLE_ITYPES
-    elif attribute == "type":
-        return value in VEHICLE_TYPES
-    elif attribute == "special_type":
-        return value in VEHICLE_SPECIAL_TYPES
+    schema = get_schema(attribute)
     # For attributes like width, height, etc. return True
-    return True
+    if schema is None:
+        return True
+    # Lists or dicts from malformed files aren't hashable; no option matches them anyway
+    return isinstance(value, str) and value in schema.allowed
 
 def get_attribute_options(attribute: str) -> List[str]:
     """Get all options for a specific attribute"""
-    if attribute == "brand_name":
-        return VEHICLE_BRANDS
-    elif attribute == "vehicle_color":
-        return VEHICLE_COLORS
-    elif attribute == "orientation":
-        return VEHICLE_ORIENTATIONS
-    elif attribute == "label":
-        return VEHICLE_LABELS
-    elif attribute == "itype":
-        return VEHICLE_ITYPES
-    elif attribute == "type":
-        return VEHICLE_TYPES
-    elif attribute == "special_type":
-        return VEHICLE_SPECIAL_TYPES
-    return []
+    schema = get_schema(attribute)
+    return schema.options if schema is not None else []
 
 def validate_json_structure(data: Dict) -> List[str]:
     """Validate the entire JSON structure, return a list of issues"""
@@ -57,26 +33,22 @@ def validate_json_structure(data: Dict) -> List[str]:
     return issues
 
 def suggest_fixes(data: Dict) -> Dict[str, str]:
-    """Suggest fixes for common issues in the data"""
-    suggestions = {}
+    """Suggest fixes for common issues in the data
     
-    # Check for brand name variations and suggest standardized versions
-    if "brand_name" in data:
-        brand = data["brand_name"]
-        # Handle common misspellings or variations
-        if brand == "Maruthi":
-            suggestions["brand_name"] = "Maruti-Suzuki"
-        elif brand == "Tata":
-            suggestions["brand_name"] = "Tata-Motors"
-        elif brand == "Hero Honda":
-            suggestions["brand_name"] = "Hero-Honda"
+    Known variants come from the schema aliases (e.g. Maruthi -> Maruti-Suzuki,
+    Grey -> Gray); values that only differ from a standard value in case or
+    punctuation are mapped to it as well.
+    """
+    suggestions = {}
     
-    # For color variations
-    if "vehicle_color" in data:
-        color = data["vehicle_color"]
-        if color == "Grey":
-            suggestions["vehicle_color"] = "Gray"
-        elif color == "Golden":
-            suggestions["vehicle_color"] = "Yellow"
+    for attr, schema in SCHEMA.items():
+        if attr not in data:
+            continue
+        value = data[attr]
+        if not isinstance(value, str) or value in schema.allowed:
+            continue
+        canonical = schema.canonical(value)
+        if canonical is not None:
+            suggestions[attr] = canonical
     
-    return suggestions 
\ No newline at end of file
+    return suggestions
@@ -0,0 +1,136 @@
+import copy
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# Queued annotation writes: sample id -> annotation, or None to delete the stored copy
+AnnotationWrites = Dict[str, Optional[Dict]]
+# Queued progress changes: sample id -> True (verified) or False (pending)
+StatusWrites = Dict[str, bool]
+
+class WriteBehindBuffer:
+    """Coalescing queue of verified-output and progress writes
+
+    Writes are recorded in memory and applied by a background thread every
+    ``interval`` seconds, or sooner when a flush is requested. Only the
+    latest write per sample is kept, so repeated edits of one sample cost a
+    single disk write. Reads should go through annotation() and status()
+    first, which see queued writes and those being applied.
+
+    ``apply`` receives each batch and must write the annotations before the
+    progress changes, so a crash never leaves a sample verified without its
+    output file. A batch that fails is put back (behind any newer writes)
+    and retried on the next flush.
+    """
+
+    def __init__(self, apply: Callable[[AnnotationWrites, StatusWrites], None], interval: float = 2.0):
+        self._apply = apply
+        self.interval = interval
+        self._lock = threading.Lock()
+        # One flush at a time, so batches are applied in order
+        self._flush_lock = threading.Lock()
+        self._annotations: AnnotationWrites = {}
+        self._statuses: StatusWrites = {}
+        self._in_flight: Tuple[AnnotationWrites, StatusWrites] = ({}, {})
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.last_flush: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Start the background writer thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def put(self, annotations: Optional[AnnotationWrites] = None, statuses: Optional[StatusWrites] = None) -> None:
+        """Queue annotation writes and progress changes, replacing older ones for the same samples"""
+        # Copy now: callers keep editing their dicts after handing them over
+        annotations = {s: copy.deepcopy(d) for s, d in (annotations or {}).items()}
+        with self._lock:
+            self._annotations.update(annotations)
+            self._statuses.update(statuses or {})
+
+    def annotation(self, sample_id: str) -> Tuple[bool, Optional[Dict]]:
+        """Look up a queued annotation write
+
+        Returns:
+            Tuple[bool, Optional[Dict]]: Whether one is queued, and the
+            annotation (None for a queued delete)
+        """
+        with self._lock:
+            for annotations in (self._annotations, self._in_flight[0]):
+                if sample_id in annotations:
+                    return True, copy.deepcopy(annotations[sample_id])
+        return False, None
+
+    def status(self, sample_id: str) -> Optional[bool]:
+        """Queued verification status of a sample, None if it has no queued change"""
+        with self._lock:
+            for statuses in (self._statuses, self._in_flight[1]):
+                if sample_id in statuses:
+                    return statuses[sample_id]
+        return None
+
+    def statuses(self) -> StatusWrites:
+        """All queued progress changes, including those being applied"""
+        with self._lock:
+            return {**self._in_flight[1], **self._statuses}
+
+    def pending_count(self) -> int:
+        """Number of samples with writes not yet on disk"""
+        with self._lock:
+            return len(set(self._annotations) | set(self._statuses)
+                       | set(self._in_flight[0]) | set(self._in_flight[1]))
+
+    def request_flush(self) -> None:
+        """Ask the background thread to flush now, without waiting for it"""
+        self._wake.set()
+
+    def flush(self) -> bool:
+        """Apply all queued writes in the calling thread, returns False if that failed"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._annotations and not self._statuses:
+                    return True
+                self._in_flight = (self._annotations, self._statuses)
+                self._annotations, self._statuses = {}, {}
+            annotations, statuses = self._in_flight
+            try:
+                self._apply(annotations, statuses)
+            except Exception as e:
+                with self._lock:
+                    # Retry next time, unless the sample was written again since
+                    self._annotations = {**annotations, **self._annotations}
+                    self._statuses = {**statuses, **self._statuses}
+                    self._in_flight = ({}, {})
+                    self.last_error = str(e)
+                print(f"Error writing queued changes: {e}")
+                return False
+            with self._lock:
+                self._in_flight = ({}, {})
+                self.last_flush = time.time()
+                self.last_error = None
+            return True
+
+    def close(self) -> None:
+        """Stop the background thread and write whatever is still queued"""
+        self._stopped = True
+        self._wake.set()
+        self.flush()
+
+    def status_text(self) -> str:
+        """One-line description of the flush state for the UI"""
+        pending = self.pending_count()
+        if self.last_error is not None:
+            return f"⚠️ Saving failed ({self.last_error}), {pending} change(s) will be retried"
+        if pending:
+            return f"💾 Saving {pending} change(s)..."
+        return "💾 All changes saved"